@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+
+from . import memory
+
+ACTIONS = {
+    'enable': lambda: memory.set_enabled(True),
+    'disable': lambda: memory.set_enabled(False),
+    'snapshot': memory.request_snapshot,
+    'reset': memory.reset_reports,
+}
+
+
+def memory_diagnostics(request):
+    """Страница админки с отчётами диагностики памяти воркеров."""
+    if not (request.user.is_superuser or request.user.is_admin):
+        raise PermissionDenied
+    if request.method == 'POST':
+        action = ACTIONS.get(request.POST.get('action'))
+        if action is None:
+            raise PermissionDenied
+        action()
+        return redirect(request.path)
+    context = dict(
+        admin.site.each_context(request),
+        title='Диагностика памяти',
+        enabled=memory.is_enabled(),
+        shared=memory.cache_is_shared(),
+        measures_peak=memory.MEASURES_PEAK,
+        poll_seconds=settings.MEMORY_DIAGNOSTICS_POLL_SECONDS,
+        workers=memory.worker_reports(),
+    )
+    return TemplateResponse(request, 'admin/memory_diagnostics.html', context)
@@ -0,0 +1,162 @@
+"""
+Объединение одинаковых одновременных анонимных GET-запросов (single-flight).
+
+Внутри процесса повторные запросы ждут результат первого через
+threading.Event. Между воркерами gunicorn первый запрос берёт короткую
+блокировку в кэше (cache.add), а остальные ждут, пока он положит ответ
+в кэш. Ожидание ограничено COALESCE_WAIT_SECONDS, после чего запрос
+выполняется сам. Счётчики попаданий общие для всех воркеров и хранятся
+в кэше, см. coalescing_stats().
+"""
+import functools
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+STATS = ('leaders', 'local_hits', 'shared_hits', 'fallbacks')
+
+_lock = threading.Lock()
+_flights = {}
+
+
+class Flight:
+    """Выполняющийся в этом процессе запрос, которого ждут остальные."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+
+
+def stats_key(name):
+    return f'coalesce-stats:{name}'
+
+
+def record(name):
+    key = stats_key(name)
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, None)
+
+
+def coalescing_stats():
+    """Счётчики объединения запросов по всем воркерам."""
+    values = cache.get_many([stats_key(name) for name in STATS])
+    return {name: values.get(stats_key(name), 0) for name in STATS}
+
+
+def reset_coalescing_stats():
+    cache.delete_many([stats_key(name) for name in STATS])
+
+
+def shared_result(response):
+    if response.status_code != status.HTTP_200_OK:
+        return None
+    return {'data': response.data, 'status': response.status_code}
+
+
+def wait_for_worker(key):
+    """Ждёт ответ, который вычисляет другой воркер, или возвращает None."""
+    deadline = time.monotonic() + settings.COALESCE_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(settings.COALESCE_POLL_SECONDS)
+        result = cache.get(f'{key}:result')
+        if result is not None:
+            return result
+        if cache.get(f'{key}:lock') is None:
+            return cache.get(f'{key}:result')
+    return None
+
+
+def compute_once(key, compute):
+    """
+    Выполняет compute, если ни один воркер не выполняет запрос с тем же
+    ключом, иначе возвращает его ответ.
+    """
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, True, settings.COALESCE_LOCK_SECONDS):
+        record('leaders')
+        try:
+            response = compute()
+            result = shared_result(response)
+            if result is not None:
+                cache.set(
+                    f'{key}:result', result, settings.COALESCE_RESULT_SECONDS
+                )
+            return response
+        finally:
+            cache.delete(lock_key)
+    result = wait_for_worker(key)
+    if result is None:
+        record('fallbacks')
+        return compute()
+    record('shared_hits')
+    return Response(result['data'], status=result['status'])
+
+
+def single_flight(key, compute):
+    """
+    Одновременные вызовы с одинаковым key внутри процесса выполняют
+    compute один раз, остальные получают копию ответа первого.
+    """
+    with _lock:
+        flight = _flights.get(key)
+        is_leader = flight is None
+        if is_leader:
+            flight = _flights[key] = Flight()
+    if not is_leader:
+        if (
+            flight.event.wait(settings.COALESCE_WAIT_SECONDS)
+            and flight.result is not None
+        ):
+            record('local_hits')
+            return Response(
+                flight.result['data'], status=flight.result['status']
+            )
+        record('fallbacks')
+        return compute()
+    try:
+        response = compute_once(key, compute)
+        flight.result = shared_result(response)
+        return response
+    finally:
+        with _lock:
+            del _flights[key]
+        flight.event.set()
+
+
+def coalescing_key(request):
+    """
+    Ключ запроса: схема, хост, путь и параметры. Хост и схема нужны,
+    потому что ответы списков содержат абсолютные ссылки next/previous.
+    """
+    uri = request.build_absolute_uri()
+    return f'coalesce:{hashlib.md5(uri.encode()).hexdigest()}'
+
+
+def coalesce(method):
+    """
+    Декоратор действия viewset: одновременные анонимные GET-запросы
+    с одинаковыми хостом, путём и параметрами выполняются один раз.
+    Запросы прогрева воркера (api/warmup.py) выполняются без объединения.
+    """
+    @functools.wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        if (
+            not settings.COALESCE_READS
+            or request.method != 'GET'
+            or request.user.is_authenticated
+            or getattr(request, 'warm_up', False)
+        ):
+            return method(self, request, *args, **kwargs)
+        return single_flight(
+            coalescing_key(request),
+            lambda: method(self, request, *args, **kwargs),
+        )
+    return wrapper
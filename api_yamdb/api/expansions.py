@@ -0,0 +1,110 @@
+"""
+Встраивание первых отзывов и комментариев в ответы (параметр expand).
+
+Для каждого уровня вложенности выполняется один запрос, который выбирает
+не больше EXPAND_LIMIT дочерних объектов на каждого родителя: через
+ROW_NUMBER() OVER (PARTITION BY ...) там, где СУБД поддерживает оконные
+функции, и через коррелированный подзапрос с LIMIT в остальных случаях.
+"""
+from django.conf import settings
+from django.db import connections
+from django.db.models import F, OuterRef, Subquery, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+from rest_framework.exceptions import ValidationError
+
+from reviews.models import Comment, Review
+from .projections import (
+    COMMENT_VALUES, REVIEW_VALUES, comment_rows, review_rows,
+)
+
+
+class RawSubquery(RawSQL):
+    """Подзапрос для поиска __in, который сам заключает его в скобки."""
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+TITLE_EXPANSIONS = ('reviews', 'reviews.comments')
+REVIEW_EXPANSIONS = ('comments',)
+
+
+def parse_expand(request, allowed):
+    """Множество запрошенных вложений из параметра expand=a,b."""
+    expand = request.query_params.get('expand')
+    if not expand:
+        return set()
+    expand = set(expand.split(','))
+    unknown = expand.difference(allowed)
+    if unknown:
+        raise ValidationError(
+            {'expand': f'Неизвестные вложения: {", ".join(sorted(unknown))}.'}
+        )
+    return expand
+
+
+def first_per_parent(queryset, parent_field, parent_ids, limit):
+    """
+    Queryset из первых limit объектов (по id) для каждого из parent_ids,
+    упорядоченный по родителю и id.
+    """
+    queryset = queryset.filter(**{f'{parent_field}__in': parent_ids})
+    connection = connections[queryset.db]
+    if connection.features.supports_over_clause:
+        ranked = queryset.order_by().annotate(
+            rank_in_parent=Window(
+                RowNumber(),
+                partition_by=[F(parent_field)],
+                order_by=F('id').asc(),
+            )
+        ).values('id', 'rank_in_parent')
+        sql, params = ranked.query.get_compiler(queryset.db).as_sql()
+        qn = connection.ops.quote_name
+        ids = RawSubquery(
+            f'SELECT {qn("id")} FROM ({sql}) ranked '
+            f'WHERE {qn("rank_in_parent")} <= %s',
+            (*params, limit),
+        )
+    else:
+        ids = Subquery(
+            queryset.filter(**{parent_field: OuterRef(parent_field)})
+            .order_by('id').values('id')[:limit]
+        )
+    return queryset.filter(id__in=ids).order_by(parent_field, 'id')
+
+
+def expand_comments(reviews):
+    """Добавляет каждому отзыву из reviews первые комментарии."""
+    by_review = {}
+    for review in reviews:
+        review['comments'] = by_review.setdefault(review['id'], [])
+    if not by_review:
+        return
+    values = list(first_per_parent(
+        Comment.objects.filter(author__is_active=True), 'review_id',
+        list(by_review), settings.EXPAND_LIMIT,
+    ).values('review_id', *COMMENT_VALUES))
+    for value, comment in zip(values, comment_rows(values)):
+        by_review[value['review_id']].append(comment)
+
+
+def expand_reviews(titles, with_comments=False):
+    """
+    Добавляет каждому произведению из titles первые видимые отзывы,
+    а с with_comments и первые комментарии к ним.
+    """
+    by_title = {}
+    for title in titles:
+        title['reviews'] = by_title.setdefault(title['id'], [])
+    if not by_title:
+        return
+    values = list(first_per_parent(
+        Review.objects.filter(is_hidden=False, author__is_active=True),
+        'title_id', list(by_title), settings.EXPAND_LIMIT,
+    ).values('title_id', *REVIEW_VALUES))
+    reviews = review_rows(values)
+    for value, review in zip(values, reviews):
+        by_title[value['title_id']].append(review)
+    if with_comments:
+        expand_comments(reviews)
@@ -0,0 +1,64 @@
+"""
+Фасетные счётчики для каталога произведений.
+
+Для каждого фасета (жанр, категория, год) выполняется один сгруппированный
+запрос по отфильтрованному queryset, независимо от числа значений.
+Результаты кэшируются на FACETS_CACHE_TIMEOUT секунд по тексту запроса,
+поэтому частые сочетания фильтров не пересчитываются.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from reviews.models import Title
+
+
+def genre_counts(queryset):
+    return Title.genre.through.objects.filter(
+        title_id__in=queryset.values('id')
+    ).values_list('genre__slug').annotate(
+        count=Count('title_id', distinct=True)
+    ).order_by('genre__slug')
+
+
+def category_counts(queryset):
+    return queryset.filter(category__isnull=False).values_list(
+        'category__slug'
+    ).annotate(count=Count('id', distinct=True)).order_by('category__slug')
+
+
+def year_counts(queryset):
+    return queryset.values_list('year').annotate(
+        count=Count('id', distinct=True)
+    ).order_by('year')
+
+
+FACETS = {
+    'genre': genre_counts,
+    'category': category_counts,
+    'year': year_counts,
+}
+
+
+def facet_cache_key(queryset):
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.md5(f'{sql}{params}'.encode()).hexdigest()
+    return f'facets:{queryset.db}:{digest}'
+
+
+def facet_counts(name, queryset):
+    """
+    Список {'value': ..., 'count': ...} для фасета name по queryset
+    произведений, упорядоченный по значению.
+    """
+    counts = FACETS[name](queryset.order_by())
+    key = facet_cache_key(counts)
+    rows = cache.get(key)
+    if rows is None:
+        rows = [
+            {'value': value, 'count': count} for value, count in counts
+        ]
+        cache.set(key, rows, settings.FACETS_CACHE_TIMEOUT)
+    return rows
@@ -0,0 +1,58 @@
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+IDEMPOTENCY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+
+
+def request_fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def idempotent(view):
+    """
+    Повторный запрос с тем же заголовком Idempotency-Key получает
+    сохранённый ответ первого запроса, и представление не выполняется
+    второй раз. Пока первый запрос не завершён, повтор получает 409.
+    Ответы хранятся IDEMPOTENCY_KEY_TIMEOUT секунд.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.META.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view(request, *args, **kwargs)
+        cache_key = f'idempotency:{view.__name__}:{key}'
+        fingerprint = request_fingerprint(request)
+        timeout = settings.IDEMPOTENCY_KEY_TIMEOUT
+        if cache.add(cache_key, {'fingerprint': fingerprint}, timeout):
+            try:
+                response = view(request, *args, **kwargs)
+            except Exception:
+                cache.delete(cache_key)
+                raise
+            cache.set(cache_key, {
+                'fingerprint': fingerprint,
+                'status': response.status_code,
+                'data': response.data,
+            }, timeout)
+            return response
+        stored = cache.get(cache_key)
+        if stored is None or 'status' not in stored:
+            return Response(
+                {'detail': 'Запрос с этим Idempotency-Key ещё выполняется.'},
+                status=status.HTTP_409_CONFLICT,
+            )
+        if stored['fingerprint'] != fingerprint:
+            return Response(
+                {'detail': 'Idempotency-Key уже использован с другими '
+                           'данными.'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        return Response(stored['data'], status=stored['status'])
+    return wrapper
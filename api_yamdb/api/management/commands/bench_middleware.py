@@ -0,0 +1,61 @@
+import time
+
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.urls import path
+
+
+def ping(request):
+    return HttpResponse('ok')
+
+
+urlpatterns = [
+    path('api/v1/ping/', ping),
+    path('admin/ping/', ping),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает накладные расходы middleware на запрос: полный стек '
+        '(SecurityMiddleware, CommonMiddleware и STATEFUL_MIDDLEWARE) против '
+        'PathAwareMiddleware из settings.MIDDLEWARE. Запросы идут '
+        'в пустое представление, так что разница — это время, '
+        'которое сэкономлено на каждом запросе к /api/.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        full = [
+            path for path in settings.MIDDLEWARE
+            if not path.endswith('.PathAwareMiddleware')
+        ]
+        full[1:1] = settings.STATEFUL_MIDDLEWARE
+        for url in ('/api/v1/ping/', '/admin/ping/'):
+            before = self.measure(full, url, repeat)
+            after = self.measure(settings.MIDDLEWARE, url, repeat)
+            self.stdout.write(
+                f'{url}: полный стек {before * 1e6:.1f} мкс, '
+                f'с PathAwareMiddleware {after * 1e6:.1f} мкс, '
+                f'разница {(before - after) * 1e6:.1f} мкс на запрос'
+            )
+
+    @staticmethod
+    def measure(middleware, url, repeat):
+        with override_settings(
+            MIDDLEWARE=middleware, ROOT_URLCONF=__name__, ALLOWED_HOSTS=['*']
+        ):
+            handler = BaseHandler()
+            handler.load_middleware()
+            factory = RequestFactory()
+            handler.get_response(factory.get(url))
+            start = time.perf_counter()
+            for _ in range(repeat):
+                handler.get_response(factory.get(url))
+            return (time.perf_counter() - start) / repeat
@@ -0,0 +1,117 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from api.projections import (
+    review_rows, review_values, title_rows, title_values,
+)
+from api.renderers import FastJSONRenderer
+from api.serializers import ReviewSerializer, TitleReadSerializer
+from api.views import TitleViewSet
+from reviews.models import Category, Genre, Review, Title
+from users.models import User
+
+
+class RollbackError(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время сериализации страницы списков /titles/ и '
+        '/titles/{id}/reviews/ через ModelSerializer + JSONRenderer и через '
+        'values()-проекцию + FastJSONRenderer. Проверяет, что ответы '
+        'совпадают побайтно. Тестовые данные создаются во временной '
+        'транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=200)
+        parser.add_argument('--reviews', type=int, default=200)
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(**options)
+                raise RollbackError
+        except RollbackError:
+            pass
+
+    def run(self, titles, reviews, page_size, repeat, **options):
+        title = self.fill(titles, reviews)
+        title_qs = TitleViewSet().get_queryset()[:page_size]
+        review_qs = title.reviews.select_related('author')[:page_size]
+        cases = (
+            (
+                'titles',
+                lambda: TitleReadSerializer(
+                    title_qs.prefetch_related('genre')
+                    .select_related('category'),
+                    many=True,
+                ).data,
+                lambda: title_rows(list(title_values(title_qs))),
+            ),
+            (
+                'reviews',
+                lambda: ReviewSerializer(review_qs, many=True).data,
+                lambda: review_rows(list(review_values(review_qs))),
+            ),
+        )
+        for name, serialize, project in cases:
+            before = JSONRenderer().render(serialize())
+            after = FastJSONRenderer().render(project())
+            if before != after:
+                raise CommandError(f'{name}: ответы не совпадают')
+            slow = self.measure(
+                lambda: JSONRenderer().render(serialize()), repeat
+            )
+            fast = self.measure(
+                lambda: FastJSONRenderer().render(project()), repeat
+            )
+            self.stdout.write(
+                f'{name}: {page_size} строк на страницу, '
+                f'до {slow * 1000:.2f} мс, после {fast * 1000:.2f} мс, '
+                f'ускорение x{slow / fast:.1f}'
+            )
+
+    @staticmethod
+    def measure(func, repeat):
+        func()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - start) / repeat
+
+    @staticmethod
+    def fill(titles, reviews):
+        category = Category.objects.create(name='bench', slug='bench')
+        genres = [
+            Genre.objects.create(name=f'bench-{i}', slug=f'bench-{i}')
+            for i in range(3)
+        ]
+        Title.objects.bulk_create(
+            Title(name=f'Title {i}', year=2000, category=category)
+            for i in range(titles)
+        )
+        objs = list(Title.objects.filter(category=category))
+        Title.genre.through.objects.bulk_create(
+            Title.genre.through(title_id=obj.id, genre_id=genre.id)
+            for obj in objs for genre in genres[:obj.id % 3 + 1]
+        )
+        User.objects.bulk_create(
+            User(username=f'bench-{i}', email=f'bench-{i}@example.com')
+            for i in range(reviews)
+        )
+        users = User.objects.filter(username__startswith='bench-')
+        Review.objects.bulk_create(
+            Review(
+                title=objs[0], author=user, text='Текст отзыва ' * 10,
+                score=user.id % 10 + 1,
+            )
+            for user in users
+        )
+        return objs[0]
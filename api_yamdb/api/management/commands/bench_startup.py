@@ -0,0 +1,79 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+CHILD = '''
+import json
+import sys
+import time
+
+start = time.perf_counter()
+from api_yamdb.wsgi import application
+loaded = time.perf_counter()
+if sys.argv[1] == 'warm':
+    from api.warmup import warm_up
+    warm_up()
+warmed = time.perf_counter()
+
+from django.test import RequestFactory
+
+
+def request(path):
+    environ = RequestFactory().get(path).environ
+    begin = time.perf_counter()
+    b''.join(application(environ, lambda status, headers: None))
+    return time.perf_counter() - begin
+
+
+first = request(sys.argv[2])
+second = request(sys.argv[2])
+print(json.dumps({
+    'load': loaded - start,
+    'warm_up': warmed - loaded,
+    'first': first,
+    'second': second,
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет холодный старт в отдельных процессах: время загрузки '
+        'WSGI-приложения, время прогрева (api/warmup.py) и задержку первого '
+        'и второго запроса без прогрева и после него.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/v1/titles/')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        for mode in ('cold', 'warm'):
+            runs = [
+                self.run_child(mode, options['path'])
+                for _ in range(options['repeat'])
+            ]
+            median = {
+                name: statistics.median(run[name] for run in runs) * 1000
+                for name in runs[0]
+            }
+            self.stdout.write(
+                f'{mode}: загрузка {median["load"]:.1f} мс, '
+                f'прогрев {median["warm_up"]:.1f} мс, '
+                f'первый запрос {median["first"]:.1f} мс, '
+                f'второй запрос {median["second"]:.1f} мс'
+            )
+
+    @staticmethod
+    def run_child(mode, path):
+        result = subprocess.run(
+            [sys.executable, '-c', CHILD, mode, path],
+            cwd=settings.BASE_DIR, env=os.environ.copy(),
+            stdout=subprocess.PIPE, check=True,
+        )
+        return json.loads(result.stdout.decode().splitlines()[-1])
@@ -0,0 +1,50 @@
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+
+
+def header_problems(status, headers):
+    """Расхождения заголовков ответа на хэшированный файл с ожидаемыми."""
+    problems = []
+    if status != 200:
+        problems.append(f'статус {status}')
+    cache_control = headers.get('Cache-Control', '')
+    if not all(
+        directive in cache_control
+        for directive in ('max-age=31536000', 'immutable')
+    ):
+        problems.append(f'Cache-Control: {cache_control!r}')
+    encoding = headers.get('Content-Encoding')
+    if encoding not in ('gzip', 'br'):
+        problems.append(f'Content-Encoding: {encoding!r}')
+    return problems
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет, что nginx отдаёт хэшированную статику сжатой и с '
+        'долгим кэшированием (Cache-Control immutable).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('base_url', nargs='?', default='http://nginx')
+        parser.add_argument('--file', default='redoc.yaml')
+
+    def handle(self, *args, **options):
+        url = options['base_url'].rstrip('/') + staticfiles_storage.url(
+            options['file']
+        )
+        request = Request(url, headers={'Accept-Encoding': 'gzip, br'})
+        try:
+            with urlopen(request, timeout=10) as response:
+                status, headers = response.status, response.headers
+        except HTTPError as error:
+            status, headers = error.code, error.headers
+        problems = header_problems(status, headers)
+        if problems:
+            raise CommandError(f'{url}: ' + '; '.join(problems))
+        self.stdout.write(
+            f'{url}: {headers["Content-Encoding"]}, {headers["Cache-Control"]}'
+        )
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from api.coalescing import coalescing_stats, reset_coalescing_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает счётчики объединения одинаковых анонимных запросов: '
+        'leaders - выполненные запросы, local_hits и shared_hits - ответы, '
+        'полученные от запроса в этом же или другом воркере, fallbacks - '
+        'запросы, которые не дождались ответа и выполнились сами.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Обнулить счётчики после вывода.',
+        )
+
+    def handle(self, *args, **options):
+        stats = coalescing_stats()
+        for name, value in stats.items():
+            self.stdout.write(f'{name}: {value}')
+        served = stats['leaders'] + stats['local_hits'] + stats['shared_hits']
+        if served:
+            hits = stats['local_hits'] + stats['shared_hits']
+            self.stdout.write(f'Доля объединённых: {hits / served:.1%}')
+        if options['reset']:
+            reset_coalescing_stats()
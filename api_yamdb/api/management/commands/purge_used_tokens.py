@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from api.tokens import purge_used_tokens
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет записи об использованных refresh-токенах, срок действия '
+        'которых истёк.'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Удалено записей: {purge_used_tokens()}')
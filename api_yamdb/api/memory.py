@@ -0,0 +1,280 @@
+"""
+Диагностика памяти воркеров для администраторов.
+
+Диагностика включается и выключается во время работы флагом в кэше
+memory-diagnostics (set_enabled), который каждый воркер перечитывает
+не чаще раза в MEMORY_DIAGNOSTICS_POLL_SECONDS. Этот кэш общий для всех
+воркеров: по умолчанию файловый, в docker-compose.yaml - memcached;
+с локальным кэшем процесса админка предупреждает, что флаг и отчёты
+видит только один воркер, см. cache_is_shared(). Пока диагностика
+выключена, tracemalloc остановлен, а middleware только сравнивает
+текущее время с моментом следующей проверки флага.
+
+Во включённом состоянии для каждого маршрута из api/urls.py считается
+объём памяти, выделенной за запрос, и наибольшее число строк, которое
+вернул один SQL-запрос (cursor.rowcount; SQLite его для SELECT не
+сообщает). Пик памяти за запрос измеряется только на Python 3.9+, где
+есть tracemalloc.reset_peak; на Python 3.7 из Dockerfile и CI считается
+прирост памяти к концу запроса, временные выделения в него не попадают.
+Что именно измерено, показывает поле measure отчёта. Снимки tracemalloc
+делаются по запросу из админки: воркер при следующем запросе сохраняет
+топ выделений и разницу с предыдущим снимком. Включённый воркер
+публикует отчёт при каждой проверке флага с временем жизни
+MEMORY_DIAGNOSTICS_REPORT_SECONDS, поэтому отчёты остановленных воркеров
+пропадают, см. worker_reports().
+
+Состояние tracemalloc общее для процесса, а gunicorn по умолчанию
+запускает воркер gthread с несколькими потоками. Поэтому в воркере
+одновременно замеряется только один запрос: запросы, пришедшие во время
+замера, обслуживаются без него и считаются в поле skipped маршрута.
+Выделения этих запросов всё же попадают в замер соседнего, поэтому
+точные цифры по маршрутам получаются при GUNICORN_THREADS=1.
+"""
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.utils import timezone
+
+CACHE_ALIAS = 'memory-diagnostics'
+ENABLED_KEY = 'memory-diagnostics:enabled'
+SNAPSHOT_KEY = 'memory-diagnostics:snapshot'
+WORKERS_KEY = 'memory-diagnostics:workers'
+TOP_LIMIT = 15
+MEASURES_PEAK = hasattr(tracemalloc, 'reset_peak')
+LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+class WorkerState:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.measuring = threading.Lock()
+        self.enabled = False
+        self.next_poll = 0.0
+        self.snapshot_id = None
+        self.snapshot = None
+        self.report = None
+        self.routes = {}
+
+
+_state = WorkerState()
+
+
+def worker_key(pid):
+    return f'memory-diagnostics:worker:{pid}'
+
+
+def store():
+    return caches[CACHE_ALIAS]
+
+
+def cache_is_shared():
+    return settings.CACHES[CACHE_ALIAS]['BACKEND'] not in LOCAL_CACHES
+
+
+def set_enabled(enabled):
+    store().set(ENABLED_KEY, enabled, None)
+
+
+def is_enabled():
+    return bool(store().get(ENABLED_KEY))
+
+
+def request_snapshot():
+    """Просит каждый воркер сделать снимок tracemalloc."""
+    store().set(SNAPSHOT_KEY, time.time(), None)
+
+
+def reset_reports():
+    workers = store().get(WORKERS_KEY, ())
+    store().delete_many([worker_key(pid) for pid in workers] + [WORKERS_KEY])
+
+
+def worker_reports():
+    """
+    Последние отчёты воркеров с включённой диагностикой. Воркеры,
+    чьи отчёты истекли, удаляются из списка.
+    """
+    workers = set(store().get(WORKERS_KEY, ()))
+    reports = store().get_many([worker_key(pid) for pid in workers])
+    alive = {pid for pid in workers if worker_key(pid) in reports}
+    if alive != workers:
+        store().set(WORKERS_KEY, alive, None)
+    return [reports[worker_key(pid)] for pid in sorted(alive)]
+
+
+def register_worker():
+    workers = set(store().get(WORKERS_KEY, ()))
+    if os.getpid() not in workers:
+        workers.add(os.getpid())
+        store().set(WORKERS_KEY, workers, None)
+
+
+def take_snapshot():
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        (tracemalloc.Filter(False, tracemalloc.__file__),)
+    )
+    diff = []
+    if _state.snapshot is not None:
+        diff = snapshot.compare_to(_state.snapshot, 'lineno')[:TOP_LIMIT]
+    _state.snapshot = snapshot
+    _state.report = {
+        'taken': timezone.now(),
+        'top': [str(stat) for stat in snapshot.statistics('lineno')[
+            :TOP_LIMIT
+        ]],
+        'diff': [str(stat) for stat in diff],
+    }
+
+
+def publish():
+    current, peak = tracemalloc.get_traced_memory()
+    store().set(worker_key(os.getpid()), {
+        'pid': os.getpid(),
+        'updated': timezone.now(),
+        'traced': current,
+        'measure': 'peak' if MEASURES_PEAK else 'growth',
+        'routes': dict(sorted(_state.routes.items())),
+        'snapshot': _state.report,
+    }, settings.MEMORY_DIAGNOSTICS_REPORT_SECONDS)
+    register_worker()
+
+
+def apply_flags(flags):
+    enabled = bool(flags.get(ENABLED_KEY))
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start(settings.MEMORY_DIAGNOSTICS_FRAMES)
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+        _state.snapshot = None
+    _state.enabled = enabled
+    if not enabled:
+        return
+    snapshot_id = flags.get(SNAPSHOT_KEY)
+    if snapshot_id is not None and snapshot_id != _state.snapshot_id:
+        _state.snapshot_id = snapshot_id
+        take_snapshot()
+    publish()
+
+
+def poll():
+    """
+    Возвращает, включена ли диагностика. Флаги перечитываются из кэша
+    не чаще раза в MEMORY_DIAGNOSTICS_POLL_SECONDS.
+    """
+    now = time.monotonic()
+    if now < _state.next_poll:
+        return _state.enabled
+    with _state.lock:
+        if now >= _state.next_poll:
+            _state.next_poll = now + settings.MEMORY_DIAGNOSTICS_POLL_SECONDS
+            apply_flags(store().get_many([ENABLED_KEY, SNAPSHOT_KEY]))
+    return _state.enabled
+
+
+def route_stats(route):
+    return _state.routes.setdefault(route, {
+        'requests': 0,
+        'skipped': 0,
+        'allocated_max': 0,
+        'allocated_total': 0,
+        'rows_max': 0,
+        'largest_query': None,
+    })
+
+
+def record_skipped(route):
+    with _state.lock:
+        route_stats(route)['skipped'] += 1
+
+
+def record_route(route, allocated, recorder):
+    with _state.lock:
+        stats = route_stats(route)
+        stats['requests'] += 1
+        stats['allocated_max'] = max(stats['allocated_max'], allocated)
+        stats['allocated_total'] += allocated
+        if recorder.rows_max > stats['rows_max']:
+            stats['rows_max'] = recorder.rows_max
+            stats['largest_query'] = recorder.largest_query
+
+
+class RowCountRecorder:
+    """execute_wrapper, запоминающий самый большой результат запроса."""
+
+    def __init__(self):
+        self.rows_max = 0
+        self.largest_query = None
+
+    def __call__(self, execute, sql, params, many, context):
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record(sql, context['cursor'].rowcount)
+
+    def record(self, sql, rowcount):
+        if rowcount > self.rows_max:
+            self.rows_max = rowcount
+            self.largest_query = sql[:300]
+
+
+def api_route(request):
+    match = request.resolver_match
+    route = match and match.view_name
+    if route and route.startswith('api:'):
+        return route
+    return None
+
+
+class MemoryDiagnosticsMiddleware:
+    """Собирает статистику памяти по маршрутам api/, когда она включена."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not poll():
+            return self.get_response(request)
+        if not _state.measuring.acquire(blocking=False):
+            try:
+                return self.get_response(request)
+            finally:
+                self.skip(request)
+        try:
+            return self.measure(request)
+        finally:
+            _state.measuring.release()
+
+    def measure(self, request):
+        before = tracemalloc.get_traced_memory()[0]
+        if MEASURES_PEAK:
+            tracemalloc.reset_peak()
+        recorder = RowCountRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            try:
+                return self.get_response(request)
+            finally:
+                self.record(request, before, recorder)
+
+    def skip(self, request):
+        route = api_route(request)
+        if route:
+            record_skipped(route)
+
+    def record(self, request, before, recorder):
+        current, peak = tracemalloc.get_traced_memory()
+        route = api_route(request)
+        if route:
+            allocated = (peak if MEASURES_PEAK else current) - before
+            record_route(route, max(allocated, 0), recorder)
@@ -0,0 +1,50 @@
+from django.conf import settings
+from rest_framework import permissions
+
+from api_yamdb.db_router import (
+    is_pinned_to_primary, pin_to_primary, set_read_replica,
+)
+from reviews.deletion import schedule_deletion
+
+
+class ReplicaReadMixin:
+    """
+    Читающие запросы (SAFE_METHODS) выполняются на репликах базы данных.
+    После успешной записи пользователь на короткое время закрепляется
+    за основной базой.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            set_read_replica(False)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        set_read_replica(
+            request.method in permissions.SAFE_METHODS
+            and not is_pinned_to_primary(request.user)
+        )
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if (
+            request.method not in permissions.SAFE_METHODS
+            and response.status_code < 400
+            and request.user.is_authenticated
+        ):
+            pin_to_primary(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class DeferredDestroyMixin:
+    """
+    При DEFERRED_DELETION объект только скрывается, а зависимые записи
+    удаляет команда purge_deleted.
+    """
+
+    def perform_destroy(self, instance):
+        if settings.DEFERRED_DELETION:
+            schedule_deletion(instance)
+        else:
+            super().perform_destroy(instance)
@@ -0,0 +1,274 @@
+import hashlib
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    BasePagination, CursorPagination, PageNumberPagination
+)
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from users.search import SEARCH_ORDERING
+
+
+def estimated_count(queryset):
+    """
+    Одним запросом к PostgreSQL возвращает пару (count, is_approximate):
+    оценку числа строк всей таблицы из статистики планировщика, если она
+    не меньше APPROXIMATE_COUNT_THRESHOLD, иначе точный COUNT queryset.
+    Подзапрос COUNT стоит в ветке CASE и выполняется, только когда оценка
+    мала или статистики ещё нет. Для других СУБД возвращает None.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    counted = queryset.order_by().values('pk').query
+    count_sql, count_params = counted.get_compiler(
+        connection=connection
+    ).as_sql()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint, CASE WHEN reltuples < %s THEN '
+            f'(SELECT COUNT(*) FROM ({count_sql}) AS counted) END '
+            'FROM pg_class WHERE oid = %s::regclass',
+            [
+                settings.APPROXIMATE_COUNT_THRESHOLD,
+                *count_params,
+                connection.ops.quote_name(queryset.model._meta.db_table),
+            ],
+        )
+        estimate, count = cursor.fetchone()
+    if count is None:
+        return estimate, True
+    return count, False
+
+
+def count_cache_key(queryset):
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.md5(f'{sql}{params}'.encode()).hexdigest()
+    return f'count:{queryset.db}:{digest}'
+
+
+def get_count(queryset, view=None):
+    """
+    Возвращает пару (count, is_approximate). Источники по порядку:
+    поддерживаемый счётчик представления (get_maintained_count), точный
+    COUNT из кэша (COUNT_CACHE_TIMEOUT секунд), для запросов без фильтров
+    (или когда представление считает запрос нефильтрованным,
+    is_unfiltered_request) - оценка планировщика по большой таблице из
+    estimated_count и, наконец, COUNT(*). Приблизительной считается
+    только оценка планировщика. Оценка берётся для всей таблицы, поэтому
+    запрос с условиями базового queryset представления (например,
+    is_active у пользователей) получает её, только если представление
+    объявляет is_unfiltered_request.
+    """
+    maintained_count = getattr(view, 'get_maintained_count', None)
+    if maintained_count is not None:
+        count = maintained_count()
+        if count is not None:
+            return count, False
+    key = count_cache_key(queryset)
+    count = cache.get(key)
+    if count is not None:
+        return count, False
+    counted = None
+    is_unfiltered = getattr(view, 'is_unfiltered_request', None)
+    if not queryset.query.where or (is_unfiltered and is_unfiltered()):
+        counted = estimated_count(queryset)
+    if counted is None:
+        counted = queryset.count(), False
+    count, is_approximate = counted
+    if not is_approximate:
+        cache.set(key, count, settings.COUNT_CACHE_TIMEOUT)
+    return counted
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор для админки: количество объектов берётся через get_count,
+    то есть из оценки планировщика или кэша, а не отдельным COUNT(*).
+    """
+
+    @cached_property
+    def count(self):
+        return get_count(self.object_list)[0]
+
+
+class ApproximateCountPage(Page):
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class ApproximateCountPaginator(Paginator):
+    """
+    Пагинатор, который не полагается на точное количество объектов.
+    Страница выбирается с одной лишней строкой, поэтому наличие следующей
+    страницы известно без COUNT, а номер страницы не ограничивается
+    оценкой.
+    """
+
+    def __init__(self, object_list, per_page, view=None):
+        super().__init__(object_list, per_page)
+        self.view = view
+        self.seen = 0
+        self.is_approximate = False
+
+    @cached_property
+    def count(self):
+        count, self.is_approximate = get_count(self.object_list, self.view)
+        return max(count, self.seen)
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise EmptyPage('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('That page contains no results')
+        self.seen = bottom + len(rows)
+        return ApproximateCountPage(
+            rows[:self.per_page], number, self,
+            has_next=len(rows) > self.per_page,
+        )
+
+
+class ApproximateCountPagination(PageNumberPagination):
+    """
+    Постраничная пагинация с дешёвым подсчётом количества объектов.
+    В ответ добавляется поле count_is_approximate.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = ApproximateCountPaginator(queryset, page_size, view)
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except EmptyPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            raise NotFound(msg)
+
+        self.request = request
+        return list(self.page)
+
+    def get_paginated_response(self, data):
+        paginator = self.page.paginator
+        return Response(OrderedDict([
+            ('count', paginator.count),
+            ('count_is_approximate', paginator.is_approximate),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_is_approximate'] = {
+            'type': 'boolean',
+        }
+        return response_schema
+
+
+class AuthorActivityPagination(CursorPagination):
+    """
+    Курсорная пагинация лент отзывов и комментариев автора. Порядок
+    совпадает с индексами (author, -pub_date, -id), поэтому каждая
+    страница читается по индексу без OFFSET и COUNT.
+    """
+    ordering = ('-pub_date', '-id')
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset-пагинация по полям ordering, которые все возрастают. Курсор
+    хранит значения этих полей у последней строки страницы, и следующая
+    страница выбирается условием «кортеж полей больше курсора» без OFFSET.
+    В отличие от CursorPagination, позиция задаётся всеми полями, а не
+    только первым, поэтому повторяющиеся значения ранга не копят смещение.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор'
+    ordering = ()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.after(position))
+        rows = list(queryset[:self.page_size + 1])
+        self.page = rows[:self.page_size]
+        self.has_next = len(rows) > self.page_size
+        return self.page
+
+    def after(self, position):
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            equal = dict(zip(self.ordering[:index], position[:index]))
+            condition |= Q(**equal, **{f'{field}__gt': position[index]})
+        return condition
+
+    def encode_cursor(self, row):
+        values = [getattr(row, field) for field in self.ordering]
+        return urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            position = json.loads(urlsafe_b64decode(encoded.encode()))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or (
+            len(position) != len(self.ordering)
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.page[-1]),
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+
+class UserSearchPagination(KeysetPagination):
+    """Страницы поиска пользователей в порядке ранга, см. users/search.py."""
+    ordering = SEARCH_ORDERING
@@ -0,0 +1,114 @@
+"""
+Быстрое представление страниц списков без ModelSerializer.
+
+Функции принимают уже отфильтрованный и упорядоченный queryset, выбирают
+только нужные колонки через values() и собирают словари в том же виде и
+порядке полей, что и соответствующие сериализаторы.
+"""
+from rest_framework import serializers
+
+from reviews.models import Title
+
+_datetime_field = serializers.DateTimeField()
+
+TITLE_VALUES = (
+    'id', 'name', 'description', 'year',
+    'category__name', 'category__slug', 'rating',
+)
+REVIEW_VALUES = ('id', 'text', 'author__username', 'score', 'pub_date')
+COMMENT_VALUES = ('id', 'text', 'author__username', 'pub_date')
+AUTHOR_REVIEW_VALUES = REVIEW_VALUES + ('title_id', 'title__name')
+AUTHOR_COMMENT_VALUES = COMMENT_VALUES + (
+    'review_id', 'review__title_id', 'review__title__name',
+)
+
+
+def title_values(queryset):
+    """Queryset строк для title_rows, который можно пагинировать."""
+    return queryset.values(*TITLE_VALUES)
+
+
+def title_rows(rows):
+    """Повторяет вывод TitleReadSerializer для страницы title_values."""
+    genres = {row['id']: [] for row in rows}
+    through = Title.genre.through.objects.filter(
+        title_id__in=genres.keys()
+    ).order_by('genre_id').values_list(
+        'title_id', 'genre__name', 'genre__slug'
+    )
+    for title_id, name, slug in through:
+        genres[title_id].append({'name': name, 'slug': slug})
+    return [
+        {
+            'id': row['id'],
+            'name': row['name'],
+            'description': row['description'],
+            'year': row['year'],
+            'genre': genres[row['id']],
+            'category': {
+                'name': row['category__name'],
+                'slug': row['category__slug'],
+            },
+            'rating': (
+                None if row['rating'] is None else int(row['rating'])
+            ),
+        }
+        for row in rows
+    ]
+
+
+def review_values(queryset):
+    """Queryset строк для review_rows, который можно пагинировать."""
+    return queryset.values(*REVIEW_VALUES)
+
+
+def review_rows(rows):
+    """Повторяет вывод ReviewSerializer для страницы review_values."""
+    to_representation = _datetime_field.to_representation
+    return [
+        {
+            'id': row['id'],
+            'text': row['text'],
+            'author': row['author__username'],
+            'score': row['score'],
+            'pub_date': to_representation(row['pub_date']),
+        }
+        for row in rows
+    ]
+
+
+def comment_rows(rows):
+    """Повторяет вывод CommentSerializer для строк COMMENT_VALUES."""
+    to_representation = _datetime_field.to_representation
+    return [
+        {
+            'id': row['id'],
+            'text': row['text'],
+            'author': row['author__username'],
+            'pub_date': to_representation(row['pub_date']),
+        }
+        for row in rows
+    ]
+
+
+def author_review_rows(rows):
+    """Отзывы автора вместе с произведением, строки AUTHOR_REVIEW_VALUES."""
+    reviews = review_rows(rows)
+    for review, row in zip(reviews, rows):
+        review['title'] = {'id': row['title_id'], 'name': row['title__name']}
+    return reviews
+
+
+def author_comment_rows(rows):
+    """
+    Комментарии автора вместе с отзывом и произведением,
+    строки AUTHOR_COMMENT_VALUES.
+    """
+    comments = comment_rows(rows)
+    for comment, row in zip(comments, rows):
+        comment['review'] = row['review_id']
+        comment['title'] = {
+            'id': row['review__title_id'],
+            'name': row['review__title__name'],
+        }
+    return comments
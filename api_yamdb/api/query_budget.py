@@ -0,0 +1,189 @@
+"""
+Бюджеты SQL-запросов для маршрутов API.
+
+QUERY_BUDGETS задаёт максимальное количество запросов для каждого маршрута
+из api/urls.py. Бюджет не должен зависеть от размера страницы: списки
+обязаны укладываться в него при любом page_size. Запросы с параметрами
+из BUDGET_PARAMS, добавляющими фиксированное число запросов, проверяются
+по отдельным ключам вида 'api:titles-list:facets', а бюджет самого
+маршрута остаётся прежним. Маршрутам, которые обрабатывают объекты
+порциями, BATCH_QUERY_BUDGETS добавляет бюджет на каждую порцию:
+их число view сообщает через record_batches. В тестах бюджет
+проверяется через assert_query_budget, при разработке - через
+QueryBudgetMiddleware (включается переменной QUERY_BUDGETS_ENABLED).
+"""
+import logging
+import os
+import traceback
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUDGETS = {
+    'api:categories-list': 2,
+    'api:categories-detail': 4,
+    'api:genres-list': 2,
+    'api:genres-detail': 4,
+    'api:titles-list': 3,
+    'api:titles-list:expand': 5,
+    'api:titles-list:facets': 6,
+    'api:titles-list:expand:facets': 8,
+    'api:titles-detail': 3,
+    'api:titles-detail:expand': 5,
+    'api:titles-top': 3,
+    'api:titles-trending': 3,
+    'api:reviews-list': 2,
+    'api:reviews-list:expand': 3,
+    'api:reviews-detail': 2,
+    'api:reviews-detail:expand': 3,
+    'api:reviews-mine': 6,
+    'api:comments-list': 3,
+    'api:comments-detail': 2,
+    'api:users-list': 2,
+    'api:users-detail': 1,
+    'api:users-current-user': 2,
+    'api:users-my-reviews': 2,
+    'api:users-my-comments': 2,
+    'api:users-reviews': 3,
+    'api:users-comments': 3,
+    'api:users-search': 2,
+    'api:signup': 4,
+    'api:token': 1,
+    'api:token-refresh': 1,
+    'api:reset': 1,
+    'api:moderation': 5,
+}
+
+
+BATCH_QUERY_BUDGETS = {
+    'api:moderation': 5,
+}
+
+
+BUDGET_PARAMS = ('expand', 'facets')
+
+
+def budget_route(route, params):
+    """
+    Ключ бюджета для маршрута route с параметрами запроса params:
+    к имени маршрута добавляются переданные параметры из BUDGET_PARAMS,
+    если для такого сочетания задан отдельный бюджет.
+    """
+    variant = ':'.join(
+        (route, *(name for name in BUDGET_PARAMS if params.get(name)))
+    )
+    return variant if variant in QUERY_BUDGETS else route
+
+
+def record_batches(request, batches):
+    """Запоминает, сколько порций обработал запрос к маршруту."""
+    getattr(request, '_request', request).query_batches = batches
+
+
+def route_budget(route, batches=0):
+    return QUERY_BUDGETS[route] + BATCH_QUERY_BUDGETS.get(route, 0) * batches
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryRecorder:
+    """Собирает выполненные запросы вместе со стеком вызова."""
+
+    def __init__(self):
+        self.queries = []
+        self.batches = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((sql, project_stack()))
+        return execute(sql, params, many, context)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def report(self, route, budget):
+        lines = [
+            f'Маршрут {route}: выполнено запросов {len(self)}, '
+            f'бюджет {budget}.'
+        ]
+        repeated = Counter(sql for sql, _ in self.queries)
+        stacks = dict(reversed(self.queries))
+        for sql, times in repeated.most_common():
+            if times < 2:
+                break
+            lines.append(f'{times} x {sql}')
+            lines.extend(f'    {line}' for line in stacks[sql])
+        if len(lines) == 1:
+            lines.extend(f'{sql}' for sql, _ in self.queries)
+        return '\n'.join(lines)
+
+
+def project_stack():
+    """Кадры стека из кода проекта, без библиотек."""
+    return [
+        f'{frame.filename}:{frame.lineno} in {frame.name}'
+        for frame in traceback.extract_stack()[:-2]
+        if frame.filename.startswith(os.path.dirname(settings.BASE_DIR))
+        and 'site-packages' not in frame.filename
+        and os.path.basename(frame.filename) != 'query_budget.py'
+    ]
+
+
+@contextmanager
+def record_queries():
+    recorder = QueryRecorder()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield recorder
+
+
+@contextmanager
+def assert_query_budget(route, budget=None):
+    """
+    Падает с отчётом о повторяющихся запросах, если внутри блока
+    выполнено больше запросов, чем разрешено маршруту route. Для
+    маршрутов из BATCH_QUERY_BUDGETS число порций задаётся в
+    recorder.batches внутри блока.
+    """
+    with record_queries() as recorder:
+        yield recorder
+    if budget is None:
+        budget = route_budget(route, recorder.batches)
+    if len(recorder) > budget:
+        raise QueryBudgetExceeded(recorder.report(route, budget))
+
+
+class QueryBudgetMiddleware:
+    """
+    Middleware для разработки: проверяет бюджет каждого запроса к API и
+    пишет отчёт в лог или, при QUERY_BUDGETS_RAISE, выбрасывает исключение.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with record_queries() as recorder:
+            try:
+                return self.get_response(request)
+            finally:
+                self.check_budget(request, recorder)
+
+    def check_budget(self, request, recorder):
+        match = request.resolver_match
+        route = match and budget_route(match.view_name, request.GET)
+        if route not in QUERY_BUDGETS:
+            return
+        budget = route_budget(route, getattr(request, 'query_batches', 0))
+        if len(recorder) <= budget:
+            return
+        report = recorder.report(route, budget)
+        if settings.QUERY_BUDGETS_RAISE:
+            raise QueryBudgetExceeded(report)
+        logger.warning(report)
@@ -0,0 +1,46 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer, который кодирует ответ через orjson, если он установлен.
+    Результат побайтно совпадает с JSONRenderer: даты, Decimal и ленивые
+    строки кодируются стандартным энкодером DRF, а U+2028/U+2029
+    экранируются так же. Если orjson не справляется с данными (например,
+    ключи словаря не строки) или запрошен отступ, используется
+    стандартный путь.
+    Числа с плавающей точкой вне диапазона [1e-4, 1e16) orjson записывает
+    иначе, поэтому рендерер подключается только к эндпоинтам, в ответах
+    которых таких чисел нет.
+    """
+    if orjson is not None:
+        options = orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        if (
+            orjson is None or indent is not None
+            or self.ensure_ascii or not self.compact
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=self.options,
+            )
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace(
+            '\u2028'.encode(), b'\\u2028'
+        ).replace(
+            '\u2029'.encode(), b'\\u2029'
+        )
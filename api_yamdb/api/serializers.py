@@ -1,11 +1,21 @@
 import datetime
 
+from django.contrib.auth.validators import UnicodeUsernameValidator
 from rest_framework import serializers
+from rest_framework.exceptions import NotFound
+from rest_framework.settings import api_settings
 from rest_framework.validators import UniqueValidator
 
 from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.moderation import DELETE, HIDE
 from users.models import User
 
+USERNAME_TAKEN_MESSAGE = 'Username должен быть уникальным'
+EMAIL_TAKEN_MESSAGE = 'Email должен быть уникальным'
+DUPLICATE_REVIEW_MESSAGE = (
+    'У автора может быть лишь один отызв на одно произведение!'
+)
+
 
 class CommentSerializer(serializers.ModelSerializer):
     """Сериализатор для модели Comment."""
@@ -76,6 +86,22 @@ class TitleReadSerializer(serializers.ModelSerializer):
         return year
 
 
+class TitleRankingSerializer(TitleReadSerializer):
+    """
+    Сериализатор для рейтингов произведений.
+    Показатели берутся из предрасчитанной таблицы TitleStat.
+    """
+    reviews_count = serializers.IntegerField(source='stat.reviews_count')
+    recent_reviews_count = serializers.IntegerField(
+        source='stat.recent_reviews_count'
+    )
+
+    class Meta(TitleReadSerializer.Meta):
+        fields = TitleReadSerializer.Meta.fields + (
+            'reviews_count', 'recent_reviews_count',
+        )
+
+
 class ReviewSerializer(serializers.ModelSerializer):
     """Сериализатор для модели Review."""
     author = serializers.ReadOnlyField(source='author.username')
@@ -84,23 +110,21 @@ class ReviewSerializer(serializers.ModelSerializer):
         model = Review
         fields = ('id', 'text', 'author', 'score', 'pub_date',)
 
-    def validate(self, data):
+    def create(self, validated_data):
         """
-        Метод проверяет существует ли ревью на данное произведение от данного
-        ревьюера. Возвращает провалидированные данные, если ревьюер дал первый
-        отзыв. Иначе возвращает исключение.
+        Отзыв создаётся одним запросом, который не вставляет строку, если
+        у автора уже есть отзыв на это произведение. В этом случае, в том
+        числе при одновременных запросах, возвращается ошибка валидации.
         """
-        author = self.context.get('request').user
-        title_id = (
-            self.context.get('request').parser_context.get('kwargs')
-                .get('title_id')
-        )
-        if self.context.get('request').method == 'POST':
-            if Review.objects.filter(author=author, title=title_id).exists():
-                raise serializers.ValidationError(
-                    'У автора может быть лишь один отызв на одно произведение!'
-                )
-        return data
+        try:
+            review = Review.objects.insert_unique(**validated_data)
+        except Title.DoesNotExist:
+            raise NotFound
+        if review is None:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [DUPLICATE_REVIEW_MESSAGE]
+            })
+        return review
 
 
 class CodeResetSerializer(serializers.Serializer):
@@ -119,7 +143,7 @@ class UserSerializer(serializers.ModelSerializer):
         validators=(
             UniqueValidator(
                 queryset=User.objects.all(),
-                message="Username должен быть уникальным"
+                message=USERNAME_TAKEN_MESSAGE
             ),
         ),
     )
@@ -127,7 +151,7 @@ class UserSerializer(serializers.ModelSerializer):
         validators=(
             UniqueValidator(
                 queryset=User.objects.all(),
-                message='Email должен быть уникальным'
+                message=EMAIL_TAKEN_MESSAGE
             ),
         ),
     )
@@ -147,11 +171,25 @@ class UserSerializer(serializers.ModelSerializer):
         return username
 
 
-class RegisterUserSerializer(UserSerializer):
-    """Сериализатор для модели User для регистрации нового пользователя."""
-    class Meta:
-        model = User
-        fields = ('email', 'username',)
+class RegisterUserSerializer(serializers.Serializer):
+    """
+    Сериализатор для регистрации нового пользователя.
+    Уникальность username и email проверяется в signup одним запросом,
+    поэтому здесь проверяется только формат полей.
+    """
+    email = serializers.EmailField(max_length=254)
+    username = serializers.CharField(
+        max_length=150,
+        validators=(UnicodeUsernameValidator(),),
+    )
+
+    def validate_username(self, username):
+        """Метод проверяет, что имя пользователя не равно "me"."""
+        if username == 'me':
+            raise serializers.ValidationError(
+                "Имя пользователя 'me' запрещено!"
+            )
+        return username
 
 
 class AccessTokenSerializer(serializers.Serializer):
@@ -162,3 +200,60 @@ class AccessTokenSerializer(serializers.Serializer):
     class Meta:
         model = User
         fields = ('username', 'confirmation_code',)
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    """Сериализатор для обмена refresh-токена на новую пару токенов."""
+    refresh = serializers.CharField(required=True)
+
+
+class ModerationSerializer(serializers.Serializer):
+    """
+    Сериализатор запроса массовой модерации: объекты выбираются списком
+    ids и/или фильтрами author, title, since, until.
+    """
+    target = serializers.ChoiceField(choices=('reviews', 'comments'))
+    action = serializers.ChoiceField(choices=(HIDE, DELETE))
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False, allow_empty=False,
+    )
+    author = serializers.SlugRelatedField(
+        slug_field='username', queryset=User.objects.all(), required=False
+    )
+    title = serializers.IntegerField(min_value=1, required=False)
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+
+    SELECTORS = ('ids', 'author', 'title', 'since', 'until')
+
+    def validate(self, data):
+        if not any(name in data for name in self.SELECTORS):
+            raise serializers.ValidationError(
+                'Укажите ids или хотя бы один фильтр.'
+            )
+        if data['target'] == 'comments' and data['action'] == HIDE:
+            raise serializers.ValidationError(
+                {'action': 'Комментарии можно только удалить.'}
+            )
+        return data
+
+    def get_queryset(self):
+        data = self.validated_data
+        if data['target'] == 'reviews':
+            queryset = Review.objects.all()
+            title_field = 'title_id'
+        else:
+            queryset = Comment.objects.all()
+            title_field = 'review__title_id'
+        lookups = {
+            'ids': 'pk__in',
+            'author': 'author',
+            'title': title_field,
+            'since': 'pub_date__gte',
+            'until': 'pub_date__lt',
+        }
+        return queryset.filter(**{
+            lookup: data[field] for field, lookup in lookups.items()
+            if field in data
+        })
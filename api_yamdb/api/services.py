@@ -1,6 +1,11 @@
 from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
 from django.core.mail import send_mail
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from users.models import User
+from .serializers import EMAIL_TAKEN_MESSAGE, USERNAME_TAKEN_MESSAGE
 
 
 def send_confirmation_code(user):
@@ -14,3 +19,38 @@ def send_confirmation_code(user):
         settings.ADMIN_EMAIL,
         [user.email]
     )
+
+
+def find_conflicts(username, email):
+    return list(
+        User.objects.filter(Q(username=username) | Q(email=email))[:2]
+    )
+
+
+def resolve_signup(username, email):
+    """
+    Находит или создаёт пользователя для регистрации одним запросом
+    на чтение. Возвращает пару (user, errors): повторная регистрация
+    с той же парой username и email возвращает существующего пользователя,
+    а занятые другим пользователем username или email - ошибки. Если
+    пользователя создал одновременный запрос, конфликт ищется заново
+    по обоим полям.
+    """
+    users = find_conflicts(username, email)
+    if not users:
+        try:
+            with transaction.atomic():
+                return User.objects.create(
+                    username=username, email=email
+                ), {}
+        except IntegrityError:
+            users = find_conflicts(username, email)
+    errors = {}
+    for user in users:
+        if user.username == username and user.email == email:
+            return user, {}
+        if user.username == username:
+            errors['username'] = [USERNAME_TAKEN_MESSAGE]
+        if user.email == email:
+            errors['email'] = [EMAIL_TAKEN_MESSAGE]
+    return None, errors
@@ -0,0 +1,95 @@
+"""
+Выдача и обновление JWT с ротацией refresh-токенов.
+
+Каждый refresh-токен обменивается на новую пару токенов один раз: его jti
+записывается в таблицу UsedRefreshToken, общую для всех воркеров, одним
+запросом INSERT ... SELECT ... ON CONFLICT DO NOTHING, который вставляет
+строку, только если владелец токена существует и активен. Из двух
+одновременных обменов одного токена строку вставляет только один, второй
+получает отказ, как и токен неактивного пользователя. Если база
+недоступна, обмен завершается ошибкой и токен не принимается.
+
+Записи нужны только до истечения токена. В PostgreSQL тот же запрос
+удаляет истёкшие записи (DELETE в WITH), так что таблица не растёт;
+на других СУБД их удаляет команда purge_used_tokens.
+"""
+from datetime import datetime
+
+from django.db import connections, router
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from users.models import UsedRefreshToken, User
+
+TOKEN_REJECTED_MESSAGE = (
+    'Refresh-токен уже использован или пользователь неактивен'
+)
+
+
+def blacklist(token):
+    """
+    Запоминает токен как использованный. Возвращает False, если токен
+    уже был использован или его владелец не найден или неактивен.
+    """
+    connection = connections[router.db_for_write(UsedRefreshToken)]
+    qn = connection.ops.quote_name
+    used = UsedRefreshToken._meta
+    user_id = User._meta.get_field(api_settings.USER_ID_FIELD)
+    is_active = User._meta.get_field('is_active')
+    sql = (
+        f'INSERT INTO {qn(used.db_table)} ({qn("jti")}, {qn("expires")}) '
+        f'SELECT %s, %s WHERE EXISTS ('
+        f'SELECT 1 FROM {qn(User._meta.db_table)} '
+        f'WHERE {qn(user_id.column)} = %s AND {qn(is_active.column)} = %s'
+        f') ON CONFLICT DO NOTHING'
+    )
+    expires = used.get_field('expires')
+    params = [
+        token[api_settings.JTI_CLAIM],
+        expires.get_db_prep_value(
+            datetime.fromtimestamp(token['exp'], timezone.utc), connection
+        ),
+        user_id.get_db_prep_value(
+            token[api_settings.USER_ID_CLAIM], connection
+        ),
+        is_active.get_db_prep_value(True, connection),
+    ]
+    if connection.vendor == 'postgresql':
+        sql = (
+            f'WITH purged AS (DELETE FROM {qn(used.db_table)} '
+            f'WHERE {qn("expires")} < %s) {sql}'
+        )
+        params.insert(
+            0, expires.get_db_prep_value(timezone.now(), connection)
+        )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount == 1
+
+
+def purge_used_tokens(now=None):
+    """Удаляет записи об истёкших токенах; возвращает их количество."""
+    deleted, _ = UsedRefreshToken.objects.filter(
+        expires__lt=now or timezone.now()
+    ).delete()
+    return deleted
+
+
+def token_pair(user):
+    refresh = RefreshToken.for_user(user)
+    return {'token': str(refresh.access_token), 'refresh': str(refresh)}
+
+
+def rotate(raw_token):
+    """Новая пара токенов в обмен на ещё не использованный refresh-токен."""
+    try:
+        token = RefreshToken(raw_token)
+    except TokenError as error:
+        raise InvalidToken(error.args[0])
+    if not blacklist(token):
+        raise InvalidToken(TOKEN_REJECTED_MESSAGE)
+    return token_pair(User(**{
+        api_settings.USER_ID_FIELD: token[api_settings.USER_ID_CLAIM]
+    }))
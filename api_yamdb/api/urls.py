@@ -3,7 +3,7 @@ from rest_framework import routers
 
 from .views import (
     CategoryViewSet, CommentViewSet, GenreViewSet, ReviewViewSet, TitleViewSet,
-    UserViewSet, code_reset, signup, token,
+    UserViewSet, code_reset, moderation, signup, token, token_refresh,
 )
 
 app_name = 'api'
@@ -25,10 +25,12 @@ router.register('users', UserViewSet, basename='users')
 auth_urls = [
     path('signup/', signup, name='signup'),
     path('token/', token, name='token'),
+    path('token/refresh/', token_refresh, name='token-refresh'),
     path('reset/', code_reset, name='reset'),
 ]
 
 urlpatterns = [
     path('v1/', include(router.urls)),
     path('v1/auth/', include(auth_urls)),
+    path('v1/moderation/', moderation, name='moderation'),
 ]
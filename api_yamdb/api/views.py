@@ -1,48 +1,139 @@
+from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
-from django.db.models import Avg
+from django.db.models import Avg, F, Q
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, permissions, mixins, viewsets, status
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import (
+    action, api_view, authentication_classes, permission_classes
+)
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import InvalidToken
 
+from reviews.deletion import pending_deletion
 from reviews.filters import TitleFilter
-from reviews.models import Category, Genre, Title, Review
-from users.models import User
+from reviews.moderation import moderate_comments, moderate_reviews
+from reviews.models import Category, Comment, Genre, Title, Review
+from users.models import CHOICES, User
+from users.search import search_users
+from .coalescing import coalesce
+from .expansions import (
+    REVIEW_EXPANSIONS, TITLE_EXPANSIONS, expand_comments, expand_reviews,
+    parse_expand,
+)
+from .facets import FACETS, facet_counts
+from .idempotency import idempotent
+from .mixins import DeferredDestroyMixin, ReplicaReadMixin
+from .pagination import (
+    ApproximateCountPagination, AuthorActivityPagination, UserSearchPagination,
+)
 from .permissions import IsAdminRole, IsModeratorRole, IsAuthor
+from .projections import (
+    AUTHOR_COMMENT_VALUES, AUTHOR_REVIEW_VALUES, author_comment_rows,
+    author_review_rows, review_rows, review_values, title_rows, title_values,
+)
+from .query_budget import record_batches
+from .renderers import FastJSONRenderer
 from .serializers import (
     CategorySerializer, GenreSerializer, TitleSerializer, ReviewSerializer,
-    CommentSerializer, TitleReadSerializer,
+    CommentSerializer, TitleReadSerializer, TitleRankingSerializer,
     UserSerializer, RegisterUserSerializer, AccessTokenSerializer,
-    CodeResetSerializer,
+    CodeResetSerializer, ModerationSerializer, RefreshTokenSerializer,
 )
-from .services import send_confirmation_code
+from .services import resolve_signup, send_confirmation_code
+from .tokens import rotate, token_pair
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(
+    ReplicaReadMixin, DeferredDestroyMixin, viewsets.ModelViewSet
+):
     """
     Доступные эндпоинты:
     /titles/{title_id}/reviews/ - GET, POST;
-    /titles/{title_id}/reviews/{review_id}/ - GET, PATCH, DELETE.
+    /titles/{title_id}/reviews/{review_id}/ - GET, PATCH, DELETE;
+    /titles/{title_id}/reviews/mine/ - PUT.
+    Первые комментарии к отзывам - expand=comments.
     """
     serializer_class = ReviewSerializer
     permission_classes = (IsAdminRole | IsModeratorRole | IsAuthor,)
-    pagination_class = PageNumberPagination
+    pagination_class = ApproximateCountPagination
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
+
+    def get_title(self):
+        if not hasattr(self, '_title'):
+            self._title = get_object_or_404(
+                Title.objects.select_related('stat'),
+                pk=self.kwargs.get('title_id'), is_hidden=False
+            )
+        return self._title
 
     def get_queryset(self):
-        title = get_object_or_404(Title, pk=self.kwargs.get('title_id'))
-        return title.reviews.all()
+        return self.get_title().reviews.filter(
+            is_hidden=False, author__is_active=True
+        ).select_related('author')
+
+    def get_maintained_count(self):
+        """Количество отзывов берётся из счётчика TitleStat."""
+        stat = getattr(self.get_title(), 'stat', None)
+        return stat.reviews_count if stat is not None else None
+
+    @staticmethod
+    def expand(reviews, expand):
+        if 'comments' in expand:
+            expand_comments(reviews)
+        return reviews
+
+    @coalesce
+    def list(self, request, *args, **kwargs):
+        expand = parse_expand(request, REVIEW_EXPANSIONS)
+        queryset = review_values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(self.expand(review_rows(list(queryset)), expand))
+        return self.get_paginated_response(
+            self.expand(review_rows(page), expand)
+        )
+
+    @coalesce
+    def retrieve(self, request, *args, **kwargs):
+        expand = parse_expand(request, REVIEW_EXPANSIONS)
+        response = super().retrieve(request, *args, **kwargs)
+        self.expand([response.data], expand)
+        return response
 
     def perform_create(self, serializer):
-        title = get_object_or_404(Title, pk=self.kwargs.get('title_id'))
-        serializer.save(author=self.request.user, title=title)
+        serializer.save(
+            author=self.request.user, title_id=self.kwargs.get('title_id')
+        )
+
+    @action(detail=False, methods=['PUT'], url_path='mine')
+    def mine(self, request, title_id=None):
+        """
+        Дополнительный эндпоинт:
+        /titles/{title_id}/reviews/mine/ - PUT;
+        Идемпотентно создаёт или обновляет отзыв текущего пользователя.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            review, created = Review.objects.update_or_insert(
+                author=request.user, title_id=title_id,
+                **serializer.validated_data
+            )
+        except Title.DoesNotExist:
+            raise NotFound
+        return Response(
+            self.get_serializer(review).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """
     Доступные эндпоинты:
     /titles/{title_id}/reviews/{review_id}/comments/ - GET, POST;
@@ -51,41 +142,126 @@ class CommentViewSet(viewsets.ModelViewSet):
     """
     serializer_class = CommentSerializer
     permission_classes = (IsAdminRole | IsModeratorRole | IsAuthor,)
+    pagination_class = ApproximateCountPagination
 
-    def get_queryset(self):
-        review = get_object_or_404(
+    def get_review(self):
+        return get_object_or_404(
             Review, title__id=self.kwargs.get('title_id'),
-            pk=self.kwargs.get('review_id')
+            pk=self.kwargs.get('review_id'),
+            is_hidden=False, title__is_hidden=False, author__is_active=True,
         )
-        return review.comments.all()
+
+    def get_queryset(self):
+        return self.get_review().comments.filter(
+            author__is_active=True
+        ).select_related('author')
 
     def perform_create(self, serializer):
-        review = get_object_or_404(
-            Review, title__id=self.kwargs.get('title_id'),
-            pk=self.kwargs.get('review_id')
-        )
-        serializer.save(author=self.request.user, review=review)
+        serializer.save(author=self.request.user, review=self.get_review())
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(
+    ReplicaReadMixin, DeferredDestroyMixin, viewsets.ModelViewSet
+):
     """
     Доступные эндпоинты:
     /titles/ - GET, POST;
-    /titles/{titles_id}/ - GET, PATCH, DELETE.
+    /titles/{titles_id}/ - GET, PATCH, DELETE;
+    /titles/top/ - GET;
+    /titles/trending/ - GET.
     Фильтрация по полям - name, genre, category, year.
+    Фасеты в ответе списка - facets=genre,category,year.
+    Первые отзывы и комментарии к ним - expand=reviews,reviews.comments.
     """
     queryset = Title.objects.all()
     serializer_class = TitleReadSerializer
-    pagination_class = PageNumberPagination
+    pagination_class = ApproximateCountPagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TitleFilter
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
 
     def get_queryset(self):
         return (
-            Title.objects.annotate(rating=Avg('reviews__score')).order_by('id')
+            Title.objects.filter(is_hidden=False).annotate(
+                rating=Avg('reviews__score', filter=Q(
+                    reviews__is_hidden=False, reviews__author__is_active=True
+                ))
+            ).order_by('id')
+        )
+
+    def is_unfiltered_request(self):
+        """
+        Скрытые произведения не учитываются при оценке количества, если
+        в запросе списка нет фильтров TitleFilter.
+        """
+        return self.action == 'list' and not any(
+            name in self.request.query_params
+            for name in self.filterset_class.base_filters
         )
 
+    def parse_facets(self):
+        """Список запрошенных фасетов из параметра facets=a,b."""
+        names = self.request.query_params.get('facets')
+        if not names:
+            return []
+        names = names.split(',')
+        unknown = [name for name in names if name not in FACETS]
+        if unknown:
+            raise ValidationError(
+                {'facets': f'Неизвестные фасеты: {", ".join(unknown)}.'}
+            )
+        return names
+
+    def get_facets(self, names):
+        """
+        Количество произведений по каждому значению фасетов names.
+        Счётчики фасета учитывают все фильтры запроса, кроме фильтра
+        по самому фасету, чтобы были видны и соседние значения.
+        """
+        facets = {}
+        for name in names:
+            data = self.request.query_params.copy()
+            data.pop(name, None)
+            queryset = self.filterset_class(
+                data, Title.objects.filter(is_hidden=False),
+                request=self.request,
+            ).qs
+            facets[name] = facet_counts(name, queryset)
+        return facets
+
+    @staticmethod
+    def expand(titles, expand):
+        if expand:
+            expand_reviews(
+                titles, with_comments='reviews.comments' in expand
+            )
+        return titles
+
+    @coalesce
+    def list(self, request, *args, **kwargs):
+        expand = parse_expand(request, TITLE_EXPANSIONS)
+        facets = self.parse_facets()
+        queryset = title_values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(self.expand(title_rows(list(queryset)), expand))
+        response = self.get_paginated_response(
+            self.expand(title_rows(page), expand)
+        )
+        if facets:
+            response.data['facets'] = self.get_facets(facets)
+        return response
+
+    @coalesce
+    def retrieve(self, request, *args, **kwargs):
+        expand = parse_expand(request, TITLE_EXPANSIONS)
+        response = super().retrieve(request, *args, **kwargs)
+        self.expand([response.data], expand)
+        return response
+
     def get_serializer_class(self):
+        if self.action in ('top', 'trending'):
+            return TitleRankingSerializer
         if self.request.method in permissions.SAFE_METHODS:
             return TitleReadSerializer
         return TitleSerializer
@@ -95,6 +271,54 @@ class TitleViewSet(viewsets.ModelViewSet):
             return (AllowAny(),)
         return (IsAdminRole(),)
 
+    def get_ranking_queryset(self):
+        return (
+            Title.objects.filter(is_hidden=False)
+            .select_related('category', 'stat')
+            .prefetch_related('genre')
+            .annotate(rating=F('stat__rating'))
+        )
+
+    def list_ranking(self, queryset):
+        page = self.paginate_queryset(self.filter_queryset(queryset))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, url_path='top')
+    def top(self, request):
+        """
+        Дополнительный эндпоинт:
+        /titles/top/ - GET;
+        Произведения с наибольшим рейтингом среди тех, у которых
+        не меньше min_reviews отзывов.
+        """
+        min_reviews = request.query_params.get(
+            'min_reviews', settings.TOP_RATED_MIN_REVIEWS
+        )
+        try:
+            min_reviews = int(min_reviews)
+        except (TypeError, ValueError):
+            raise ValidationError(
+                {'min_reviews': 'Ожидается целое число.'}
+            )
+        queryset = self.get_ranking_queryset().filter(
+            stat__reviews_count__gte=max(min_reviews, 1)
+        ).order_by('-stat__rating', '-stat__reviews_count', 'id')
+        return self.list_ranking(queryset)
+
+    @action(detail=False, url_path='trending')
+    def trending(self, request):
+        """
+        Дополнительный эндпоинт:
+        /titles/trending/ - GET;
+        Произведения с наибольшим числом отзывов за последние
+        TRENDING_WINDOW_DAYS дней.
+        """
+        queryset = self.get_ranking_queryset().filter(
+            stat__recent_reviews_count__gt=0
+        ).order_by('-stat__recent_reviews_count', 'id')
+        return self.list_ranking(queryset)
+
 
 class ListCreateDestroyViewSet(
     mixins.CreateModelMixin,
@@ -105,7 +329,7 @@ class ListCreateDestroyViewSet(
     pass
 
 
-class CategoryViewSet(ListCreateDestroyViewSet):
+class CategoryViewSet(ReplicaReadMixin, ListCreateDestroyViewSet):
     """
     Доступные эндпоинты
     /categories/ - GET, POST;
@@ -125,7 +349,7 @@ class CategoryViewSet(ListCreateDestroyViewSet):
         return (IsAdminRole(),)
 
 
-class GenreViewSet(ListCreateDestroyViewSet):
+class GenreViewSet(ReplicaReadMixin, ListCreateDestroyViewSet):
     """
     Доступные эндпоинты
     /genres/ - GET, POST;
@@ -145,20 +369,34 @@ class GenreViewSet(ListCreateDestroyViewSet):
         return (IsAdminRole(),)
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(DeferredDestroyMixin, viewsets.ModelViewSet):
     """
     Доступны эндпоинты
     /users/ - GET, POST;
-    /users/{username}/ - GET, PATCH, DELETE.
+    /users/{username}/ - GET, PATCH, DELETE;
+    /users/{username}/reviews/ - GET;
+    /users/{username}/comments/ - GET;
+    /users/search/ - GET.
     Поиск по полю - username.
     """
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    pagination_class = ApproximateCountPagination
     filter_backends = (filters.SearchFilter,)
     lookup_field = 'username'
     permission_classes = (IsAdminRole, )
     search_fields = ('username',)
 
+    def get_queryset(self):
+        """
+        Администратор видит и деактивированных пользователей. При
+        DEFERRED_DELETION скрыты только те, кто ждёт удаления.
+        """
+        queryset = super().get_queryset()
+        if not settings.DEFERRED_DELETION:
+            return queryset
+        return queryset.exclude(pk__in=pending_deletion(User))
+
     @action(
         detail=False, url_path='me', methods=['GET', 'PATCH'],
         permission_classes=(IsAuthenticated,),
@@ -180,22 +418,126 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer.save(role=user.role)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    def is_unfiltered_request(self):
+        """
+        Без поиска количество пользователей оценивается по всей таблице,
+        включая деактивированных.
+        """
+        return self.action == 'list' and not self.request.query_params.get(
+            filters.SearchFilter.search_param
+        )
+
+    @action(detail=False, url_path='search')
+    def search(self, request):
+        """
+        Дополнительный эндпоинт:
+        /users/search/?q=...&role=... - GET;
+        Поиск пользователей по префиксу username и похожим username
+        и email, см. users/search.py. Страницы - по курсору.
+        """
+        query = request.query_params.get('q', '').strip()
+        role = request.query_params.get('role')
+        errors = {}
+        if not query:
+            errors['q'] = 'Обязательный параметр.'
+        if role and role not in dict(CHOICES):
+            errors['role'] = f'Неизвестная роль: {role}.'
+        if errors:
+            raise ValidationError(errors)
+        paginator = UserSearchPagination()
+        page = paginator.paginate_queryset(
+            search_users(self.get_queryset(), query, role), request, view=self
+        )
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    def list_activity(self, queryset, rows):
+        paginator = AuthorActivityPagination()
+        page = paginator.paginate_queryset(queryset, self.request, view=self)
+        return paginator.get_paginated_response(rows(page))
+
+    @staticmethod
+    def author_reviews(author):
+        return Review.objects.filter(
+            author=author, is_hidden=False, title__is_hidden=False
+        ).values(*AUTHOR_REVIEW_VALUES)
+
+    @staticmethod
+    def author_comments(author):
+        return Comment.objects.filter(
+            author=author, review__is_hidden=False,
+            review__title__is_hidden=False,
+        ).values(*AUTHOR_COMMENT_VALUES)
+
+    @action(
+        detail=False, url_path='me/reviews',
+        permission_classes=(IsAuthenticated,),
+    )
+    def my_reviews(self, request):
+        """
+        Дополнительный эндпоинт:
+        /users/me/reviews/ - GET;
+        Отзывы текущего пользователя, новые сначала.
+        """
+        return self.list_activity(
+            self.author_reviews(request.user), author_review_rows
+        )
+
+    @action(
+        detail=False, url_path='me/comments',
+        permission_classes=(IsAuthenticated,),
+    )
+    def my_comments(self, request):
+        """
+        Дополнительный эндпоинт:
+        /users/me/comments/ - GET;
+        Комментарии текущего пользователя, новые сначала.
+        """
+        return self.list_activity(
+            self.author_comments(request.user), author_comment_rows
+        )
+
+    @action(detail=True, url_path='reviews')
+    def reviews(self, request, username=None):
+        """
+        Дополнительный эндпоинт:
+        /users/{username}/reviews/ - GET;
+        Отзывы пользователя, новые сначала.
+        """
+        return self.list_activity(
+            self.author_reviews(self.get_object()), author_review_rows
+        )
+
+    @action(detail=True, url_path='comments')
+    def comments(self, request, username=None):
+        """
+        Дополнительный эндпоинт:
+        /users/{username}/comments/ - GET;
+        Комментарии пользователя, новые сначала.
+        """
+        return self.list_activity(
+            self.author_comments(self.get_object()), author_comment_rows
+        )
+
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@idempotent
 def signup(request):
     """
     Эндпоинт:
     /auth/signup/ - POST;
-    Регистрация пользователя.
+    Регистрация пользователя. Повторная регистрация с теми же username
+    и email повторно отправляет код подтверждения.
     """
     serializer = RegisterUserSerializer(data=request.data)
-    if serializer.is_valid():
-        user = serializer.save()
-        """Сбросить код на строке 227"""
-        send_confirmation_code(user)
-        return Response(serializer.data, status=status.HTTP_200_OK)
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    user, errors = resolve_signup(**serializer.validated_data)
+    if errors:
+        return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+    send_confirmation_code(user)
+    return Response(serializer.data, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
@@ -211,19 +553,41 @@ def token(request):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     username = serializer.data['username']
-    user = get_object_or_404(User, username=username)
+    user = get_object_or_404(User, username=username, is_active=True)
     confirmation_code = serializer.data['confirmation_code']
     if not default_token_generator.check_token(user, confirmation_code):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    access_token = RefreshToken.for_user(user)
-    return Response(
-        {'token': str(access_token.access_token)}, status=status.HTTP_200_OK
-    )
+    return Response(token_pair(user), status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
+@authentication_classes([])
 @permission_classes([AllowAny])
+def token_refresh(request):
+    """
+    Эндпоинт:
+    /auth/token/refresh/ - POST;
+    Обменять refresh-токен на новую пару токенов, старый refresh-токен
+    после этого недействителен.
+    """
+    serializer = RefreshTokenSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        tokens = rotate(serializer.validated_data['refresh'])
+    except InvalidToken as error:
+        return Response(
+            error.detail,
+            status=status.HTTP_401_UNAUTHORIZED,
+            headers={'WWW-Authenticate': 'Bearer realm="api"'},
+        )
+    return Response(tokens, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+@idempotent
 def code_reset(request):
     """
     Эндпоинт:
@@ -234,7 +598,32 @@ def code_reset(request):
     if serializer.is_valid():
         username = serializer.data['username']
         email = serializer.data['email']
-        user = get_object_or_404(User, username=username, email=email)
+        user = get_object_or_404(
+            User, username=username, email=email, is_active=True
+        )
         send_confirmation_code(user)
         return Response(serializer.data, status=status.HTTP_200_OK)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminRole | IsModeratorRole])
+def moderation(request):
+    """
+    Эндпоинт:
+    /moderation/ - POST;
+    Массовое скрытие или удаление отзывов и удаление комментариев
+    по списку ids или фильтрам author, title, since, until. Права
+    проверяются один раз, объекты обрабатываются порциями.
+    """
+    serializer = ModerationSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    queryset = serializer.get_queryset()
+    if serializer.validated_data['target'] == 'reviews':
+        summary, batches = moderate_reviews(
+            queryset, serializer.validated_data['action']
+        )
+    else:
+        summary, batches = moderate_comments(queryset)
+    record_batches(request, batches)
+    return Response(summary, status=status.HTTP_200_OK)
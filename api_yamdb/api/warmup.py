@@ -0,0 +1,68 @@
+"""
+Прогрев приложения до приёма запросов, см. gunicorn.conf.py.
+
+warm_up_routes компилирует URL-маршруты и поля сериализаторов без
+обращения к базе: с preload_app это делается один раз в мастер-процессе,
+и воркеры получают готовые объекты через copy-on-write. warm_up_requests
+выполняет анонимные GET-запросы к основным маршрутам /api/ в каждом
+воркере: проверяет, что база доступна, и прогревает представления
+и рендереры. Соединение с базой этим не прогревается: соединения Django
+принадлежат потоку, а запросы gthread обслуживаются потоками пула,
+поэтому соединение главного потока сразу закрывается. Запросы прогрева
+не объединяются и не попадают в счётчики api/coalescing.py.
+"""
+import logging
+
+from django.db import DatabaseError, connections
+from django.test import RequestFactory
+from django.urls import get_resolver, resolve
+from rest_framework.serializers import BaseSerializer
+
+from . import serializers
+
+logger = logging.getLogger(__name__)
+
+WARM_UP_PATHS = (
+    '/api/v1/titles/',
+    '/api/v1/titles/0/',
+    '/api/v1/titles/0/reviews/',
+    '/api/v1/categories/',
+    '/api/v1/genres/',
+)
+
+
+def warm_up_routes():
+    """Заполняет кэши URL-резолвера и строит поля всех сериализаторов."""
+    get_resolver().reverse_dict
+    for path in WARM_UP_PATHS:
+        resolve(path)
+    for value in vars(serializers).values():
+        if (
+            isinstance(value, type)
+            and issubclass(value, BaseSerializer)
+            and value.__module__ == serializers.__name__
+        ):
+            value().fields
+
+
+def warm_up_requests():
+    """Выполняет GET-запросы к WARM_UP_PATHS в обход middleware."""
+    factory = RequestFactory()
+    for path in WARM_UP_PATHS:
+        match = resolve(path)
+        request = factory.get(path)
+        request.warm_up = True
+        response = match.func(request, *match.args, **match.kwargs)
+        response.render()
+
+
+def warm_up(requests=True):
+    warm_up_routes()
+    if not requests:
+        return
+    try:
+        warm_up_requests()
+    except DatabaseError:
+        logger.warning('База данных недоступна, прогрев запросов пропущен')
+    finally:
+        connections.close_all()
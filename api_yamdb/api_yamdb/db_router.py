@@ -0,0 +1,78 @@
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+
+_state = threading.local()
+_unavailable_until = {}
+
+
+def set_read_replica(enabled):
+    """Включает или выключает чтение с реплик для текущего потока."""
+    _state.read_replica = enabled
+
+
+def reads_from_replica():
+    return getattr(_state, 'read_replica', False)
+
+
+def pin_cache_key(user):
+    return f'replica-pin:{user.pk}'
+
+
+def pin_to_primary(user):
+    """
+    После записи пользователь читает с основной базы ещё
+    REPLICA_STICKINESS_SECONDS секунд, чтобы видеть свои изменения
+    до того, как они дойдут до реплик.
+    """
+    cache.set(pin_cache_key(user), True, settings.REPLICA_STICKINESS_SECONDS)
+
+
+def is_pinned_to_primary(user):
+    return user.is_authenticated and bool(cache.get(pin_cache_key(user)))
+
+
+def replica_available(alias):
+    """
+    Проверяет соединение с репликой. Недоступная реплика исключается из
+    выбора на REPLICA_RETRY_SECONDS секунд.
+    """
+    if _unavailable_until.get(alias, 0) > time.monotonic():
+        return False
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError:
+        _unavailable_until[alias] = (
+            time.monotonic() + settings.REPLICA_RETRY_SECONDS
+        )
+        return False
+    return True
+
+
+class ReplicaRouter:
+    """
+    Направляет чтение на реплики, если это разрешено для текущего запроса
+    (см. api.mixins.ReplicaReadMixin). Запись и все остальные чтения идут
+    в основную базу, в неё же чтение возвращается при недоступности реплик.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not reads_from_replica():
+            return None
+        replicas = [
+            alias for alias in settings.DATABASE_REPLICAS
+            if replica_available(alias)
+        ]
+        if not replicas:
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
@@ -0,0 +1,109 @@
+"""
+Проверки живости и готовности для оркестратора и docker-compose.
+
+HealthCheckMiddleware стоит первым в MIDDLEWARE и отвечает на
+HEALTH_LIVE_PATH и HEALTH_READY_PATH сам, не доходя до сессий,
+аутентификации, маршрутизации и DRF, поэтому пробы можно слать часто.
+
+live сообщает только, что процесс обрабатывает запросы. ready проверяет
+соединение с базой (SELECT 1 с коротким statement_timeout в PostgreSQL)
+и отсутствие непримененных миграций. Результат кэшируется в воркере на
+HEALTH_CHECK_CACHE_SECONDS; после того как миграции однажды оказались
+применены, граф миграций больше не загружается.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.http import JsonResponse
+
+OK = 'ok'
+
+
+class ReadinessState:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.expires = 0.0
+        self.checks = None
+        self.migrated = False
+
+
+_state = ReadinessState()
+
+
+def ping_database(connection):
+    with transaction.atomic(using=connection.alias):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    'SET LOCAL statement_timeout = %s',
+                    [int(settings.HEALTH_DB_TIMEOUT_SECONDS * 1000)],
+                )
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+
+
+def pending_migrations(connection):
+    executor = MigrationExecutor(connection)
+    return executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+
+def run_checks():
+    connection = connections[DEFAULT_DB_ALIAS]
+    try:
+        ping_database(connection)
+    except DatabaseError as error:
+        return {'database': f'error: {error}'.strip(), 'migrations': None}
+    if _state.migrated:
+        return {'database': OK, 'migrations': OK}
+    try:
+        pending = pending_migrations(connection)
+    except DatabaseError as error:
+        return {'database': OK, 'migrations': f'error: {error}'.strip()}
+    _state.migrated = not pending
+    return {
+        'database': OK,
+        'migrations': f'pending: {len(pending)}' if pending else OK,
+    }
+
+
+def readiness_checks():
+    """Результаты проверок готовности, не старше HEALTH_CHECK_CACHE_SECONDS."""
+    with _state.lock:
+        now = time.monotonic()
+        if _state.checks is None or now >= _state.expires:
+            _state.checks = run_checks()
+            _state.expires = now + settings.HEALTH_CHECK_CACHE_SECONDS
+        return _state.checks
+
+
+def live():
+    return JsonResponse({'status': OK})
+
+
+def ready():
+    checks = readiness_checks()
+    healthy = all(result == OK for result in checks.values())
+    return JsonResponse(
+        {'status': OK if healthy else 'unavailable', **checks},
+        status=200 if healthy else 503,
+    )
+
+
+class HealthCheckMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.probes = {
+            settings.HEALTH_LIVE_PATH.rstrip('/'): live,
+            settings.HEALTH_READY_PATH.rstrip('/'): ready,
+        }
+
+    def __call__(self, request):
+        probe = self.probes.get(request.path_info.rstrip('/'))
+        if probe is None:
+            return self.get_response(request)
+        return probe()
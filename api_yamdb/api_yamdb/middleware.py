@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.module_loading import import_string
+
+
+def is_stateless_path(path):
+    return path.startswith(tuple(settings.STATELESS_PATH_PREFIXES))
+
+
+class PathAwareMiddleware:
+    """
+    Запускает STATEFUL_MIDDLEWARE (сессии, CSRF, сообщения, clickjacking)
+    только для путей вне STATELESS_PATH_PREFIXES. Запросы к /api/
+    аутентифицируются по JWT и проходят мимо этих middleware; админка
+    и redoc получают полный стек в исходном порядке.
+
+    Внутренняя цепочка собирается так же, как BaseHandler.load_middleware,
+    а process_view/process_exception/process_template_response вложенных
+    middleware вызываются из одноимённых методов этого класса.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.view_hooks = []
+        self.exception_hooks = []
+        self.template_response_hooks = []
+        handler = get_response
+        for path in reversed(settings.STATEFUL_MIDDLEWARE):
+            try:
+                middleware = import_string(path)(handler)
+            except MiddlewareNotUsed:
+                continue
+            if hasattr(middleware, 'process_view'):
+                self.view_hooks.insert(0, middleware.process_view)
+            if hasattr(middleware, 'process_exception'):
+                self.exception_hooks.append(middleware.process_exception)
+            if hasattr(middleware, 'process_template_response'):
+                self.template_response_hooks.append(
+                    middleware.process_template_response
+                )
+            handler = convert_exception_to_response(middleware)
+        self.stateful_handler = handler
+
+    def __call__(self, request):
+        if is_stateless_path(request.path_info):
+            return self.get_response(request)
+        return self.stateful_handler(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if is_stateless_path(request.path_info):
+            return None
+        for hook in self.view_hooks:
+            response = hook(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    def process_exception(self, request, exception):
+        if is_stateless_path(request.path_info):
+            return None
+        for hook in self.exception_hooks:
+            response = hook(request, exception)
+            if response is not None:
+                return response
+        return None
+
+    def process_template_response(self, request, response):
+        if is_stateless_path(request.path_info):
+            return response
+        for hook in self.template_response_hooks:
+            response = hook(request, response)
+        return response
@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 from datetime import timedelta
@@ -27,6 +28,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'rest_framework',
     'django_filters',
@@ -38,15 +40,44 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api_yamdb.health.HealthCheckMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'api.memory.MemoryDiagnosticsMiddleware',
+    'api_yamdb.middleware.PathAwareMiddleware',
+]
+
+# Middleware с состоянием нужны только админке и redoc: /api/ работает
+# по JWT без сессий и CSRF, см. api_yamdb/middleware.py
+STATELESS_PATH_PREFIXES = ['/api/']
+STATEFUL_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Пробы оркестратора, см. api_yamdb/health.py
+HEALTH_LIVE_PATH = '/health/live'
+HEALTH_READY_PATH = '/health/ready'
+HEALTH_CHECK_CACHE_SECONDS = float(
+    os.getenv('HEALTH_CHECK_CACHE_SECONDS', default='2')
+)
+HEALTH_DB_TIMEOUT_SECONDS = float(
+    os.getenv('HEALTH_DB_TIMEOUT_SECONDS', default='1')
+)
+
+# Проверки админки ищут эти middleware прямо в MIDDLEWARE, а они
+# подключаются через PathAwareMiddleware
+SILENCED_SYSTEM_CHECKS = ['admin.E408', 'admin.E409', 'admin.E410']
+
+# Проверка бюджетов SQL-запросов при разработке, см. api/query_budget.py
+QUERY_BUDGETS_ENABLED = os.getenv('QUERY_BUDGETS_ENABLED') == 'True'
+QUERY_BUDGETS_RAISE = os.getenv('QUERY_BUDGETS_RAISE') == 'True'
+if QUERY_BUDGETS_ENABLED:
+    MIDDLEWARE.append('api.query_budget.QueryBudgetMiddleware')
+
 ROOT_URLCONF = 'api_yamdb.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
@@ -83,6 +114,63 @@ DATABASES = {
         'PORT': os.getenv('DB_PORT', default='5432'),
     }
 }
+# connect_timeout должен быть меньше таймаута healthcheck web (3 с), чтобы
+# /health/ready успел ответить 503; 2 с - минимум, который принимает libpq
+if DATABASES['default']['ENGINE'] != 'django.db.backends.sqlite3':
+    DATABASES['default']['OPTIONS'] = {
+        'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', default='2'))
+    }
+
+# Реплики для чтения перечисляются через запятую в DB_REPLICAS: для
+# PostgreSQL это хосты, для SQLite - файлы баз данных.
+DATABASE_REPLICAS = []
+for index, replica in enumerate(
+    filter(None, os.getenv('DB_REPLICAS', default='').split(','))
+):
+    alias = f'replica_{index}'
+    DATABASES[alias] = dict(DATABASES['default'])
+    if DATABASES[alias]['ENGINE'] == 'django.db.backends.sqlite3':
+        DATABASES[alias]['NAME'] = replica
+    else:
+        DATABASES[alias]['HOST'] = replica
+        DATABASES[alias]['OPTIONS'] = {'connect_timeout': 2}
+    # В тестах реплика - зеркало основной базы: своей тестовой базы у неё
+    # нет, чтение с неё видит те же данные
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['api_yamdb.db_router.ReplicaRouter']
+REPLICA_STICKINESS_SECONDS = int(
+    os.getenv('REPLICA_STICKINESS_SECONDS', default='5')
+)
+REPLICA_RETRY_SECONDS = int(os.getenv('REPLICA_RETRY_SECONDS', default='30'))
+
+
+# Cache
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    },
+    # Флаги и отчёты диагностики памяти должны быть общими для всех
+    # воркеров даже без CACHE_BACKEND, поэтому по умолчанию лежат в файлах
+    'memory-diagnostics': {
+        'BACKEND': os.getenv(
+            'MEMORY_DIAGNOSTICS_CACHE_BACKEND',
+            default='django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv(
+            'MEMORY_DIAGNOSTICS_CACHE_LOCATION',
+            default=os.path.join(
+                tempfile.gettempdir(), 'yamdb-memory-diagnostics'
+            )
+        ),
+    },
+}
 
 
 # Password validation
@@ -129,6 +217,11 @@ USE_TZ = True
 STATIC_URL = '/static/'
 # STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static/'),)
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
+# Имена файлов с хэшем содержимого и сжатые .gz/.br варианты для nginx
+STATICFILES_STORAGE = os.getenv(
+    'STATICFILES_STORAGE',
+    default='api_yamdb.storage.CompressedManifestStaticFilesStorage'
+)
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -153,9 +246,78 @@ REST_FRAMEWORK = {
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
+    'REFRESH_TOKEN_LIFETIME': timedelta(
+        days=int(os.getenv('REFRESH_TOKEN_LIFETIME_DAYS', default='30'))
+    ),
+    # Refresh-токены ротирует api/tokens.py: использованные записываются
+    # в таблицу UsedRefreshToken.
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
 ADMIN_EMAIL = 'toskuef@yandex.ru'
 
+IDEMPOTENCY_KEY_TIMEOUT = int(
+    os.getenv('IDEMPOTENCY_KEY_TIMEOUT', default='86400')
+)
+
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
+
+# Rankings
+
+TRENDING_WINDOW_DAYS = int(os.getenv('TRENDING_WINDOW_DAYS', default='7'))
+TOP_RATED_MIN_REVIEWS = int(os.getenv('TOP_RATED_MIN_REVIEWS', default='3'))
+
+# Pagination
+
+APPROXIMATE_COUNT_THRESHOLD = int(
+    os.getenv('APPROXIMATE_COUNT_THRESHOLD', default='10000')
+)
+COUNT_CACHE_TIMEOUT = int(os.getenv('COUNT_CACHE_TIMEOUT', default='60'))
+FACETS_CACHE_TIMEOUT = int(os.getenv('FACETS_CACHE_TIMEOUT', default='300'))
+
+# Сколько отзывов и комментариев встраивается на родителя при expand=
+EXPAND_LIMIT = int(os.getenv('EXPAND_LIMIT', default='3'))
+
+# Объединение одинаковых одновременных анонимных GET-запросов,
+# см. api/coalescing.py
+COALESCE_READS = os.getenv('COALESCE_READS', default='True') == 'True'
+COALESCE_WAIT_SECONDS = float(os.getenv('COALESCE_WAIT_SECONDS', default='2'))
+COALESCE_POLL_SECONDS = float(
+    os.getenv('COALESCE_POLL_SECONDS', default='0.02')
+)
+COALESCE_LOCK_SECONDS = int(os.getenv('COALESCE_LOCK_SECONDS', default='10'))
+COALESCE_RESULT_SECONDS = int(
+    os.getenv('COALESCE_RESULT_SECONDS', default='1')
+)
+
+# Отложенное удаление пользователей, произведений и отзывов,
+# см. reviews/deletion.py и команду purge_deleted.
+DEFERRED_DELETION = os.getenv('DEFERRED_DELETION') == 'True'
+
+# Массовая модерация: размер порции и максимум объектов за один запрос
+MODERATION_BATCH_SIZE = int(
+    os.getenv('MODERATION_BATCH_SIZE', default='500')
+)
+MODERATION_LIMIT = int(os.getenv('MODERATION_LIMIT', default='5000'))
+
+# Число секций для команды partition_reviews, см. reviews/partitioning.py
+REVIEWS_PARTITIONS = int(os.getenv('REVIEWS_PARTITIONS', default='16'))
+
+# Нечёткий поиск пользователей по триграммам в PostgreSQL (pg_trgm),
+# иначе поиск подстроки, см. users/search.py
+USER_SEARCH_TRIGRAM = (
+    os.getenv('USER_SEARCH_TRIGRAM', default='True') == 'True'
+)
+
+# Диагностика памяти (admin/memory/): как часто воркер проверяет флаг
+# включения, сколько кадров стека хранит tracemalloc и сколько живёт
+# отчёт воркера, который перестал его обновлять, см. api/memory.py
+MEMORY_DIAGNOSTICS_POLL_SECONDS = float(
+    os.getenv('MEMORY_DIAGNOSTICS_POLL_SECONDS', default='5')
+)
+MEMORY_DIAGNOSTICS_FRAMES = int(
+    os.getenv('MEMORY_DIAGNOSTICS_FRAMES', default='1')
+)
+MEMORY_DIAGNOSTICS_REPORT_SECONDS = int(
+    os.getenv('MEMORY_DIAGNOSTICS_REPORT_SECONDS', default='600')
+)
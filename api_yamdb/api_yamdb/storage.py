@@ -0,0 +1,60 @@
+import gzip
+import io
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def gzip_compress(data):
+    buffer = io.BytesIO()
+    with gzip.GzipFile(
+        fileobj=buffer, mode='wb', compresslevel=9, mtime=0
+    ) as f:
+        f.write(data)
+    return buffer.getvalue()
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Статика с хэшем содержимого в именах файлов. После collectstatic
+    рядом с каждым текстовым файлом кладутся сжатые варианты .gz и,
+    если установлен пакет Brotli, .br, которые nginx отдаёт без сжатия
+    на лету (gzip_static). Пока collectstatic не запускался и манифеста
+    нет (разработка, тесты), ссылки строятся по исходным именам.
+    """
+    compress_extensions = (
+        '.css', '.js', '.json', '.map', '.svg', '.txt', '.xml', '.yaml',
+        '.html', '.eot', '.ttf',
+    )
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(self.compress_extensions):
+                self.compress(name)
+
+    def compress(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as f:
+            data = f.read()
+        variants = [('.gz', gzip_compress)]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress))
+        for suffix, compress in variants:
+            compressed = compress(data)
+            if len(compressed) >= len(data):
+                continue
+            with open(f'{path}{suffix}', 'wb') as f:
+                f.write(compressed)
@@ -2,8 +2,15 @@ from django.contrib import admin
 from django.urls import path, include
 from django.views.generic import TemplateView
 
+from api.admin_views import memory_diagnostics
+
 
 urlpatterns = [
+    path(
+        'admin/memory/',
+        admin.site.admin_view(memory_diagnostics),
+        name='memory-diagnostics'
+    ),
     path('admin/', admin.site.urls),
     path(
         'redoc/',
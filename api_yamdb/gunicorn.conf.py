@@ -0,0 +1,50 @@
+"""
+Настройки gunicorn. Все значения можно переопределить переменными
+окружения из .env.
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', default='0.0.0.0:8000')
+workers = int(os.getenv(
+    'GUNICORN_WORKERS', default=multiprocessing.cpu_count() * 2 + 1
+))
+threads = int(os.getenv('GUNICORN_THREADS', default='2'))
+worker_class = 'gthread' if threads > 1 else 'sync'
+timeout = int(os.getenv('GUNICORN_TIMEOUT', default='30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', default='30'))
+# Должно быть больше keepalive_timeout в upstream nginx
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', default='75'))
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', default='2000'))
+max_requests_jitter = int(
+    os.getenv('GUNICORN_MAX_REQUESTS_JITTER', default='200')
+)
+preload_app = os.getenv('GUNICORN_PRELOAD', default='True') == 'True'
+warm_up_requests = os.getenv('GUNICORN_WARM_UP', default='True') == 'True'
+accesslog = os.getenv('GUNICORN_ACCESS_LOG') or None
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+
+def on_starting(server):
+    """
+    С preload_app приложение уже загружено в мастер-процессе: маршруты
+    и сериализаторы строятся здесь один раз, а gc.freeze() убирает
+    созданные объекты из сборки мусора, чтобы воркеры не копировали
+    их страницы памяти.
+    """
+    if not preload_app:
+        return
+    from api.warmup import warm_up_routes
+    warm_up_routes()
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    """
+    Воркер прогревает представления и проверяет доступность базы до
+    приёма трафика.
+    """
+    from api.warmup import warm_up
+    warm_up(requests=warm_up_requests)
@@ -1,10 +1,85 @@
+from datetime import timedelta
+
 from django.contrib import admin
+from django.utils import timezone
 
+from api.pagination import EstimatedCountPaginator
 from .models import Category, Comment, Genre, Review, Title
 
 
-admin.site.register(Title)
-admin.site.register(Review)
-admin.site.register(Category)
-admin.site.register(Genre)
-admin.site.register(Comment)
+class ScalableModelAdmin(admin.ModelAdmin):
+    """
+    Базовая настройка списков для больших таблиц: количество объектов
+    оценивается, а полный COUNT без фильтров не выполняется.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+class PubDateFilter(admin.SimpleListFilter):
+    """
+    Фильтр по дате публикации с фиксированным набором периодов.
+    В отличие от date_hierarchy не строит список дат по всей таблице.
+    """
+    title = 'Дата публикации'
+    parameter_name = 'published'
+    periods = (
+        ('day', 'За сутки', timedelta(days=1)),
+        ('week', 'За неделю', timedelta(days=7)),
+        ('month', 'За месяц', timedelta(days=30)),
+    )
+
+    def lookups(self, request, model_admin):
+        return [(key, label) for key, label, _ in self.periods]
+
+    def queryset(self, request, queryset):
+        for key, _, period in self.periods:
+            if self.value() == key:
+                return queryset.filter(pub_date__gte=timezone.now() - period)
+        return queryset
+
+
+@admin.register(Title)
+class TitleAdmin(ScalableModelAdmin):
+    list_display = ('id', 'name', 'year', 'category', 'rating')
+    list_select_related = ('category', 'stat')
+    list_filter = ('category',)
+    search_fields = ('^name',)
+    autocomplete_fields = ('category', 'genre')
+
+    def rating(self, obj):
+        stat = getattr(obj, 'stat', None)
+        return stat.rating if stat is not None else None
+    rating.short_description = 'Рейтинг'
+    rating.admin_order_field = 'stat__rating'
+
+
+@admin.register(Review)
+class ReviewAdmin(ScalableModelAdmin):
+    list_display = ('id', 'title', 'author', 'score', 'pub_date')
+    list_select_related = ('title', 'author')
+    list_filter = (PubDateFilter,)
+    search_fields = ('=author__username',)
+    raw_id_fields = ('author', 'title')
+
+
+@admin.register(Comment)
+class CommentAdmin(ScalableModelAdmin):
+    list_display = ('id', 'review', 'author', 'pub_date')
+    list_select_related = ('review', 'author')
+    list_filter = (PubDateFilter,)
+    search_fields = ('=author__username',)
+    raw_id_fields = ('author', 'review')
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'slug')
+    search_fields = ('name', 'slug')
+
+
+@admin.register(Genre)
+class GenreAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'slug')
+    search_fields = ('name', 'slug')
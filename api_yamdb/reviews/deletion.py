@@ -0,0 +1,184 @@
+"""
+Отложенное удаление пользователей, произведений и отзывов.
+
+schedule_deletion сразу скрывает объект и ставит задачу, а purge_task
+удаляет зависимые комментарии и отзывы порциями, каждая в своей
+транзакции и не больше batch_size строк. Показатели TitleStat
+учитывают только видимые отзывы активных авторов: отзывы пользователя
+скрываются вместе с ним, поэтому рейтинги соответствуют видимым отзывам
+ещё до удаления.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import (
+    Count, F, FloatField, OuterRef, Q, Subquery, Sum,
+)
+from django.db.models.functions import Cast, Coalesce, Greatest, NullIf
+from django.utils import timezone
+
+from .models import Comment, DeletionTask, Review, Title, TitleStat
+from .rankings import trending_since
+
+User = get_user_model()
+
+
+def hide_reviews(reviews):
+    """
+    Скрывает видимые отзывы из queryset и вычитает из показателей
+    произведений оценки тех из них, что написаны активными авторами,
+    одним UPDATE с подзапросами. Возвращает количество скрытых отзывов.
+    """
+    reviews = reviews.filter(is_hidden=False)
+    counted = reviews.filter(
+        title_id=OuterRef('title_id'), author__is_active=True
+    ).order_by().values('title_id')
+    count = total(counted, Count('id'))
+    score = total(counted, Sum('score'))
+    recent = total(
+        counted, Count('id', filter=Q(pub_date__gte=trending_since()))
+    )
+    TitleStat.objects.filter(
+        title_id__in=reviews.values('title_id')
+    ).update(
+        reviews_count=F('reviews_count') - count,
+        score_sum=F('score_sum') - score,
+        rating=(
+            Cast(F('score_sum') - score, FloatField())
+            / NullIf(F('reviews_count') - count, 0)
+        ),
+        recent_reviews_count=Greatest(F('recent_reviews_count') - recent, 0),
+    )
+    return reviews.update(is_hidden=True)
+
+
+def total(reviews, aggregate):
+    return Coalesce(
+        Subquery(reviews.annotate(total=aggregate).values('total')), 0
+    )
+
+
+def schedule_deletion(obj):
+    """Скрывает объект и ставит задачу на удаление его зависимостей."""
+    with transaction.atomic():
+        if isinstance(obj, User):
+            hide_reviews(Review.objects.filter(author_id=obj.pk))
+            User.objects.filter(pk=obj.pk).update(is_active=False)
+        elif isinstance(obj, Title):
+            Title.objects.filter(pk=obj.pk).update(is_hidden=True)
+        elif isinstance(obj, Review):
+            hide_reviews(Review.objects.filter(pk=obj.pk))
+        else:
+            raise TypeError(f'Отложенное удаление {obj!r} не поддерживается')
+        return DeletionTask.objects.create(
+            content_type=ContentType.objects.get_for_model(obj),
+            object_id=obj.pk,
+        )
+
+
+def pending_deletion(model):
+    """Подзапрос id объектов model, которые ждут удаления."""
+    return DeletionTask.objects.filter(
+        status=DeletionTask.PENDING,
+        content_type__app_label=model._meta.app_label,
+        content_type__model=model._meta.model_name,
+    ).values('object_id')
+
+
+def delete_reviews(review_ids, batch_size):
+    """
+    Удаляет отзывы с комментариями: скрывает их, затем удаляет
+    комментарии порциями по batch_size и сами отзывы, каждый шаг в своей
+    транзакции. Возвращает пару (удалено комментариев, выполнено шагов).
+    """
+    comments_deleted = 0
+    steps = 0
+    while True:
+        with transaction.atomic():
+            if not steps:
+                hide_reviews(Review.objects.filter(pk__in=review_ids))
+            comments, reviews = purge_reviews_step(review_ids, batch_size)
+        comments_deleted += comments
+        steps += 1
+        if reviews:
+            return comments_deleted, steps
+
+
+def purge_reviews_step(review_ids, batch_size):
+    """
+    Один шаг удаления скрытых отзывов review_ids: удаляет до batch_size
+    их комментариев, а когда комментариев не осталось - сами отзывы.
+    Возвращает пару (удалено комментариев, удалено отзывов).
+    """
+    comment_ids = take_batch(
+        Comment.objects.filter(review_id__in=review_ids), batch_size
+    )
+    if comment_ids:
+        Comment.objects.filter(pk__in=comment_ids).delete()
+        return len(comment_ids), 0
+    Review.objects.filter(pk__in=review_ids).delete()
+    return 0, len(review_ids)
+
+
+def take_batch(queryset, batch_size):
+    return list(queryset.order_by('pk').values_list('pk', flat=True)[
+        :batch_size
+    ])
+
+
+def purge_batch(task, batch_size):
+    """
+    Удаляет одну порцию зависимостей объекта задачи. Возвращает False,
+    когда удалять больше нечего и объект удалён.
+    """
+    model = task.content_type.model_class()
+    if model is User:
+        comments = Comment.objects.filter(author_id=task.object_id)
+        reviews = Review.objects.filter(author_id=task.object_id)
+    elif model is Title:
+        comments = Comment.objects.filter(review__title_id=task.object_id)
+        reviews = Review.objects.filter(title_id=task.object_id)
+    else:
+        comments = Comment.objects.filter(review_id=task.object_id)
+        reviews = Review.objects.none()
+
+    comment_ids = take_batch(comments, batch_size)
+    if comment_ids:
+        Comment.objects.filter(pk__in=comment_ids).delete()
+        task.comments_deleted = F('comments_deleted') + len(comment_ids)
+        return True
+
+    review_ids = take_batch(reviews, batch_size)
+    if review_ids:
+        hide_reviews(Review.objects.filter(pk__in=review_ids))
+        answers_deleted, reviews_deleted = purge_reviews_step(
+            review_ids, batch_size
+        )
+        task.comments_deleted = F('comments_deleted') + answers_deleted
+        task.reviews_deleted = F('reviews_deleted') + reviews_deleted
+        return True
+
+    model.objects.filter(pk=task.object_id).delete()
+    task.status = DeletionTask.DONE
+    task.finished = timezone.now()
+    return False
+
+
+def purge_task(task, batch_size=500, max_batches=None):
+    """
+    Обрабатывает задачу порциями. Каждая порция и обновление прогресса
+    выполняются в одной транзакции. Возвращает True, если задача
+    завершена.
+    """
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            task = DeletionTask.objects.select_for_update().get(pk=task.pk)
+            if task.status == DeletionTask.DONE:
+                return True
+            has_more = purge_batch(task, batch_size)
+            task.save()
+        batches += 1
+        if not has_more:
+            return True
+    return False
@@ -0,0 +1,131 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+TABLES = ('bench_review_plain', 'bench_review_part')
+
+QUERIES = (
+    (
+        'страница отзывов произведения',
+        'SELECT id, text, author_id, score, pub_date FROM {table} '
+        'WHERE title_id = %s ORDER BY id LIMIT 10',
+    ),
+    (
+        'количество и сумма оценок произведения',
+        'SELECT count(*), sum(score) FROM {table} WHERE title_id = %s',
+    ),
+    (
+        'отзыв автора на произведение',
+        'SELECT id FROM {table} WHERE author_id = %s AND title_id = %s',
+    ),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает обычную и секционированную по хэшу title_id таблицу '
+        'отзывов PostgreSQL на --rows строках (по умолчанию 10 млн): время '
+        'заполнения, размер индексов, задержку типичных запросов и время '
+        'VACUUM. Таблицы создаются рядом с рабочими и удаляются в конце.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000_000)
+        parser.add_argument('--titles', type=int, default=100_000)
+        parser.add_argument('--partitions', type=int, default=16)
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument(
+            '--keep', action='store_true',
+            help='Не удалять тестовые таблицы.',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Бенчмарк работает только в PostgreSQL')
+        try:
+            with connection.cursor() as cursor:
+                for table in TABLES:
+                    self.create(cursor, table, **options)
+                for name, sql in QUERIES:
+                    line = [f'{name}:']
+                    for table in TABLES:
+                        median = self.measure(
+                            cursor, sql.format(table=table), **options
+                        )
+                        line.append(f'{table} {median * 1000:.3f} мс')
+                    self.stdout.write(' '.join(line))
+                for table in TABLES:
+                    start = time.perf_counter()
+                    cursor.execute(f'VACUUM ANALYZE {table}')
+                    self.stdout.write(
+                        f'VACUUM ANALYZE {table}: '
+                        f'{time.perf_counter() - start:.1f} с'
+                    )
+        finally:
+            if not options['keep']:
+                with connection.cursor() as cursor:
+                    for table in TABLES:
+                        cursor.execute(f'DROP TABLE IF EXISTS {table}')
+
+    def create(self, cursor, table, rows, titles, partitions, **options):
+        partitioned = table.endswith('_part')
+        cursor.execute(f'DROP TABLE IF EXISTS {table}')
+        # autovacuum отключён, чтобы он не успел обработать одну из таблиц
+        # раньше VACUUM бенчмарка
+        cursor.execute(
+            f'CREATE TABLE {table} (LIKE reviews_review INCLUDING DEFAULTS)'
+            + (
+                ' PARTITION BY HASH (title_id)' if partitioned
+                else ' WITH (autovacuum_enabled = false)'
+            )
+        )
+        for remainder in range(partitions if partitioned else 0):
+            cursor.execute(
+                f'CREATE TABLE {table}_p{remainder} PARTITION OF {table} '
+                f'FOR VALUES WITH (MODULUS {partitions}, '
+                f'REMAINDER {remainder}) '
+                'WITH (autovacuum_enabled = false)'
+            )
+        start = time.perf_counter()
+        cursor.execute(
+            f'INSERT INTO {table} '
+            '(id, text, pub_date, author_id, title_id, score, is_hidden) '
+            "SELECT n, 'Текст отзыва', now() - n * interval '1 second', "
+            'n / %s + 1, n %% %s + 1, n %% 10 + 1, false '
+            'FROM generate_series(1, %s) AS n',
+            [titles, titles, rows],
+        )
+        key = 'id, title_id' if partitioned else 'id'
+        cursor.execute(f'ALTER TABLE {table} ADD PRIMARY KEY ({key})')
+        cursor.execute(f'CREATE INDEX ON {table} (title_id)')
+        cursor.execute(
+            f'CREATE UNIQUE INDEX ON {table} (author_id, title_id)'
+        )
+        cursor.execute(f'ANALYZE {table}')
+        cursor.execute(
+            'SELECT pg_size_pretty(sum(pg_indexes_size(relid))) FROM ('
+            'SELECT relid FROM pg_partition_tree(%s) '
+            'UNION SELECT %s::regclass) AS tables',
+            [table, table],
+        )
+        self.stdout.write(
+            f'{table}: заполнение и индексы '
+            f'{time.perf_counter() - start:.1f} с, '
+            f'индексы {cursor.fetchone()[0]}'
+        )
+
+    @staticmethod
+    def measure(cursor, sql, titles, repeat, **options):
+        timings = []
+        for i in range(repeat):
+            title_id = i * 7919 % titles + 1
+            params = [title_id]
+            if sql.count('%s') == 2:
+                params = [title_id // 10 + 1, title_id]
+            start = time.perf_counter()
+            cursor.execute(sql, params)
+            cursor.fetchall()
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings)
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from reviews.partitioning import is_supported, partition, unpartition
+
+
+class Command(BaseCommand):
+    help = (
+        'Секционирует таблицы отзывов и комментариев PostgreSQL по хэшу '
+        'title_id и review_id, а с --undo возвращает обычные таблицы. '
+        'Таблицы блокируются на время копирования данных.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--partitions', type=int, default=None,
+            help='Количество секций, по умолчанию REVIEWS_PARTITIONS.',
+        )
+        parser.add_argument(
+            '--undo', action='store_true',
+            help='Вернуть обычные таблицы.',
+        )
+
+    def handle(self, *args, **options):
+        if not is_supported(connection):
+            raise CommandError('Секционирование доступно только в PostgreSQL')
+        with transaction.atomic():
+            if options['undo']:
+                changed = unpartition(connection)
+            else:
+                changed = partition(connection, options['partitions'])
+        self.stdout.write('Готово' if changed else 'Таблицы уже в этом виде')
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reviews.deletion import purge_task
+from reviews.models import DeletionTask
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет скрытых пользователей, произведения и отзывы вместе '
+        'с зависимыми записями порциями по --batch-size строк.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, а ждать новые задачи.',
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=5,
+            help='Пауза между проверками новых задач в режиме --loop.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            tasks = DeletionTask.objects.filter(
+                status=DeletionTask.PENDING
+            ).select_related('content_type')
+            for task in tasks:
+                purge_task(task, batch_size=options['batch_size'])
+                task.refresh_from_db()
+                self.stdout.write(
+                    f'{task}: комментариев {task.comments_deleted}, '
+                    f'отзывов {task.reviews_deleted}'
+                )
+            if not options['loop']:
+                return
+            time.sleep(options['sleep'])
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from reviews.rankings import rebuild_stats, refresh_trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Обновляет рейтинги произведений: сдвигает окно популярных '
+        'произведений, а с --full пересчитывает все показатели.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать показатели всех произведений.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Размер порции произведений для --full.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if options['full']:
+            rebuilt = rebuild_stats(batch_size=batch_size)
+            self.stdout.write(f'Пересчитано произведений: {rebuilt}')
+        changed = refresh_trending()
+        self.stdout.write(f'Обновлено популярных: {changed}')
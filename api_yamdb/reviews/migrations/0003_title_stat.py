@@ -0,0 +1,64 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+
+
+def fill_title_stats(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    Review = apps.get_model('reviews', 'Review')
+    TitleStat = apps.get_model('reviews', 'TitleStat')
+    totals = {
+        row['title_id']: row
+        for row in Review.objects.order_by().values('title_id').annotate(
+            reviews_count=Count('id'), score_sum=Sum('score')
+        )
+    }
+    stats = []
+    for title_id in Title.objects.values_list('id', flat=True).iterator():
+        row = totals.get(title_id, {'reviews_count': 0, 'score_sum': 0})
+        stats.append(TitleStat(
+            title_id=title_id,
+            reviews_count=row['reviews_count'],
+            score_sum=row['score_sum'],
+            rating=(
+                row['score_sum'] / row['reviews_count']
+                if row['reviews_count'] else None
+            ),
+        ))
+    TitleStat.objects.bulk_create(stats, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0002_foreign_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleStat',
+            fields=[
+                ('title', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stat', serialize=False, to='reviews.Title')),
+                ('reviews_count', models.PositiveIntegerField(default=0, verbose_name='Количество отзывов')),
+                ('score_sum', models.PositiveIntegerField(default=0, verbose_name='Сумма оценок')),
+                ('rating', models.FloatField(blank=True, null=True, verbose_name='Рейтинг')),
+                ('recent_reviews_count', models.PositiveIntegerField(default=0, verbose_name='Отзывов за период')),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='review',
+            name='pub_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата публикации'),
+        ),
+        migrations.AddIndex(
+            model_name='titlestat',
+            index=models.Index(fields=['-rating', '-reviews_count'], name='reviews_stat_top_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='titlestat',
+            index=models.Index(fields=['-recent_reviews_count'], name='reviews_stat_trending_idx'),
+        ),
+        migrations.RunPython(fill_title_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS reviews_title_name_upper_idx '
+        'ON reviews_title (UPPER(name::text) text_pattern_ops)'
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS reviews_title_name_upper_idx')
+
+
+class Migration(migrations.Migration):
+    """
+    Индекс для поиска произведений по началу названия без учёта регистра
+    (search_fields = ('^name',) в админке). Нужен только PostgreSQL.
+    """
+
+    dependencies = [
+        ('reviews', '0003_title_stat'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('reviews', '0004_title_name_upper_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='is_hidden',
+            field=models.BooleanField(default=False, verbose_name='Скрыто до удаления'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='is_hidden',
+            field=models.BooleanField(default=False, verbose_name='Скрыто до удаления'),
+        ),
+        migrations.CreateModel(
+            name='DeletionTask',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveIntegerField(verbose_name='ID объекта')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает удаления'), ('done', 'Удалено')], db_index=True, default='pending', max_length=16, verbose_name='Статус')),
+                ('comments_deleted', models.PositiveIntegerField(default=0, verbose_name='Удалено комментариев')),
+                ('reviews_deleted', models.PositiveIntegerField(default=0, verbose_name='Удалено отзывов')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('finished', models.DateTimeField(blank=True, null=True)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.ContentType', verbose_name='Тип объекта')),
+            ],
+            options={
+                'ordering': ('id',),
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_deferred_deletion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['author', '-pub_date', '-id'], name='reviews_comment_author_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['author', '-pub_date', '-id'], name='reviews_review_author_idx'),
+        ),
+    ]
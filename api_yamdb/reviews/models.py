@@ -1,6 +1,11 @@
 from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast, Greatest, NullIf
+from django.db.models.signals import post_save
+from django.utils import timezone
 
 
 User = get_user_model()
@@ -32,6 +37,10 @@ class Title(models.Model):
         default='Будет определено админом позже',
         related_name='categories'
     )
+    is_hidden = models.BooleanField(
+        default=False,
+        verbose_name='Скрыто до удаления'
+    )
 
     class Meta:
         ordering = ('id',)
@@ -55,12 +64,145 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('id',)
+        indexes = (
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='reviews_comment_author_idx'
+            ),
+        )
+
+
+class ReviewQuerySet(models.QuerySet):
+
+    def supports_insert_returning(self):
+        connection = connections[self.db]
+        if connection.vendor == 'postgresql':
+            return True
+        return (
+            connection.vendor == 'sqlite'
+            and connection.Database.sqlite_version_info >= (3, 35)
+        )
+
+    def insert_unique(self, author, title_id, text, score):
+        """
+        Создаёт отзыв одним запросом INSERT ... SELECT ... ON CONFLICT DO
+        NOTHING RETURNING, поэтому повторная отправка не приводит к
+        IntegrityError. Возвращает созданный отзыв или None, если отзыв
+        этого автора на произведение уже есть. Если произведения нет
+        или оно скрыто до удаления, выбрасывает Title.DoesNotExist.
+        На старых версиях SQLite без RETURNING используется вставка
+        в точке сохранения с перехватом IntegrityError.
+        """
+        self._for_write = True
+        review = self._insert(author, title_id, text, score)
+        if review is None and not self._title_is_visible(title_id):
+            raise Title.DoesNotExist
+        return review
+
+    def _title_is_visible(self, title_id):
+        return Title.objects.using(self.db).filter(
+            pk=title_id, is_hidden=False
+        ).exists()
+
+    def _insert(self, author, title_id, text, score):
+        pub_date = timezone.now()
+        if self.supports_insert_returning():
+            review_id = self._insert_on_conflict(
+                author, title_id, text, score, pub_date
+            )
+        else:
+            review_id = self._insert_in_savepoint(
+                author, title_id, text, score, pub_date
+            )
+        if review_id is None:
+            return None
+        review = self.model.from_db(
+            self.db,
+            (
+                'id', 'text', 'pub_date', 'author_id', 'title_id', 'score',
+                'is_hidden',
+            ),
+            (
+                review_id, text, pub_date, author.pk, int(title_id), score,
+                False,
+            ),
+        )
+        review.author = author
+        post_save.send(
+            sender=self.model, instance=review, created=True,
+            update_fields=None, raw=False, using=self.db,
+        )
+        return review
+
+    def _insert_on_conflict(self, author, title_id, text, score, pub_date):
+        connection = connections[self.db]
+        qn = connection.ops.quote_name
+        review_table = qn(self.model._meta.db_table)
+        title_table = qn(Title._meta.db_table)
+        pub_date = self.model._meta.get_field('pub_date').get_db_prep_value(
+            pub_date, connection
+        )
+        sql = (
+            f'INSERT INTO {review_table} '
+            f'({qn("text")}, {qn("pub_date")}, {qn("author_id")}, '
+            f'{qn("title_id")}, {qn("score")}, {qn("is_hidden")}) '
+            f'SELECT %s, %s, %s, {qn("id")}, %s, %s FROM {title_table} '
+            f'WHERE {qn("id")} = %s AND NOT {qn("is_hidden")} '
+            f'ON CONFLICT ({qn("author_id")}, {qn("title_id")}) DO NOTHING '
+            f'RETURNING {qn("id")}'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                sql, (text, pub_date, author.pk, score, False, title_id)
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    def _insert_in_savepoint(self, author, title_id, text, score, pub_date):
+        if not self._title_is_visible(title_id):
+            return None
+        try:
+            with transaction.atomic(using=self.db):
+                review = self.model(
+                    author=author, title_id=title_id, text=text,
+                    score=score, pub_date=pub_date,
+                )
+                review.save_base(raw=True, using=self.db)
+        except IntegrityError:
+            return None
+        return review.pk
+
+    def update_or_insert(self, author, title_id, text, score):
+        """
+        Идемпотентное "создать или обновить мой отзыв".
+        Возвращает пару (отзыв, создан ли он). Скрытые до удаления отзыв
+        или произведение не обновляются: выбрасывается Title.DoesNotExist.
+        """
+        self._for_write = True
+        review = self._insert(author, title_id, text, score)
+        if review is not None:
+            return review, True
+        with transaction.atomic(using=self.db):
+            try:
+                review = self.select_for_update(of=('self',)).get(
+                    author=author, title_id=title_id,
+                    is_hidden=False, title__is_hidden=False,
+                )
+            except self.model.DoesNotExist:
+                raise Title.DoesNotExist
+            review.author = author
+            review.text = text
+            review.score = score
+            review.save(update_fields=('text', 'score'))
+        return review, False
 
 
 class Review(models.Model):
     """Модель ревью к произведениям, которые могут оставлять пользователи."""
     text = models.TextField()
-    pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    pub_date = models.DateTimeField(
+        'Дата публикации', auto_now_add=True, db_index=True
+    )
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='posts'
     )
@@ -70,10 +212,143 @@ class Review(models.Model):
     score = models.PositiveSmallIntegerField(
         validators=[MaxValueValidator(10), MinValueValidator(1)],
     )
+    is_hidden = models.BooleanField(
+        default=False,
+        verbose_name='Скрыто до удаления'
+    )
+
+    objects = ReviewQuerySet.as_manager()
 
     class Meta:
         unique_together = ('author', 'title')
         ordering = ('id',)
+        indexes = (
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='reviews_review_author_idx'
+            ),
+        )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Запоминает загруженную из базы оценку, чтобы при сохранении
+        обновить рейтинг произведения на разницу без лишнего запроса.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_score = instance.__dict__.get('score')
+        return instance
+
+
+class TitleStatQuerySet(models.QuerySet):
+
+    def apply_delta(self, title_id, score=0, count=0, recent=0):
+        """
+        Атомарно сдвигает счётчики произведения и пересчитывает рейтинг
+        одним UPDATE. Возвращает количество обновлённых строк.
+        """
+        reviews_count = F('reviews_count') + count
+        score_sum = F('score_sum') + score
+        return self.filter(title_id=title_id).update(
+            reviews_count=reviews_count,
+            score_sum=score_sum,
+            rating=(
+                Cast(score_sum, FloatField())
+                / NullIf(reviews_count, 0)
+            ),
+            recent_reviews_count=Greatest(
+                F('recent_reviews_count') + recent, 0
+            ),
+        )
+
+
+class TitleStat(models.Model):
+    """
+    Предрасчитанные показатели произведения для рейтингов.
+    Обновляются при каждом изменении отзыва и периодически командой
+    refresh_rankings.
+    """
+    title = models.OneToOneField(
+        Title,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stat'
+    )
+    reviews_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество отзывов'
+    )
+    score_sum = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Сумма оценок'
+    )
+    rating = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name='Рейтинг'
+    )
+    recent_reviews_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Отзывов за период'
+    )
+
+    objects = TitleStatQuerySet.as_manager()
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('-rating', '-reviews_count'),
+                name='reviews_stat_top_idx'
+            ),
+            models.Index(
+                fields=('-recent_reviews_count',),
+                name='reviews_stat_trending_idx'
+            ),
+        )
+
+
+class DeletionTask(models.Model):
+    """
+    Отложенное удаление пользователя, произведения или отзыва.
+    Объект скрывается сразу, а зависимые записи удаляются порциями
+    командой purge_deleted.
+    """
+    PENDING, DONE = 'pending', 'done'
+    STATUSES = (
+        (PENDING, 'Ожидает удаления'),
+        (DONE, 'Удалено'),
+    )
+
+    content_type = models.ForeignKey(
+        ContentType,
+        on_delete=models.CASCADE,
+        verbose_name='Тип объекта'
+    )
+    object_id = models.PositiveIntegerField(verbose_name='ID объекта')
+    status = models.CharField(
+        max_length=16,
+        choices=STATUSES,
+        default=PENDING,
+        db_index=True,
+        verbose_name='Статус'
+    )
+    comments_deleted = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Удалено комментариев'
+    )
+    reviews_deleted = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Удалено отзывов'
+    )
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ('id',)
+
+    def __str__(self):
+        return f'{self.content_type.model} {self.object_id}: {self.status}'
 
 
 class Category(models.Model):
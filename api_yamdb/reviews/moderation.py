@@ -0,0 +1,84 @@
+"""
+Массовая модерация отзывов и комментариев.
+
+Выбранные объекты обрабатываются порциями по MODERATION_BATCH_SIZE, каждая
+порция в своей транзакции, и не больше MODERATION_LIMIT объектов за вызов.
+Функции возвращают сводку и число выполненных порций: от него зависит
+бюджет SQL-запросов маршрута, см. api/query_budget.py.
+Отзывы скрываются и удаляются через hide_reviews и delete_reviews, поэтому
+показатели TitleStat остаются согласованными с видимыми отзывами, а
+комментарии удаляемых отзывов тоже удаляются порциями.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from .deletion import delete_reviews, hide_reviews, take_batch
+from .models import Comment, Review
+
+HIDE, DELETE = 'hide', 'delete'
+
+
+def moderate_reviews(reviews, action):
+    """
+    Скрывает (HIDE) или удаляет (DELETE) отзывы из queryset.
+    Возвращает сводку с количеством обработанных объектов и признаком
+    has_more, если лимит исчерпан раньше, чем закончились отзывы,
+    и число порций.
+    """
+    summary = {
+        'reviews_hidden': 0,
+        'reviews_deleted': 0,
+        'comments_deleted': 0,
+        'has_more': False,
+    }
+    if action == HIDE:
+        reviews = reviews.filter(is_hidden=False)
+    limit = settings.MODERATION_LIMIT
+    processed = batches = 0
+    while processed < limit:
+        batch_size = min(settings.MODERATION_BATCH_SIZE, limit - processed)
+        if action == HIDE:
+            with transaction.atomic():
+                review_ids = take_batch(
+                    reviews.select_for_update(), batch_size
+                )
+                if not review_ids:
+                    return summary, batches
+                summary['reviews_hidden'] += hide_reviews(
+                    Review.objects.filter(pk__in=review_ids)
+                )
+            batches += 1
+        else:
+            review_ids = take_batch(reviews, batch_size)
+            if not review_ids:
+                return summary, batches
+            comments, steps = delete_reviews(
+                review_ids, settings.MODERATION_BATCH_SIZE
+            )
+            summary['comments_deleted'] += comments
+            summary['reviews_deleted'] += len(review_ids)
+            batches += steps
+        processed += len(review_ids)
+    summary['has_more'] = reviews.exists()
+    return summary, batches
+
+
+def moderate_comments(comments):
+    """Удаляет комментарии из queryset, сводка как у moderate_reviews."""
+    summary = {'comments_deleted': 0, 'has_more': False}
+    batches = 0
+    limit = settings.MODERATION_LIMIT
+    while summary['comments_deleted'] < limit:
+        batch_size = min(
+            settings.MODERATION_BATCH_SIZE,
+            limit - summary['comments_deleted'],
+        )
+        with transaction.atomic():
+            comment_ids = take_batch(comments, batch_size)
+            if not comment_ids:
+                return summary, batches
+            Comment.objects.filter(pk__in=comment_ids).delete()
+        summary['comments_deleted'] += len(comment_ids)
+        batches += 1
+    summary['has_more'] = comments.exists()
+    return summary, batches
@@ -0,0 +1,212 @@
+"""
+Секционирование таблиц отзывов и комментариев в PostgreSQL.
+
+reviews_review делится по хэшу title_id, reviews_comment - по хэшу
+review_id: запросы /titles/{id}/reviews/ и /reviews/{id}/comments/ читают
+одну секцию, а VACUUM и обслуживание индексов работают с небольшими
+таблицами. Первичный ключ секционированной таблицы обязан включать ключ
+секционирования, поэтому в базе он становится (id, title_id) и
+(id, review_id); для ORM первичным ключом остаётся id, значения которого
+по-прежнему выдаёт общая последовательность. Ограничение
+unique_together ('author', 'title') содержит title_id и сохраняется.
+
+Внешний ключ на секционированную таблицу требует уникальности id без
+ключа секционирования, поэтому ограничение reviews_comment.review_id
+удаляется. Вместо него связь поддерживают триггеры (COMMENT_REVIEW_SQL):
+вставка или изменение комментария блокирует отзыв FOR KEY SHARE, как это
+делает внешний ключ, и завершается ошибкой foreign_key_violation
+(IntegrityError в Django), если отзыва нет, а удаление отзыва удаляет
+его оставшиеся комментарии. ORM и delete_reviews удаляют комментарии
+раньше отзывов, так что триггер удаления обычно ничего не находит.
+
+Преобразование выполняется только командой partition_reviews, миграции
+таблицы не меняют. На других СУБД таблицы остаются обычными.
+"""
+import re
+
+from django.conf import settings
+
+PARTITIONED_TABLES = (
+    ('reviews_review', 'title_id'),
+    ('reviews_comment', 'review_id'),
+)
+COMMENT_REVIEW_FK = 'reviews_comment_review_id_fk_reviews_review_id'
+COMMENT_REVIEW_SQL = (
+    '''
+    CREATE OR REPLACE FUNCTION reviews_comment_check_review() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        PERFORM 1 FROM reviews_review WHERE id = NEW.review_id FOR KEY SHARE;
+        IF NOT FOUND THEN
+            RAISE foreign_key_violation USING MESSAGE = format(
+                'reviews_comment.review_id=%s: отзыв не найден',
+                NEW.review_id
+            );
+        END IF;
+        RETURN NEW;
+    END $$
+    ''',
+    '''
+    CREATE OR REPLACE FUNCTION reviews_review_delete_comments()
+    RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        DELETE FROM reviews_comment WHERE review_id = OLD.id;
+        RETURN OLD;
+    END $$
+    ''',
+    'CREATE TRIGGER reviews_comment_review_check '
+    'AFTER INSERT OR UPDATE OF review_id ON reviews_comment '
+    'FOR EACH ROW EXECUTE FUNCTION reviews_comment_check_review()',
+    'CREATE TRIGGER reviews_review_comments_cascade '
+    'AFTER DELETE ON reviews_review '
+    'FOR EACH ROW EXECUTE FUNCTION reviews_review_delete_comments()',
+)
+
+
+def is_supported(connection):
+    return connection.vendor == 'postgresql'
+
+
+def is_partitioned(cursor, table):
+    cursor.execute(
+        'SELECT relkind FROM pg_class WHERE oid = %s::regclass', [table]
+    )
+    return cursor.fetchone()[0] == 'p'
+
+
+def fetch_all(cursor, sql, params):
+    cursor.execute(sql, params)
+    return cursor.fetchall()
+
+
+def table_definition(cursor, table):
+    """
+    Ограничения (кроме первичного ключа), индексы, не связанные
+    с ограничениями, и последовательность столбца id таблицы.
+    """
+    constraints = fetch_all(
+        cursor,
+        'SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint '
+        "WHERE conrelid = %s::regclass AND contype IN ('u', 'f') "
+        'ORDER BY conname',
+        [table],
+    )
+    indexes = fetch_all(
+        cursor,
+        'SELECT i.relname, pg_get_indexdef(i.oid) FROM pg_index x '
+        'JOIN pg_class i ON i.oid = x.indexrelid '
+        'WHERE x.indrelid = %s::regclass AND NOT EXISTS ('
+        'SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid) '
+        'ORDER BY i.relname',
+        [table],
+    )
+    cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [table, 'id'])
+    return constraints, indexes, cursor.fetchone()[0]
+
+
+def rebuild_table(cursor, table, key=None, partitions=0):
+    """
+    Пересоздаёт таблицу с теми же столбцами, ограничениями и индексами:
+    секционированной по хэшу key или, без key, обычной. Данные
+    копируются одним INSERT ... SELECT.
+    """
+    old_table = f'{table}_old'
+    cursor.execute(f'ALTER TABLE {table} RENAME TO {old_table}')
+    constraints, indexes, sequence = table_definition(cursor, old_table)
+    cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY NONE')
+    partition_by = f' PARTITION BY HASH ({key})' if key else ''
+    cursor.execute(
+        f'CREATE TABLE {table} (LIKE {old_table} '
+        f'INCLUDING DEFAULTS INCLUDING CONSTRAINTS){partition_by}'
+    )
+    for remainder in range(partitions if key else 0):
+        cursor.execute(
+            f'CREATE TABLE {table}_p{remainder} PARTITION OF {table} '
+            f'FOR VALUES WITH (MODULUS {partitions}, '
+            f'REMAINDER {remainder})'
+        )
+    cursor.execute(f'INSERT INTO {table} SELECT * FROM {old_table}')
+    cursor.execute(f'DROP TABLE {old_table}')
+    primary_key = f'id, {key}' if key else 'id'
+    cursor.execute(
+        f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey '
+        f'PRIMARY KEY ({primary_key})'
+    )
+    for name, definition in constraints:
+        cursor.execute(
+            f'ALTER TABLE {table} ADD CONSTRAINT {name} {definition}'
+        )
+    old_table_re = re.compile(rf' ON (ONLY )?(\w+\.)?{old_table} ')
+    for _, definition in indexes:
+        cursor.execute(old_table_re.sub(f' ON {table} ', definition))
+    cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {table}.id')
+
+
+def drop_comment_review_fk(cursor):
+    for (name,) in fetch_all(
+        cursor,
+        'SELECT conname FROM pg_constraint WHERE contype = %s '
+        'AND conrelid = %s::regclass AND confrelid = %s::regclass',
+        ['f', 'reviews_comment', 'reviews_review'],
+    ):
+        cursor.execute(
+            f'ALTER TABLE reviews_comment DROP CONSTRAINT {name}'
+        )
+
+
+def create_comment_review_triggers(cursor):
+    for sql in COMMENT_REVIEW_SQL:
+        cursor.execute(sql)
+
+
+def drop_comment_review_triggers(cursor):
+    cursor.execute(
+        'DROP TRIGGER IF EXISTS reviews_review_comments_cascade '
+        'ON reviews_review'
+    )
+    cursor.execute(
+        'DROP TRIGGER IF EXISTS reviews_comment_review_check '
+        'ON reviews_comment'
+    )
+    cursor.execute('DROP FUNCTION IF EXISTS reviews_review_delete_comments()')
+    cursor.execute('DROP FUNCTION IF EXISTS reviews_comment_check_review()')
+
+
+def partition(connection, partitions=None):
+    """
+    Секционирует таблицы отзывов и комментариев, если они ещё обычные.
+    Уже секционированным таблицам пересоздаёт триггеры связи комментария
+    с отзывом и возвращает False.
+    """
+    partitions = partitions or settings.REVIEWS_PARTITIONS
+    with connection.cursor() as cursor:
+        if is_partitioned(cursor, 'reviews_review'):
+            drop_comment_review_triggers(cursor)
+            create_comment_review_triggers(cursor)
+            return False
+        # Отложенные проверки внешних ключей не дают менять таблицы
+        # в транзакции, где они ещё не выполнены
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        drop_comment_review_fk(cursor)
+        for table, key in PARTITIONED_TABLES:
+            rebuild_table(cursor, table, key, partitions)
+        create_comment_review_triggers(cursor)
+    return True
+
+
+def unpartition(connection):
+    """Возвращает обычные таблицы и внешний ключ комментария на отзыв."""
+    with connection.cursor() as cursor:
+        if not is_partitioned(cursor, 'reviews_review'):
+            return False
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        drop_comment_review_triggers(cursor)
+        for table, _ in reversed(PARTITIONED_TABLES):
+            rebuild_table(cursor, table)
+        cursor.execute(
+            'ALTER TABLE reviews_comment '
+            f'ADD CONSTRAINT {COMMENT_REVIEW_FK} '
+            'FOREIGN KEY (review_id) REFERENCES reviews_review (id) '
+            'DEFERRABLE INITIALLY DEFERRED'
+        )
+    return True
@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Review, Title, TitleStat
+
+
+def trending_since():
+    """Начало скользящего окна для списка популярных произведений."""
+    return timezone.now() - timedelta(days=settings.TRENDING_WINDOW_DAYS)
+
+
+def refresh_title_stat(title_id):
+    """
+    Полностью пересчитывает показатели одного произведения по видимым
+    отзывам активных авторов.
+    """
+    totals = Review.objects.filter(
+        title_id=title_id, is_hidden=False, author__is_active=True
+    ).aggregate(
+        reviews_count=Count('id'),
+        score_sum=Sum('score'),
+        recent_reviews_count=Count(
+            'id', filter=Q(pub_date__gte=trending_since())
+        ),
+    )
+    reviews_count = totals['reviews_count']
+    score_sum = totals['score_sum'] or 0
+    TitleStat.objects.update_or_create(
+        title_id=title_id,
+        defaults={
+            'reviews_count': reviews_count,
+            'score_sum': score_sum,
+            'rating': score_sum / reviews_count if reviews_count else None,
+            'recent_reviews_count': totals['recent_reviews_count'],
+        },
+    )
+
+
+def refresh_trending():
+    """
+    Пересчитывает количество отзывов за окно одним UPDATE с подзапросом
+    COUNT: значения, которые сигналы отзывов успели изменить во время
+    пересчёта, не перезаписываются устаревшими. Затрагивает только
+    произведения с отзывами внутри окна и с ненулевым счётчиком, поэтому
+    стоимость не зависит от размера всей таблицы.
+    Возвращает количество изменённых записей.
+    """
+    recent = Review.objects.filter(
+        pub_date__gte=trending_since(), is_hidden=False,
+        author__is_active=True,
+    )
+    recent_count = recent.filter(
+        title_id=OuterRef('title_id')
+    ).order_by().values('title_id').annotate(total=Count('id')).values(
+        'total'
+    )
+    return TitleStat.objects.filter(
+        Q(recent_reviews_count__gt=0)
+        | Q(title_id__in=recent.values('title_id'))
+    ).update(
+        recent_reviews_count=Coalesce(Subquery(recent_count), 0)
+    )
+
+
+def rebuild_stats(batch_size=1000):
+    """
+    Пересчитывает показатели всех произведений порциями по batch_size,
+    чтобы исправить возможное расхождение счётчиков.
+    """
+    last_id = 0
+    rebuilt = 0
+    while True:
+        title_ids = list(
+            Title.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not title_ids:
+            return rebuilt
+        for title_id in title_ids:
+            refresh_title_stat(title_id)
+        rebuilt += len(title_ids)
+        last_id = title_ids[-1]
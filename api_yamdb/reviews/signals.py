@@ -0,0 +1,44 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Review, Title, TitleStat
+from .rankings import refresh_title_stat, trending_since
+
+
+@receiver(post_save, sender=Title)
+def create_title_stat(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        TitleStat.objects.get_or_create(title=instance)
+
+
+@receiver(post_save, sender=Review)
+def update_stat_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw or instance.is_hidden:
+        return
+    if created:
+        updated = TitleStat.objects.apply_delta(
+            instance.title_id, score=instance.score, count=1, recent=1
+        )
+    else:
+        old_score = getattr(instance, '_loaded_score', None)
+        if old_score is None:
+            updated = 0
+        else:
+            updated = TitleStat.objects.apply_delta(
+                instance.title_id, score=instance.score - old_score
+            )
+    if not updated:
+        refresh_title_stat(instance.title_id)
+    instance._loaded_score = instance.score
+
+
+@receiver(post_delete, sender=Review)
+def update_stat_on_delete(sender, instance, **kwargs):
+    if instance.is_hidden:
+        return
+    TitleStat.objects.apply_delta(
+        instance.title_id,
+        score=-instance.score,
+        count=-1,
+        recent=-int(instance.pub_date >= trending_since()),
+    )
@@ -0,0 +1,63 @@
+from django.db import migrations
+
+INDEXES = (
+    'CREATE INDEX IF NOT EXISTS users_user_username_upper_idx '
+    'ON users_user (UPPER(username::text) text_pattern_ops)',
+)
+TRIGRAM_INDEXES = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS users_user_username_trgm_idx '
+    'ON users_user USING gin (UPPER(username::text) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS users_user_email_trgm_idx '
+    'ON users_user USING gin (UPPER(email::text) gin_trgm_ops)',
+)
+DROP_INDEXES = (
+    'DROP INDEX IF EXISTS users_user_email_trgm_idx',
+    'DROP INDEX IF EXISTS users_user_username_trgm_idx',
+    'DROP INDEX IF EXISTS users_user_username_upper_idx',
+)
+
+
+def trigram_available(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_available_extensions "
+            "WHERE name = 'pg_trgm')"
+        )
+        return cursor.fetchone()[0]
+
+
+def run_postgresql(statements, trigram_statements=()):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        if trigram_available(schema_editor):
+            statements_to_run = statements + trigram_statements
+        else:
+            statements_to_run = statements
+        for statement in statements_to_run:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+    """
+    Индексы поиска пользователей в PostgreSQL, см. users/search.py:
+    функциональный индекс UPPER(username) для поиска по префиксу без
+    учёта регистра (выражение совпадает с тем, что Django строит для
+    istartswith) и триграммные GIN-индексы UPPER(username) и UPPER(email)
+    для поиска подстроки и сходства. Расширение
+    pg_trgm и триграммные индексы создаются, только если расширение есть
+    на сервере; без него поиск обходится подстрокой.
+    """
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_postgresql(INDEXES, TRIGRAM_INDEXES),
+            run_postgresql(DROP_INDEXES)
+        ),
+    ]
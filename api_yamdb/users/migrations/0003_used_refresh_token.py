@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_username_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UsedRefreshToken',
+            fields=[
+                ('jti', models.CharField(max_length=255, primary_key=True, serialize=False, verbose_name='Идентификатор токена')),
+                ('expires', models.DateTimeField(db_index=True, verbose_name='Истекает')),
+            ],
+            options={
+                'verbose_name': 'Использованный refresh-токен',
+                'verbose_name_plural': 'Использованные refresh-токены',
+            },
+        ),
+    ]
@@ -41,3 +41,24 @@ class User(AbstractUser):
     @property
     def is_user(self):
         return self.role == USER_ROLE
+
+
+class UsedRefreshToken(models.Model):
+    """
+    Использованный refresh-токен: повторный обмен отклоняется, пока
+    токен не истёк. Устаревшие записи удаляются при обмене токенов
+    в PostgreSQL или командой purge_used_tokens, см. api/tokens.py.
+    """
+    jti = models.CharField(
+        max_length=255,
+        primary_key=True,
+        verbose_name='Идентификатор токена'
+    )
+    expires = models.DateTimeField(
+        db_index=True,
+        verbose_name='Истекает'
+    )
+
+    class Meta:
+        verbose_name = 'Использованный refresh-токен'
+        verbose_name_plural = 'Использованные refresh-токены'
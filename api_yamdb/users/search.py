@@ -0,0 +1,87 @@
+"""
+Поиск пользователей для администраторов.
+
+Первыми идут пользователи, чей username начинается с запроса без учёта
+регистра: в PostgreSQL условие UPPER(username::text) LIKE UPPER('q%')
+читается по функциональному индексу users_user_username_upper_idx
+(миграция 0002). За ними - пользователи, у которых username или email
+содержит запрос или похож на него по триграммам, в порядке убывания
+сходства. С pg_trgm оба условия строятся на UPPER(username) и
+UPPER(email), по которым та же миграция создаёт GIN-индексы
+gin_trgm_ops, поэтому и поиск подстроки (UPPER(...)::text LIKE '%Q%'),
+и сходство читаются по индексу. Триграммы дополняют
+поиск подстроки, а не заменяют его: короткий запрос может иметь низкое
+сходство с длинным username, в котором он встречается. На других СУБД,
+без установленного расширения pg_trgm или при USER_SEARCH_TRIGRAM=False
+ищется только подстрока.
+
+Каждой строке назначается ключ сортировки SEARCH_ORDERING, все поля
+которого возрастают, - по нему api.pagination.UserSearchPagination
+строит keyset-курсор.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connections
+from django.db.models import Case, FloatField, IntegerField, Q, Value, When
+from django.db.models.functions import Cast, Greatest, Upper
+
+PREFIX, SIMILAR = 0, 1
+SEARCH_ORDERING = ('search_group', 'search_score', 'search_key', 'id')
+
+
+@lru_cache(maxsize=None)
+def has_trigram_extension(alias):
+    """Установлено ли в базе расширение pg_trgm; проверяется один раз."""
+    with connections[alias].cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_extension "
+            "WHERE extname = 'pg_trgm')"
+        )
+        return cursor.fetchone()[0]
+
+
+def uses_trigrams(queryset):
+    return (
+        settings.USER_SEARCH_TRIGRAM
+        and connections[queryset.db].vendor == 'postgresql'
+        and has_trigram_extension(queryset.db)
+    )
+
+
+def search_users(queryset, query, role=None):
+    """Пользователи, подходящие под запрос, в порядке SEARCH_ORDERING."""
+    if role:
+        queryset = queryset.filter(role=role)
+    queryset = queryset.annotate(search_key=Upper('username'))
+    prefix = Q(username__istartswith=query)
+    if uses_trigrams(queryset):
+        queryset = queryset.annotate(search_email=Upper('email'))
+        similar = (
+            Q(search_key__contains=query.upper())
+            | Q(search_email__contains=query.upper())
+            | Q(search_key__trigram_similar=query)
+            | Q(search_email__trigram_similar=query)
+        )
+        similarity = Greatest(
+            TrigramSimilarity('search_key', query),
+            TrigramSimilarity('search_email', query),
+            output_field=FloatField(),
+        )
+        score = Cast(similarity * -1000, IntegerField())
+    else:
+        similar = Q(username__icontains=query) | Q(email__icontains=query)
+        score = Value(0)
+    return queryset.filter(prefix | similar).annotate(
+        search_group=Case(
+            When(prefix, then=Value(PREFIX)),
+            default=Value(SIMILAR),
+            output_field=IntegerField(),
+        ),
+        search_score=Case(
+            When(prefix, then=Value(0)),
+            default=score,
+            output_field=IntegerField(),
+        ),
+    ).order_by(*SEARCH_ORDERING)
@@ -1,9 +1,20 @@
 import sys
 from os.path import abspath, dirname, join
 
+import pytest
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 infra_dir_path = join(root_dir, 'infra')
 
 pytest_plugins = [
 ]
+
+
+@pytest.fixture(autouse=True)
+def read_from_primary(settings):
+    """
+    Реплики в тестах - зеркала основной базы (TEST MIRROR), поэтому
+    чтение идёт в неё. Тесты маршрутизатора задают реплики сами.
+    """
+    settings.DATABASE_REPLICAS = []
@@ -0,0 +1,108 @@
+import pytest
+from rest_framework.test import APIClient
+
+from api.query_budget import assert_query_budget
+from reviews.models import Category, Comment, Review, Title
+from users.models import User
+
+
+@pytest.fixture
+def author(db):
+    return User.objects.create(username='reader', email='reader@ya.ru')
+
+
+@pytest.fixture
+def activity(author):
+    category = Category.objects.create(name='Фильм', slug='movie')
+    other = User.objects.create(username='other', email='other@ya.ru')
+    reviews = []
+    for i in range(7):
+        title = Title.objects.create(
+            name=f'Фильм {i}', year=2000, category=category
+        )
+        reviews.append(Review.objects.create(
+            author=author, title=title, text=f'Отзыв {i}', score=7,
+            is_hidden=i == 6,
+        ))
+        review = Review.objects.create(
+            author=other, title=title, text='Чужой', score=5
+        )
+        Comment.objects.create(author=author, review=review, text=f'К {i}')
+    return reviews
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def read_all(client, url, route):
+    results = []
+    while url:
+        with assert_query_budget(route):
+            response = client.get(url)
+        assert response.status_code == 200, response.data
+        data = response.json()
+        results.extend(data['results'])
+        url = data['next']
+    return results
+
+
+class TestAuthorActivity:
+
+    def test_my_reviews(self, author, activity):
+        results = read_all(
+            client_for(author), '/api/v1/users/me/reviews/',
+            'api:users-my-reviews',
+        )
+        expected = sorted(
+            activity[:6], key=lambda review: (review.pub_date, review.id),
+            reverse=True,
+        )
+        assert [row['id'] for row in results] == [
+            review.id for review in expected
+        ]
+        assert results[0]['title'] == {
+            'id': expected[0].title_id, 'name': expected[0].title.name,
+        }
+        assert results[0]['author'] == 'reader'
+
+    def test_my_comments(self, author, activity):
+        results = read_all(
+            client_for(author), '/api/v1/users/me/comments/',
+            'api:users-my-comments',
+        )
+        assert len(results) == 7
+        comment = Comment.objects.select_related('review__title').get(
+            pk=results[0]['id']
+        )
+        assert results[0]['review'] == comment.review_id
+        assert results[0]['title'] == {
+            'id': comment.review.title_id, 'name': comment.review.title.name,
+        }
+
+    def test_anonymous(self, db):
+        response = APIClient().get('/api/v1/users/me/reviews/')
+        assert response.status_code == 401
+
+    def test_admin_view(self, author, activity):
+        admin = User.objects.create(
+            username='root', email='root@ya.ru', role='admin'
+        )
+        results = read_all(
+            client_for(admin), '/api/v1/users/reader/reviews/',
+            'api:users-reviews',
+        )
+        assert len(results) == 6
+        results = read_all(
+            client_for(admin), '/api/v1/users/reader/comments/',
+            'api:users-comments',
+        )
+        assert len(results) == 7
+        response = client_for(admin).get('/api/v1/users/nobody/reviews/')
+        assert response.status_code == 404
+
+    def test_admin_only(self, author, activity):
+        response = client_for(author).get('/api/v1/users/reader/reviews/')
+        assert response.status_code == 403
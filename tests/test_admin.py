@@ -0,0 +1,89 @@
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+
+from api.query_budget import assert_query_budget
+from reviews.models import (
+    Category, Comment, Genre, Review, Title, TitleStat,
+)
+from users.models import User
+
+CHANGELIST_BUDGET = 5
+
+
+@pytest.fixture
+def admin_client(client, db):
+    admin = User.objects.create_superuser(
+        username='root', email='root@ya.ru', password='password'
+    )
+    client.force_login(admin)
+    return client
+
+
+@pytest.fixture
+def catalogue(db):
+    category = Category.objects.create(name='Фильм', slug='movie')
+    genre = Genre.objects.create(name='Драма', slug='drama')
+    titles = [
+        Title.objects.create(name=f'Фильм {i}', year=2000, category=category)
+        for i in range(10)
+    ]
+    for title in titles:
+        title.genre.add(genre)
+    users = [
+        User.objects.create(username=f'user{i}', email=f'user{i}@ya.ru')
+        for i in range(10)
+    ]
+    for user in users:
+        for title in titles:
+            review = Review.objects.create(
+                author=user, title=title, text='Отзыв', score=7
+            )
+            Comment.objects.create(author=user, review=review, text='Да')
+
+
+class TestAdminChangelist:
+
+    @pytest.mark.parametrize('model, query', (
+        (Title, ''),
+        (Title, '?q=Фильм'),
+        (Title, '?category__id__exact=1'),
+        (Review, ''),
+        (Review, '?q=user1'),
+        (Review, '?published=week'),
+        (Comment, ''),
+        (Comment, '?q=user1'),
+        (Comment, '?published=week'),
+        (Category, ''),
+        (Genre, ''),
+    ))
+    def test_changelist_query_count(
+        self, admin_client, catalogue, model, query
+    ):
+        opts = model._meta
+        url = reverse(f'admin:{opts.app_label}_{opts.model_name}_changelist')
+        cache.clear()
+        with assert_query_budget(url + query, budget=CHANGELIST_BUDGET):
+            response = admin_client.get(url + query)
+        assert response.status_code == 200, (
+            f'Проверьте, что страница {url + query} открывается'
+        )
+
+    def test_title_without_stat(self, admin_client, catalogue):
+        TitleStat.objects.filter(title__name='Фильм 0').delete()
+        response = admin_client.get(reverse('admin:reviews_title_changelist'))
+        assert response.status_code == 200, (
+            'Проверьте, что произведение без TitleStat не ломает список'
+        )
+
+    @pytest.mark.parametrize('model', (Review, Comment))
+    def test_relations_use_raw_id_widgets(self, admin_client, catalogue, model):
+        opts = model._meta
+        url = reverse(f'admin:{opts.app_label}_{opts.model_name}_add')
+        response = admin_client.get(url)
+        assert b'vForeignKeyRawIdAdminField' in response.content, (
+            'Проверьте, что связи редактируются через raw_id_fields'
+        )
+        assert b'<option value="' not in response.content, (
+            'Проверьте, что форма не загружает связанные таблицы целиком'
+        )
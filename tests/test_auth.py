@@ -0,0 +1,208 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth.tokens import default_token_generator
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import IntegrityError, connection
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api import services
+from api import tokens as tokens_module
+from api.query_budget import assert_query_budget
+from users.models import UsedRefreshToken, User
+
+SIGNUP_URL = '/api/v1/auth/signup/'
+RESET_URL = '/api/v1/auth/reset/'
+TOKEN_URL = '/api/v1/auth/token/'
+REFRESH_URL = '/api/v1/auth/token/refresh/'
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+@pytest.fixture
+def existing_user(db):
+    return User.objects.create(username='reader', email='reader@ya.ru')
+
+
+def signup(data, budget, **headers):
+    with assert_query_budget('api:signup', budget=budget):
+        return APIClient().post(SIGNUP_URL, data, **headers)
+
+
+class TestSignup:
+
+    def test_new_user(self, db):
+        response = signup({'username': 'new', 'email': 'new@ya.ru'}, 4)
+        assert response.status_code == 200
+        assert response.json() == {'email': 'new@ya.ru', 'username': 'new'}
+        assert User.objects.filter(username='new').exists()
+        assert len(mail.outbox) == 1
+
+    def test_repeat_signup_resends_code(self, existing_user):
+        data = {'username': 'reader', 'email': 'reader@ya.ru'}
+        response = signup(data, 1)
+        assert response.status_code == 200, (
+            'Проверьте, что повторная регистрация с той же парой '
+            'username и email отправляет код повторно'
+        )
+        assert len(mail.outbox) == 1
+        assert User.objects.count() == 1
+
+    @pytest.mark.parametrize('data, field', (
+        ({'username': 'reader', 'email': 'other@ya.ru'}, 'username'),
+        ({'username': 'other', 'email': 'reader@ya.ru'}, 'email'),
+    ))
+    def test_taken_username_or_email(self, existing_user, data, field):
+        response = signup(data, 1)
+        assert response.status_code == 400
+        assert field in response.json()
+        assert len(mail.outbox) == 0
+
+    @pytest.mark.parametrize('rival, field', (
+        ({'username': 'new', 'email': 'rival@ya.ru'}, 'username'),
+        ({'username': 'rival', 'email': 'new@ya.ru'}, 'email'),
+    ))
+    def test_concurrent_signup_conflict(self, db, monkeypatch, rival, field):
+        User.objects.create(**rival)
+        find_conflicts = services.find_conflicts
+        lookups = []
+
+        def rival_not_committed_yet(username, email):
+            lookups.append(username)
+            return find_conflicts(username, email) if len(lookups) > 1 else []
+
+        def create(**kwargs):
+            raise IntegrityError
+
+        monkeypatch.setattr(services, 'find_conflicts', rival_not_committed_yet)
+        monkeypatch.setattr(User.objects, 'create', create)
+        response = APIClient().post(
+            SIGNUP_URL, {'username': 'new', 'email': 'new@ya.ru'}
+        )
+        assert response.status_code == 400, (
+            'Проверьте, что конфликт с одновременной регистрацией '
+            'возвращает ошибку валидации'
+        )
+        assert list(response.json()) == [field]
+        assert len(mail.outbox) == 0
+
+    def test_invalid_data_does_not_query(self, db):
+        response = signup({'username': 'me', 'email': 'me@ya.ru'}, 0)
+        assert response.status_code == 400
+
+    def test_idempotency_key(self, db):
+        data = {'username': 'new', 'email': 'new@ya.ru'}
+        headers = {'HTTP_IDEMPOTENCY_KEY': 'signup-1'}
+        first = signup(data, 4, **headers)
+        retry = signup(data, 0, **headers)
+        assert retry.status_code == first.status_code
+        assert retry.json() == first.json()
+        assert len(mail.outbox) == 1, (
+            'Проверьте, что повтор с тем же Idempotency-Key '
+            'не отправляет письмо ещё раз'
+        )
+
+        other = signup({'username': 'x', 'email': 'x@ya.ru'}, 0, **headers)
+        assert other.status_code == 422
+
+
+class TestCodeReset:
+
+    def test_reset(self, existing_user):
+        data = {'username': 'reader', 'email': 'reader@ya.ru'}
+        with assert_query_budget('api:reset'):
+            response = APIClient().post(RESET_URL, data)
+        assert response.status_code == 200
+        assert len(mail.outbox) == 1
+
+    def test_unknown_user(self, db):
+        data = {'username': 'ghost', 'email': 'ghost@ya.ru'}
+        with assert_query_budget('api:reset'):
+            response = APIClient().post(RESET_URL, data)
+        assert response.status_code == 404
+
+
+def refresh(token, budget=None, **headers):
+    with assert_query_budget('api:token-refresh', budget=budget):
+        return APIClient().post(REFRESH_URL, {'refresh': token}, **headers)
+
+
+class TestTokenRefresh:
+
+    @pytest.fixture
+    def tokens(self, existing_user):
+        response = APIClient().post(TOKEN_URL, {
+            'username': 'reader',
+            'confirmation_code': default_token_generator.make_token(
+                existing_user
+            ),
+        })
+        assert response.status_code == 200
+        assert set(response.json()) == {'token', 'refresh'}
+        return response.json()
+
+    def test_rotation(self, tokens):
+        response = refresh(tokens['refresh'])
+        assert response.status_code == 200
+        rotated = response.json()
+        assert rotated['refresh'] != tokens['refresh']
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {rotated["token"]}')
+        assert client.get('/api/v1/users/me/').json()['username'] == 'reader'
+        assert refresh(rotated['refresh']).status_code == 200
+
+    def test_used_token_is_rejected(self, tokens):
+        assert refresh(tokens['refresh']).status_code == 200
+        assert refresh(tokens['refresh'], budget=1).status_code == 401
+
+    def test_replay_is_rejected_by_another_worker(self, tokens, monkeypatch):
+        """Воркеры с разными локальными кэшами видят один список."""
+        for worker in ('worker-1', 'worker-2'):
+            monkeypatch.setitem(
+                caches._caches.caches, 'default', LocMemCache(worker, {})
+            )
+            response = refresh(tokens['refresh'])
+        assert response.status_code == 401
+        assert response.json()['detail'] == tokens_module.TOKEN_REJECTED_MESSAGE
+
+    def test_purge_used_tokens(self, tokens):
+        assert refresh(tokens['refresh']).status_code == 200
+        (used,) = UsedRefreshToken.objects.all()
+        assert tokens_module.purge_used_tokens(used.expires) == 0
+        assert tokens_module.purge_used_tokens(
+            used.expires + timedelta(seconds=1)
+        ) == 1
+        assert not UsedRefreshToken.objects.exists()
+
+    @pytest.mark.skipif(
+        connection.vendor != 'postgresql',
+        reason='Истёкшие записи удаляются при обмене только в PostgreSQL',
+    )
+    def test_refresh_purges_expired_tokens(self, tokens):
+        UsedRefreshToken.objects.create(
+            jti='expired', expires=timezone.now() - timedelta(seconds=1)
+        )
+        assert refresh(tokens['refresh']).status_code == 200
+        assert UsedRefreshToken.objects.count() == 1
+        assert not UsedRefreshToken.objects.filter(jti='expired').exists()
+
+    def test_invalid_tokens(self, tokens, existing_user):
+        assert refresh(tokens['token'], budget=0).status_code == 401
+        assert refresh('garbage', budget=0).status_code == 401
+        assert APIClient().post(REFRESH_URL, {}).status_code == 400
+        existing_user.is_active = False
+        existing_user.save()
+        assert refresh(tokens['refresh'], budget=1).status_code == 401
+        assert not UsedRefreshToken.objects.exists()
+
+    def test_ignores_expired_access_token_header(self, tokens):
+        response = refresh(
+            tokens['refresh'], HTTP_AUTHORIZATION='Bearer expired'
+        )
+        assert response.status_code == 200
@@ -0,0 +1,127 @@
+import threading
+import time
+
+import pytest
+from django.core.cache import cache
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.coalescing import coalescing_key, coalescing_stats, single_flight
+from reviews.models import Category, Title
+from users.models import User
+
+KEY = 'coalesce:test'
+
+
+@pytest.fixture(autouse=True)
+def coalescing(settings):
+    settings.COALESCE_WAIT_SECONDS = 1
+    settings.COALESCE_POLL_SECONDS = 0.01
+    cache.clear()
+    yield
+    cache.clear()
+
+
+class SlowView:
+
+    def __init__(self):
+        self.calls = 0
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.entered.set()
+        self.release.wait(1)
+        return Response({'calls': self.calls})
+
+
+class TestSingleFlight:
+
+    def test_concurrent_calls_share_one_computation(self):
+        view = SlowView()
+        responses = []
+
+        def call():
+            responses.append(single_flight(KEY, view).data)
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        view.entered.wait(1)
+        followers = [threading.Thread(target=call) for _ in range(3)]
+        for follower in followers:
+            follower.start()
+        time.sleep(0.05)
+        view.release.set()
+        for thread in [leader, *followers]:
+            thread.join()
+        assert view.calls == 1
+        assert responses == [{'calls': 1}] * 4
+        stats = coalescing_stats()
+        assert stats['leaders'] == 1
+        assert stats['local_hits'] == 3
+
+    def test_waits_for_other_worker(self):
+        cache.add(f'{KEY}:lock', True)
+
+        def other_worker():
+            time.sleep(0.05)
+            cache.set(f'{KEY}:result', {'data': {'calls': 0}, 'status': 200})
+            cache.delete(f'{KEY}:lock')
+
+        thread = threading.Thread(target=other_worker)
+        thread.start()
+        view = SlowView()
+        view.release.set()
+        response = single_flight(KEY, view)
+        thread.join()
+        assert view.calls == 0
+        assert response.data == {'calls': 0}
+        assert coalescing_stats()['shared_hits'] == 1
+
+    def test_bounded_wait_falls_back(self, settings):
+        settings.COALESCE_WAIT_SECONDS = 0.05
+        cache.add(f'{KEY}:lock', True)
+        view = SlowView()
+        view.release.set()
+        assert single_flight(KEY, view).data == {'calls': 1}
+        assert coalescing_stats()['fallbacks'] == 1
+
+    def test_sequential_calls_are_not_cached(self):
+        view = SlowView()
+        view.release.set()
+        single_flight(KEY, view)
+        cache.delete(f'{KEY}:result')
+        single_flight(KEY, view)
+        assert view.calls == 2
+
+
+class TestCoalescedViews:
+
+    def test_only_anonymous_reads(self, db):
+        category = Category.objects.create(name='Фильм', slug='movie')
+        title = Title.objects.create(name='Фильм', year=2000, category=category)
+        url = f'/api/v1/titles/{title.id}/'
+        assert APIClient().get(url).json()['name'] == 'Фильм'
+        assert coalescing_stats()['leaders'] == 1
+        client = APIClient()
+        client.force_authenticate(
+            User.objects.create(username='reader', email='reader@ya.ru')
+        )
+        assert client.get(url).status_code == 200
+        assert coalescing_stats()['leaders'] == 1
+
+    def test_key_includes_host_and_scheme(self):
+        factory = APIRequestFactory()
+        keys = {
+            coalescing_key(factory.get('/api/v1/titles/?page=2', **extra))
+            for extra in (
+                {},
+                {'HTTP_HOST': 'example.com'},
+                {'HTTP_HOST': 'example.com', 'secure': True},
+            )
+        }
+        assert len(keys) == 3, (
+            'Проверьте, что ответы с абсолютными ссылками не делятся '
+            'между разными хостами и схемами'
+        )
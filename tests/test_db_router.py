@@ -0,0 +1,114 @@
+import pytest
+from django.core.cache import cache
+from django.db import DatabaseError
+from rest_framework.test import APIClient
+
+from api_yamdb import db_router
+from reviews.models import Category, Review, Title
+from users.models import User
+
+
+@pytest.fixture
+def replica_settings(settings):
+    settings.DATABASE_REPLICAS = ['replica_0']
+    yield settings
+    db_router.set_read_replica(False)
+    db_router._unavailable_until.clear()
+
+
+class TestReplicaRouter:
+
+    def test_reads_go_to_primary_by_default(self, replica_settings):
+        router = db_router.ReplicaRouter()
+        assert router.db_for_read(None) is None, (
+            'Проверьте, что без разрешения чтение идёт в основную базу'
+        )
+
+    def test_safe_reads_go_to_replica(self, replica_settings, monkeypatch):
+        monkeypatch.setattr(db_router, 'replica_available', lambda alias: True)
+        router = db_router.ReplicaRouter()
+        db_router.set_read_replica(True)
+        assert router.db_for_read(None) == 'replica_0', (
+            'Проверьте, что чтение направляется на реплику'
+        )
+        assert router.db_for_write(None) == 'default', (
+            'Проверьте, что запись всегда идёт в основную базу'
+        )
+
+    def test_fallback_to_primary(self, replica_settings, monkeypatch):
+        class BrokenConnection:
+            def ensure_connection(self):
+                raise DatabaseError('replica is down')
+
+        monkeypatch.setattr(
+            db_router, 'connections', {'replica_0': BrokenConnection()}
+        )
+        router = db_router.ReplicaRouter()
+        db_router.set_read_replica(True)
+        assert router.db_for_read(None) is None, (
+            'Проверьте, что при недоступной реплике чтение идёт в основную базу'
+        )
+        assert 'replica_0' in db_router._unavailable_until, (
+            'Проверьте, что недоступная реплика временно исключается'
+        )
+
+    def test_pin_after_write(self, replica_settings):
+        user = User(pk=10**6, username='pinned')
+        assert not db_router.is_pinned_to_primary(user)
+        db_router.pin_to_primary(user)
+        assert db_router.is_pinned_to_primary(user), (
+            'Проверьте, что после записи пользователь читает с основной базы'
+        )
+
+    def test_review_insert_uses_write_database(self, db, monkeypatch):
+        monkeypatch.setattr(
+            db_router.ReplicaRouter, 'db_for_read',
+            lambda self, model, **hints: 'replica_0',
+        )
+        category = Category.objects.create(name='Фильм', slug='movie')
+        title = Title.objects.create(name='Фильм', year=2000, category=category)
+        author = User.objects.create(username='author', email='a@ya.ru')
+        review = Review.objects.insert_unique(author, title.id, 'Отзыв', 7)
+        assert review._state.db == 'default'
+        review, created = Review.objects.update_or_insert(
+            author, title.id, 'Новый текст', 8
+        )
+        assert not created and review.score == 8
+
+
+
+class TestReadYourWrites:
+
+    def test_reads_after_write_use_primary(self, db, monkeypatch):
+        reads = []
+        monkeypatch.setattr(
+            db_router.ReplicaRouter, 'db_for_read',
+            lambda self, model, **hints: reads.append(
+                db_router.reads_from_replica()
+            ),
+        )
+        cache.clear()
+        admin = User.objects.create(
+            username='admin', email='admin@example.com', role='admin'
+        )
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        client.get('/api/v1/categories/')
+        assert reads and all(reads), (
+            'Проверьте, что чтение до записи разрешено с реплик'
+        )
+        response = client.post(
+            '/api/v1/categories/', {'name': 'Фильм', 'slug': 'movie'}
+        )
+        assert response.status_code == 201
+        reads.clear()
+        assert client.get('/api/v1/categories/').json()['count'] == 1
+        assert reads and not any(reads), (
+            'Проверьте, что автор записи сразу читает с основной базы'
+        )
+        reads.clear()
+        APIClient().get('/api/v1/categories/')
+        assert reads and all(reads), (
+            'Проверьте, что анонимное чтение по-прежнему идёт на реплики'
+        )
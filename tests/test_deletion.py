@@ -0,0 +1,169 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from reviews.deletion import delete_reviews, purge_task
+from reviews.rankings import rebuild_stats
+from reviews.models import (
+    Category, Comment, DeletionTask, Review, Title, TitleStat,
+)
+from users.models import User
+
+
+@pytest.fixture(autouse=True)
+def deferred_deletion(settings):
+    settings.DEFERRED_DELETION = True
+
+
+@pytest.fixture
+def catalogue(db):
+    category = Category.objects.create(name='Фильм', slug='movie')
+    titles = [
+        Title.objects.create(name=f'Фильм {i}', year=2000, category=category)
+        for i in range(2)
+    ]
+    users = [
+        User.objects.create(username=f'user{i}', email=f'user{i}@ya.ru')
+        for i in range(5)
+    ]
+    for user in users:
+        for title in titles:
+            review = Review.objects.create(
+                author=user, title=title, text='Отзыв', score=user.id
+            )
+            for other in users:
+                Comment.objects.create(
+                    author=other, review=review, text='Коммент'
+                )
+    admin = User.objects.create(
+        username='admin', email='admin@ya.ru', role='admin'
+    )
+    client = APIClient()
+    client.force_authenticate(admin)
+    return {'titles': titles, 'users': users, 'client': client}
+
+
+def assert_stats_match_reviews():
+    for stat in TitleStat.objects.all():
+        reviews = Review.objects.filter(
+            title=stat.title, is_hidden=False, author__is_active=True
+        )
+        scores = list(reviews.values_list('score', flat=True))
+        assert (stat.reviews_count, stat.score_sum) == (
+            len(scores), sum(scores)
+        ), 'Проверьте, что рейтинг совпадает с видимыми отзывами'
+
+
+class TestDeferredDeletion:
+
+    def test_user_is_hidden_then_purged_in_batches(self, catalogue):
+        user = catalogue['users'][0]
+        response = catalogue['client'].delete(
+            f'/api/v1/users/{user.username}/'
+        )
+        assert response.status_code == 204
+        assert catalogue['client'].get(
+            f'/api/v1/users/{user.username}/'
+        ).status_code == 404, 'Проверьте, что пользователь скрыт сразу'
+
+        assert_stats_match_reviews()
+        title = catalogue['titles'][0]
+        reviews = catalogue['client'].get(
+            f'/api/v1/titles/{title.id}/reviews/'
+        ).json()
+        assert reviews['count'] == 4 and all(
+            review['author'] != user.username for review in reviews['results']
+        ), 'Проверьте, что отзывы удаляемого пользователя скрыты сразу'
+        review = Review.objects.filter(title=title, is_hidden=False).first()
+        comments = catalogue['client'].get(
+            f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+        ).json()
+        assert comments['count'] == 4, (
+            'Проверьте, что комментарии удаляемого пользователя скрыты сразу'
+        )
+
+        task = DeletionTask.objects.get()
+        while not purge_task(task, batch_size=3, max_batches=1):
+            assert_stats_match_reviews()
+        task.refresh_from_db()
+        assert task.status == DeletionTask.DONE
+        assert task.reviews_deleted == 2
+        assert not User.objects.filter(pk=user.pk).exists()
+        assert not Comment.objects.filter(author=user).exists()
+        assert_stats_match_reviews()
+
+    @pytest.mark.parametrize('deferred', (True, False))
+    def test_admin_sees_deactivated_users(self, catalogue, settings, deferred):
+        settings.DEFERRED_DELETION = deferred
+        user = catalogue['users'][1]
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        url = f'/api/v1/users/{user.username}/'
+        response = catalogue['client'].get(url)
+        assert response.status_code == 200, (
+            'Проверьте, что администратор видит деактивированного пользователя'
+        )
+        response = catalogue['client'].patch(url, {'bio': 'Вернулся'})
+        assert response.status_code == 200
+
+    def test_review_is_hidden_immediately(self, catalogue):
+        title = catalogue['titles'][0]
+        review = Review.objects.filter(title=title).first()
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        response = catalogue['client'].delete(f'{url}{review.id}/')
+        assert response.status_code == 204
+        assert catalogue['client'].get(url).json()['count'] == 4
+        assert_stats_match_reviews()
+
+        call_command('purge_deleted', batch_size=2)
+        assert not Review.objects.filter(pk=review.pk).exists()
+        assert not Comment.objects.filter(review_id=review.pk).exists()
+        assert_stats_match_reviews()
+
+    def test_title_is_hidden_then_purged(self, catalogue):
+        title = catalogue['titles'][0]
+        response = catalogue['client'].delete(f'/api/v1/titles/{title.id}/')
+        assert response.status_code == 204
+        assert catalogue['client'].get('/api/v1/titles/').json()[
+            'count'
+        ] == 1
+        assert catalogue['client'].get(
+            f'/api/v1/titles/{title.id}/reviews/'
+        ).status_code == 404
+
+        call_command('purge_deleted', batch_size=4)
+        assert not Title.objects.filter(pk=title.pk).exists()
+        assert not Review.objects.filter(title_id=title.pk).exists()
+        assert Review.objects.count() == 5
+
+    def test_review_comments_are_deleted_in_batches(self, catalogue):
+        review = Review.objects.first()
+        with CaptureQueriesContext(connection) as context:
+            assert delete_reviews([review.id], batch_size=2) == (5, 4)
+        comment_deletes = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('DELETE FROM "reviews_comment" WHERE '
+                                       '"reviews_comment"."id" IN')
+        ]
+        assert len(comment_deletes) == 3, (
+            'Проверьте, что комментарии удаляются порциями по batch_size'
+        )
+        assert not Review.objects.filter(pk=review.pk).exists()
+        assert_stats_match_reviews()
+
+    def test_inactive_author_is_not_counted(self, catalogue):
+        user = catalogue['users'][0]
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        title = catalogue['titles'][0]
+        detail = catalogue['client'].get(f'/api/v1/titles/{title.id}/').json()
+        scores = [other.id for other in catalogue['users'][1:]]
+        assert detail['rating'] == int(sum(scores) / len(scores)), (
+            'Проверьте, что рейтинг не учитывает отзывы неактивных авторов'
+        )
+        rebuild_stats()
+        assert_stats_match_reviews()
+        reviews = catalogue['client'].get(
+            f'/api/v1/titles/{title.id}/reviews/'
+        ).json()
+        assert reviews['count'] == len(reviews['results']) == 4
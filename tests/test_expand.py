@@ -0,0 +1,128 @@
+import sqlite3
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from rest_framework.test import APIClient
+
+from api.expansions import first_per_parent
+from api.query_budget import assert_query_budget, budget_route
+from reviews.models import Category, Comment, Review, Title
+from users.models import User
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+@pytest.fixture
+def titles(db, settings):
+    settings.EXPAND_LIMIT = 2
+    category = Category.objects.create(name='Фильм', slug='movie')
+    users = [
+        User.objects.create(username=f'user{i}', email=f'user{i}@ya.ru')
+        for i in range(4)
+    ]
+    titles = [
+        Title.objects.create(name=f'Фильм {i}', year=2000, category=category)
+        for i in range(3)
+    ]
+    for title in titles[:2]:
+        for user in users:
+            review = Review.objects.create(
+                author=user, title=title, text='Отзыв', score=7,
+                is_hidden=user == users[0],
+            )
+            for other in users[:3]:
+                Comment.objects.create(
+                    author=other, review=review, text='Комментарий'
+                )
+    return titles
+
+
+def get(url, route, budget=None, **params):
+    route = budget_route(route, params)
+    with assert_query_budget(route, budget=budget):
+        response = APIClient().get(url, params)
+    assert response.status_code == 200, response.data
+    return response.json()
+
+
+class TestExpand:
+
+    def test_titles_list(self, titles):
+        data = get(
+            '/api/v1/titles/', 'api:titles-list',
+            expand='reviews,reviews.comments',
+        )
+        results = {title['id']: title for title in data['results']}
+        visible = Review.objects.filter(is_hidden=False)
+        for title in titles[:2]:
+            reviews = results[title.id]['reviews']
+            assert [review['id'] for review in reviews] == list(
+                visible.filter(title=title).values_list('id', flat=True)[:2]
+            )
+            for review in reviews:
+                assert [
+                    comment['id'] for comment in review['comments']
+                ] == list(
+                    Comment.objects.filter(review_id=review['id'])
+                    .values_list('id', flat=True)[:2]
+                )
+                assert set(review['comments'][0]) == {
+                    'id', 'text', 'author', 'pub_date',
+                }
+        assert results[titles[2].id]['reviews'] == []
+
+    def test_titles_list_reviews_only(self, titles):
+        data = get('/api/v1/titles/', 'api:titles-list', expand='reviews')
+        review = data['results'][0]['reviews'][0]
+        assert set(review) == {'id', 'text', 'author', 'score', 'pub_date'}
+
+    def test_title_detail(self, titles):
+        data = get(
+            f'/api/v1/titles/{titles[0].id}/', 'api:titles-detail',
+            expand='reviews,reviews.comments',
+        )
+        assert len(data['reviews']) == 2
+        assert all(len(review['comments']) == 2 for review in data['reviews'])
+
+    def test_reviews(self, titles):
+        url = f'/api/v1/titles/{titles[0].id}/reviews/'
+        data = get(url, 'api:reviews-list', expand='comments')
+        assert all(len(review['comments']) == 2 for review in data['results'])
+        review_id = data['results'][0]['id']
+        data = get(
+            f'{url}{review_id}/', 'api:reviews-detail', expand='comments'
+        )
+        assert len(data['comments']) == 2
+
+    def test_unknown_expansion(self, titles):
+        with assert_query_budget('api:titles-list', budget=0):
+            response = APIClient().get(
+                '/api/v1/titles/', {'expand': 'authors'}
+            )
+        assert response.status_code == 400
+        assert 'expand' in response.json()
+
+    def test_without_expand(self, titles):
+        data = get('/api/v1/titles/', 'api:titles-list')
+        assert 'reviews' not in data['results'][0]
+
+    def test_window_function(self, titles, monkeypatch):
+        if connection.vendor == 'sqlite':
+            if sqlite3.sqlite_version_info < (3, 25):
+                pytest.skip('SQLite без оконных функций')
+            monkeypatch.setattr(
+                connection.features, 'supports_over_clause', True
+            )
+        queryset = first_per_parent(
+            Review.objects.filter(is_hidden=False), 'title_id',
+            [title.id for title in titles], 2,
+        )
+        sql = str(queryset.query)
+        assert 'ROW_NUMBER() OVER' in sql
+        assert list(queryset.values_list('title_id', flat=True)) == [
+            titles[0].id, titles[0].id, titles[1].id, titles[1].id,
+        ]
@@ -0,0 +1,86 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from api.query_budget import assert_query_budget
+from reviews.models import Category, Genre, Title
+
+TITLES_URL = '/api/v1/titles/'
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+@pytest.fixture
+def catalogue(db):
+    movie = Category.objects.create(name='Фильм', slug='movie')
+    book = Category.objects.create(name='Книга', slug='book')
+    drama = Genre.objects.create(name='Драма', slug='drama')
+    comedy = Genre.objects.create(name='Комедия', slug='comedy')
+    for i in range(6):
+        title = Title.objects.create(
+            name=f'Произведение {i}', year=2000 + i % 2,
+            category=movie if i < 4 else book,
+        )
+        title.genre.add(drama if i % 3 else comedy)
+        if i == 0:
+            title.genre.add(drama)
+    Title.objects.create(
+        name='Скрытое', year=2000, category=movie, is_hidden=True
+    )
+
+
+def get_facets(params, budget=None):
+    with assert_query_budget('api:titles-list:facets', budget=budget):
+        response = APIClient().get(TITLES_URL, params)
+    assert response.status_code == 200, response.data
+    return response.json()['facets']
+
+
+class TestTitleFacets:
+
+    def test_counts(self, catalogue):
+        facets = get_facets({'facets': 'genre,category,year'})
+        assert facets == {
+            'genre': [
+                {'value': 'comedy', 'count': 2},
+                {'value': 'drama', 'count': 5},
+            ],
+            'category': [
+                {'value': 'book', 'count': 2},
+                {'value': 'movie', 'count': 4},
+            ],
+            'year': [
+                {'value': 2000, 'count': 3},
+                {'value': 2001, 'count': 3},
+            ],
+        }
+
+    def test_own_filter_is_ignored(self, catalogue):
+        facets = get_facets(
+            {'facets': 'genre,category', 'genre': 'comedy'}
+        )
+        assert facets['genre'] == [
+            {'value': 'comedy', 'count': 2},
+            {'value': 'drama', 'count': 5},
+        ]
+        assert facets['category'] == [{'value': 'movie', 'count': 2}]
+
+    def test_cached(self, catalogue):
+        params = {'facets': 'genre,category,year', 'year': 2000}
+        first = get_facets(params)
+        assert get_facets(params, budget=3) == first
+
+    def test_unknown_facet(self, catalogue):
+        with assert_query_budget('api:titles-list', budget=0):
+            response = APIClient().get(
+                TITLES_URL, {'facets': 'genre,author'}
+            )
+        assert response.status_code == 400
+        assert 'facets' in response.json()
+
+    def test_without_facets(self, catalogue):
+        response = APIClient().get(TITLES_URL)
+        assert 'facets' not in response.json()
@@ -0,0 +1,58 @@
+import os
+import re
+
+import pytest
+from django.db import OperationalError
+
+from api_yamdb import health
+from .conftest import infra_dir_path
+
+
+@pytest.fixture(autouse=True)
+def readiness(monkeypatch):
+    monkeypatch.setattr(health, '_state', health.ReadinessState())
+
+
+class TestHealth:
+
+    def test_live_skips_database_and_middleware(self, client):
+        for path in ('/health/live', '/health/live/'):
+            response = client.get(path)
+            assert response.status_code == 200
+            assert response.json() == {'status': 'ok'}
+            assert 'X-Frame-Options' not in response
+
+    def test_ready_is_cached(self, client, db, django_assert_num_queries):
+        response = client.get('/health/ready')
+        assert response.status_code == 200
+        assert response.json() == {
+            'status': 'ok', 'database': 'ok', 'migrations': 'ok'
+        }
+        assert health._state.migrated
+        with django_assert_num_queries(0):
+            assert client.get('/health/ready').status_code == 200
+
+    def test_ready_without_database(self, client, monkeypatch):
+        def ping_database(connection):
+            raise OperationalError('connection refused')
+
+        monkeypatch.setattr(health, 'ping_database', ping_database)
+        response = client.get('/health/ready')
+        assert response.status_code == 503
+        assert response.json()['database'] == 'error: connection refused'
+
+    def test_ready_with_pending_migrations(self, client, db, monkeypatch):
+        monkeypatch.setattr(
+            health, 'pending_migrations', lambda connection: [object()] * 2
+        )
+        response = client.get('/health/ready')
+        assert response.status_code == 503
+        assert response.json()['migrations'] == 'pending: 2'
+        assert not health._state.migrated
+
+    def test_compose_healthchecks(self):
+        path = os.path.join(infra_dir_path, 'docker-compose.yaml')
+        with open(path) as f:
+            compose = f.read()
+        assert re.search(r'healthcheck:[^:]*test:.*pg_isready', compose)
+        assert 'localhost:8000/health/ready' in compose
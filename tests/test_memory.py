@@ -0,0 +1,162 @@
+import os
+import tracemalloc
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api import memory
+from reviews.models import Category, Title
+from users.models import User
+
+
+@pytest.fixture(autouse=True)
+def diagnostics(settings, monkeypatch):
+    settings.MEMORY_DIAGNOSTICS_POLL_SECONDS = 0
+    monkeypatch.setattr(memory, '_state', memory.WorkerState())
+    memory.store().clear()
+    yield
+    memory.store().clear()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+@pytest.fixture
+def titles(db):
+    category = Category.objects.create(name='Фильм', slug='movie')
+    for i in range(5):
+        Title.objects.create(name=f'Фильм {i}', year=2000, category=category)
+
+
+def get_titles():
+    response = APIClient().get('/api/v1/titles/')
+    assert response.status_code == 200
+
+
+def own_report():
+    (report,) = memory.worker_reports()
+    return report
+
+
+class TestMemoryDiagnostics:
+
+    def test_disabled_by_default(self, titles):
+        get_titles()
+        assert not tracemalloc.is_tracing()
+        assert memory.worker_reports() == []
+
+    def test_records_routes_when_enabled(self, titles):
+        memory.set_enabled(True)
+        get_titles()
+        get_titles()
+        assert tracemalloc.is_tracing()
+        memory.poll()
+        stats = own_report()['routes']['api:titles-list']
+        assert stats['requests'] == 2
+        assert stats['allocated_max'] > 0
+        assert stats['allocated_total'] >= stats['allocated_max']
+
+        memory.set_enabled(False)
+        get_titles()
+        assert not tracemalloc.is_tracing()
+
+    def test_snapshots_and_diff(self, titles):
+        memory.set_enabled(True)
+        get_titles()
+        memory.request_snapshot()
+        get_titles()
+        snapshot = own_report()['snapshot']
+        assert snapshot['top'] and snapshot['diff'] == []
+
+        memory.request_snapshot()
+        get_titles()
+        assert own_report()['snapshot']['diff']
+
+    def test_concurrent_requests_are_skipped(self, titles):
+        memory.set_enabled(True)
+        get_titles()
+        with memory._state.measuring:
+            get_titles()
+        memory.poll()
+        stats = own_report()['routes']['api:titles-list']
+        assert stats['requests'] == 1
+        assert stats['skipped'] == 1
+        assert not memory._state.measuring.locked()
+
+    def test_reports_name_the_measure(self, titles):
+        memory.set_enabled(True)
+        get_titles()
+        assert own_report()['measure'] == (
+            'peak' if hasattr(tracemalloc, 'reset_peak') else 'growth'
+        )
+
+    def test_expired_workers_are_pruned(self, titles):
+        memory.set_enabled(True)
+        get_titles()
+        memory.store().set(memory.WORKERS_KEY, {os.getpid(), -1}, None)
+        assert [report['pid'] for report in memory.worker_reports()] == [
+            os.getpid()
+        ]
+        assert memory.store().get(memory.WORKERS_KEY) == {os.getpid()}
+
+        memory.store().delete(memory.worker_key(os.getpid()))
+        assert memory.worker_reports() == []
+        assert memory.store().get(memory.WORKERS_KEY) == set()
+
+    def test_default_cache_is_shared(self, settings):
+        assert memory.cache_is_shared()
+        settings.CACHES = dict(settings.CACHES, **{
+            memory.CACHE_ALIAS: {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+            }
+        })
+        assert not memory.cache_is_shared()
+
+    def test_row_count_recorder(self):
+        recorder = memory.RowCountRecorder()
+
+        class Cursor:
+            rowcount = 42
+
+        def execute(sql, params, many, context):
+            return 'result'
+
+        assert recorder(
+            execute, 'SELECT 1', None, False, {'cursor': Cursor()}
+        ) == 'result'
+        assert recorder.rows_max == 42
+        assert recorder.largest_query == 'SELECT 1'
+
+
+class TestMemoryAdmin:
+
+    url = reverse('memory-diagnostics')
+
+    def test_admin_controls(self, client, titles):
+        admin = User.objects.create_superuser(
+            username='root', email='root@ya.ru', password='password'
+        )
+        client.force_login(admin)
+        response = client.post(self.url, {'action': 'enable'})
+        assert response.status_code == 302
+        assert memory.is_enabled()
+        get_titles()
+        response = client.get(self.url)
+        assert response.status_code == 200
+        content = response.content.decode()
+        assert 'api:titles-list' in content
+        assert 'GUNICORN_THREADS=1' in content
+
+        client.post(self.url, {'action': 'reset'})
+        assert memory.worker_reports() == []
+        client.post(self.url, {'action': 'disable'})
+        assert not memory.is_enabled()
+
+    def test_staff_without_admin_role(self, client, db):
+        user = User.objects.create_user(
+            username='staff', email='staff@ya.ru', is_staff=True
+        )
+        client.force_login(user)
+        assert client.get(self.url).status_code == 403
+        client.logout()
+        assert client.get(self.url).status_code == 302
@@ -0,0 +1,43 @@
+from django.test import Client
+from rest_framework.test import APIClient
+
+from users.models import User
+
+
+class TestPathAwareMiddleware:
+
+    def test_api_skips_stateful_middleware(self, db):
+        response = Client().get('/api/v1/categories/')
+        assert response.status_code == 200
+        assert 'X-Frame-Options' not in response
+        assert 'sessionid' not in response.cookies
+        assert 'csrftoken' not in response.cookies
+
+    def test_api_post_without_csrf_token(self, db):
+        user = User.objects.create(
+            username='reader', email='reader@ya.ru', role='admin'
+        )
+        client = APIClient(enforce_csrf_checks=True)
+        client.force_authenticate(user)
+        response = client.post(
+            '/api/v1/categories/', {'name': 'Фильм', 'slug': 'movie'}
+        )
+        assert response.status_code == 201
+
+    def test_admin_keeps_full_stack(self, db):
+        User.objects.create_superuser(
+            username='root', email='root@ya.ru', password='password'
+        )
+        client = Client(enforce_csrf_checks=True)
+        response = client.get('/admin/login/')
+        assert response['X-Frame-Options'] == 'SAMEORIGIN'
+        assert 'csrftoken' in response.cookies
+        response = client.post(
+            '/admin/login/',
+            {'username': 'root', 'password': 'password'},
+        )
+        assert response.status_code == 403
+        assert client.login(username='root', password='password')
+        response = client.get('/admin/')
+        assert response.status_code == 200
+        assert response.wsgi_request.user.username == 'root'
@@ -0,0 +1,152 @@
+import datetime
+
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.query_budget import assert_query_budget
+from reviews.models import Category, Comment, Review, Title, TitleStat
+from users.models import User
+
+MODERATION_URL = '/api/v1/moderation/'
+
+
+@pytest.fixture
+def catalogue(db, settings):
+    settings.MODERATION_BATCH_SIZE = 2
+    category = Category.objects.create(name='Фильм', slug='movie')
+    titles = [
+        Title.objects.create(name=f'Фильм {i}', year=2000, category=category)
+        for i in range(2)
+    ]
+    users = [
+        User.objects.create(username=f'user{i}', email=f'user{i}@ya.ru')
+        for i in range(4)
+    ]
+    for user in users:
+        for title in titles:
+            review = Review.objects.create(
+                author=user, title=title, text='Отзыв', score=user.id
+            )
+            for other in users:
+                Comment.objects.create(
+                    author=other, review=review, text='Коммент'
+                )
+    return {'titles': titles, 'users': users}
+
+
+def moderate(data, role='moderator'):
+    user = User.objects.create(
+        username=role, email=f'{role}@ya.ru', role=role
+    )
+    client = APIClient()
+    client.force_authenticate(user)
+    return client.post(MODERATION_URL, data, format='json')
+
+
+def assert_stats_match_reviews():
+    for stat in TitleStat.objects.all():
+        reviews = Review.objects.filter(title=stat.title, is_hidden=False)
+        scores = list(reviews.values_list('score', flat=True))
+        assert (stat.reviews_count, stat.score_sum) == (
+            len(scores), sum(scores)
+        ), 'Проверьте, что рейтинг совпадает с видимыми отзывами'
+
+
+class TestModeration:
+
+    def test_delete_reviews_by_author(self, catalogue):
+        author = catalogue['users'][0]
+        response = moderate({
+            'target': 'reviews', 'action': 'delete',
+            'author': author.username,
+        })
+        assert response.status_code == 200, response.data
+        assert response.data == {
+            'reviews_hidden': 0,
+            'reviews_deleted': 2,
+            'comments_deleted': 8,
+            'has_more': False,
+        }
+        assert not Review.objects.filter(author=author).exists()
+        assert_stats_match_reviews()
+
+    def test_hide_reviews_by_ids(self, catalogue):
+        ids = list(Review.objects.values_list('id', flat=True)[:3])
+        response = moderate(
+            {'target': 'reviews', 'action': 'hide', 'ids': ids}, role='admin'
+        )
+        assert response.data['reviews_hidden'] == 3
+        assert Review.objects.filter(pk__in=ids, is_hidden=True).count() == 3
+        assert_stats_match_reviews()
+        response = moderate(
+            {'target': 'reviews', 'action': 'hide', 'ids': ids}
+        )
+        assert response.data['reviews_hidden'] == 0
+        assert_stats_match_reviews()
+
+    def test_limit(self, catalogue, settings):
+        settings.MODERATION_LIMIT = 3
+        title = catalogue['titles'][0]
+        response = moderate({
+            'target': 'reviews', 'action': 'delete', 'title': title.id,
+        })
+        assert response.data['reviews_deleted'] == 3
+        assert response.data['has_more'] is True
+        assert Review.objects.filter(title=title).count() == 1
+        assert_stats_match_reviews()
+
+    def test_delete_comments_by_time_range(self, catalogue):
+        since = timezone.now() - datetime.timedelta(hours=1)
+        response = moderate({
+            'target': 'comments', 'action': 'delete',
+            'author': catalogue['users'][1].username,
+            'since': since.isoformat(),
+        })
+        assert response.data == {'comments_deleted': 8, 'has_more': False}
+        assert Comment.objects.count() == 24
+
+    def test_validation(self, catalogue):
+        response = moderate({'target': 'reviews', 'action': 'delete'})
+        assert response.status_code == 400
+        response = moderate(
+            {'target': 'comments', 'action': 'hide', 'ids': [1]},
+            role='admin',
+        )
+        assert response.status_code == 400
+        assert 'action' in response.data
+        assert Review.objects.count() == 8
+
+    def test_forbidden_for_users(self, catalogue):
+        response = moderate(
+            {'target': 'reviews', 'action': 'delete', 'ids': [1]},
+            role='user',
+        )
+        assert response.status_code == 403
+        assert Review.objects.count() == 8
+
+    @pytest.mark.parametrize('target, action', (
+        ('reviews', 'delete'),
+        ('reviews', 'hide'),
+        ('comments', 'delete'),
+    ))
+    @pytest.mark.parametrize('batch_size', (1, 500))
+    def test_budget(self, catalogue, settings, target, action, batch_size):
+        settings.MODERATION_BATCH_SIZE = batch_size
+        moderator = User.objects.create(
+            username='moderator', email='moderator@ya.ru', role='moderator'
+        )
+        client = APIClient()
+        client.force_authenticate(moderator)
+        data = {
+            'target': target, 'action': action,
+            'author': catalogue['users'][0].username,
+        }
+        with assert_query_budget('api:moderation') as recorder:
+            response = client.post(MODERATION_URL, data, format='json')
+            recorder.batches = response.wsgi_request.query_batches
+        assert response.status_code == 200, response.data
+        if batch_size == 1:
+            assert recorder.batches >= 2, (
+                'Проверьте, что бюджет проверяется на нескольких порциях'
+            )
@@ -0,0 +1,118 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from rest_framework.test import APIClient
+
+from api import pagination
+from api.pagination import ApproximateCountPaginator, get_count
+from reviews.models import Category, Title
+from users.models import ADMIN_ROLE, User
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def titles(db):
+    category = Category.objects.create(name='Фильм', slug='movie')
+    return [
+        Title.objects.create(name=f'Фильм {i}', year=2000, category=category)
+        for i in range(7)
+    ]
+
+
+@pytest.fixture
+def estimate(monkeypatch, settings):
+    settings.APPROXIMATE_COUNT_THRESHOLD = 100
+    monkeypatch.setattr(
+        pagination, 'estimated_count', lambda queryset: (1000, True)
+    )
+
+
+class MaintainedView:
+
+    def get_maintained_count(self):
+        return 42
+
+
+class TestGetCount:
+
+    def test_maintained_count_is_exact(self, titles):
+        assert get_count(Title.objects.all(), MaintainedView()) == (42, False)
+
+    def test_cached_count_is_exact(self, titles, django_assert_num_queries):
+        queryset = Title.objects.filter(year=2000)
+        with django_assert_num_queries(1):
+            assert get_count(queryset) == (7, False)
+        with django_assert_num_queries(0):
+            assert get_count(queryset) == (7, False)
+
+    def test_estimate_only_for_unfiltered(self, titles, estimate):
+        assert get_count(Title.objects.all()) == (1000, True)
+        assert get_count(Title.objects.filter(year=2000)) == (7, False)
+
+    @pytest.mark.skipif(
+        connection.vendor != 'postgresql',
+        reason='Оценка планировщика есть только в PostgreSQL',
+    )
+    def test_planner_estimate(
+        self, titles, settings, django_assert_num_queries
+    ):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE reviews_title')
+        settings.APPROXIMATE_COUNT_THRESHOLD = 100
+        with django_assert_num_queries(1):
+            assert get_count(Title.objects.all()) == (7, False)
+        cache.clear()
+        settings.APPROXIMATE_COUNT_THRESHOLD = 5
+        with django_assert_num_queries(1):
+            assert get_count(Title.objects.all()) == (7, True)
+
+
+class TestApproximateCountPaginator:
+
+    def test_has_next_without_count(self, titles, django_assert_num_queries):
+        paginator = ApproximateCountPaginator(Title.objects.order_by('id'), 5)
+        with django_assert_num_queries(1):
+            page = paginator.page(1)
+            assert page.has_next()
+            assert [title.id for title in page] == [
+                title.id for title in titles[:5]
+            ]
+        assert not paginator.page(2).has_next()
+
+    def test_count_is_not_below_seen_rows(
+        self, titles, monkeypatch, settings
+    ):
+        settings.APPROXIMATE_COUNT_THRESHOLD = 1
+        monkeypatch.setattr(
+            pagination, 'estimated_count', lambda queryset: (2, True)
+        )
+        paginator = ApproximateCountPaginator(Title.objects.order_by('id'), 5)
+        paginator.page(2)
+        assert paginator.count == 7
+        assert paginator.is_approximate
+
+
+class TestUserListCount:
+
+    @pytest.fixture
+    def client(self, db):
+        admin = User.objects.create(
+            username='root', email='root@ya.ru', role=ADMIN_ROLE
+        )
+        client = APIClient()
+        client.force_authenticate(admin)
+        return client
+
+    def test_unfiltered_list_uses_estimate(self, client, estimate):
+        data = client.get('/api/v1/users/').json()
+        assert (data['count'], data['count_is_approximate']) == (1000, True)
+
+    def test_search_is_counted_exactly(self, client, estimate):
+        data = client.get('/api/v1/users/?search=root').json()
+        assert (data['count'], data['count_is_approximate']) == (1, False)
@@ -0,0 +1,92 @@
+import pytest
+from django.db import IntegrityError, connection, transaction
+
+from reviews.models import Category, Comment, Review, Title
+from reviews.partitioning import is_supported, partition, unpartition
+from users.models import User
+
+postgresql_only = pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='Секционирование доступно только в PostgreSQL',
+)
+
+
+@pytest.fixture
+def catalogue(db):
+    category = Category.objects.create(name='Фильм', slug='movie')
+    titles = [
+        Title.objects.create(name=f'Фильм {i}', year=2000, category=category)
+        for i in range(3)
+    ]
+    users = [
+        User.objects.create(username=f'user{i}', email=f'user{i}@ya.ru')
+        for i in range(3)
+    ]
+    for user in users:
+        for title in titles:
+            review = Review.objects.create(
+                author=user, title=title, text='Отзыв', score=5
+            )
+            Comment.objects.create(author=user, review=review, text='Да')
+    return {'titles': titles, 'users': users}
+
+
+def relkind(table):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT relkind FROM pg_class WHERE oid = %s::regclass', [table]
+        )
+        return cursor.fetchone()[0]
+
+
+class TestPartitioning:
+
+    def test_plain_tables_by_default(self, db):
+        if is_supported(connection):
+            assert relkind('reviews_review') == 'r'
+        assert Review.objects.count() == 0
+
+    @postgresql_only
+    def test_partition_keeps_data_and_orm(self, catalogue):
+        assert partition(connection, partitions=4)
+        assert relkind('reviews_review') == 'p'
+        assert relkind('reviews_comment') == 'p'
+        assert Review.objects.count() == 9
+        assert Comment.objects.count() == 9
+
+        title, user = catalogue['titles'][0], catalogue['users'][0]
+        review, created = Review.objects.update_or_insert(
+            author=user, title_id=title.id, text='Новый', score=9
+        )
+        assert not created and review.score == 9
+        assert Review.objects.insert_unique(
+            author=user, title_id=title.id, text='Дубль', score=1
+        ) is None
+        new_user = User.objects.create(username='new', email='new@ya.ru')
+        review = Review.objects.insert_unique(
+            author=new_user, title_id=title.id, text='Отзыв', score=7
+        )
+        assert review.pk > 0
+        assert title.reviews.filter(is_hidden=False).count() == 4
+
+        review.comments.create(author=new_user, text='Комментарий')
+        review.delete()
+        assert not Comment.objects.filter(review_id=review.pk).exists()
+
+        with pytest.raises(IntegrityError), transaction.atomic():
+            Comment.objects.create(
+                author=new_user, review_id=review.pk, text='Сирота'
+            )
+        other = Review.objects.filter(title=title).first()
+        other.comments.create(author=new_user, text='Комментарий')
+        Review.objects.filter(pk=other.pk)._raw_delete(connection.alias)
+        assert not Comment.objects.filter(review_id=other.pk).exists(), (
+            'Проверьте, что удаление отзыва в обход ORM удаляет комментарии'
+        )
+        assert not partition(connection), (
+            'Проверьте, что повторный запуск только обновляет триггеры'
+        )
+
+        assert unpartition(connection)
+        assert relkind('reviews_review') == 'r'
+        assert Review.objects.count() == 8
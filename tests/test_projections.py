@@ -0,0 +1,76 @@
+import pytest
+from rest_framework.renderers import JSONRenderer
+
+from api.projections import (
+    COMMENT_VALUES, comment_rows, review_rows, review_values, title_rows,
+    title_values,
+)
+from api.renderers import FastJSONRenderer
+from api.serializers import (
+    CommentSerializer, ReviewSerializer, TitleReadSerializer,
+)
+from api.views import TitleViewSet
+from reviews.models import Category, Comment, Genre, Review, Title
+from users.models import User
+
+
+@pytest.fixture
+def catalogue(db):
+    category = Category.objects.create(name='Кино «Ёж»', slug='movie')
+    genres = [
+        Genre.objects.create(name=name, slug=slug)
+        for name, slug in (('Драма', 'drama'), ('Комедия', 'comedy'))
+    ]
+    rated = Title.objects.create(
+        name='Сталкер', year=1979, category=category,
+        description='Строка\u2028с разделителем и "кавычками" \\ 😀',
+    )
+    rated.genre.add(genres[1], genres[0])
+    unrated = Title.objects.create(
+        name='Без отзывов', year=2020, category=category
+    )
+    unrated.genre.add(genres[0])
+    Title.objects.create(name='Без жанров', year=1900, category=category)
+    for index, score in enumerate((7, 8, 10)):
+        user = User.objects.create(
+            username=f'читатель{index}', email=f'user{index}@ya.ru'
+        )
+        review = Review.objects.create(
+            author=user, title=rated, text=f'Отзыв №{index} ',
+            score=score,
+        )
+        Comment.objects.create(author=user, review=review, text='Согласен ✓')
+    return rated
+
+
+def assert_same_bytes(serialized, projected):
+    before = JSONRenderer().render(serialized)
+    assert FastJSONRenderer().render(projected) == before
+    return before
+
+
+class TestProjections:
+
+    def test_titles(self, catalogue):
+        queryset = TitleViewSet().get_queryset()
+        before = assert_same_bytes(
+            TitleReadSerializer(
+                queryset.prefetch_related('genre').select_related('category'),
+                many=True,
+            ).data,
+            title_rows(list(title_values(queryset))),
+        )
+        assert b'"rating":8' in before
+        assert b'"rating":null' in before
+
+    def test_reviews_and_comments(self, catalogue):
+        reviews = catalogue.reviews.select_related('author')
+        assert_same_bytes(
+            ReviewSerializer(reviews, many=True).data,
+            review_rows(list(review_values(reviews))),
+        )
+        comments = Comment.objects.select_related('author').order_by('id')
+        assert_same_bytes(
+            CommentSerializer(comments, many=True).data,
+            comment_rows(list(comments.values(*COMMENT_VALUES))),
+        )
@@ -0,0 +1,162 @@
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APIClient
+
+from api.query_budget import (
+    BATCH_QUERY_BUDGETS, QUERY_BUDGETS, QueryBudgetExceeded,
+    assert_query_budget, budget_route, record_queries, route_budget,
+)
+from reviews.models import Category, Comment, Genre, Review, Title
+from users.models import User
+
+OBJECTS = 25
+PAGE_SIZES = (1, 5, 20)
+
+
+@pytest.fixture
+def catalogue(db):
+    category = Category.objects.create(name='Фильм', slug='movie')
+    genres = [
+        Genre.objects.create(name=f'Жанр {i}', slug=f'genre-{i}')
+        for i in range(3)
+    ]
+    titles = [
+        Title.objects.create(name=f'Фильм {i}', year=2000, category=category)
+        for i in range(OBJECTS)
+    ]
+    for title in titles:
+        title.genre.set(genres[:title.id % 3 + 1])
+    users = [
+        User.objects.create(username=f'user{i}', email=f'user{i}@ya.ru')
+        for i in range(OBJECTS)
+    ]
+    admin = User.objects.create(
+        username='admin', email='admin@ya.ru', role='admin'
+    )
+    for user in users:
+        for title in titles[:3]:
+            Review.objects.create(
+                author=user, title=title, text='Отзыв', score=5
+            )
+    review = Review.objects.filter(title=titles[0]).first()
+    for user in users:
+        Comment.objects.create(author=user, review=review, text='Коммент')
+    return {
+        'title_id': titles[0].id,
+        'review_id': review.id,
+        'comment_id': Comment.objects.filter(review=review).first().id,
+        'username': users[0].username,
+        'admin': admin,
+    }
+
+
+def client_for(catalogue):
+    client = APIClient()
+    client.force_authenticate(catalogue['admin'])
+    return client
+
+
+def get_with_budget(client, route, **kwargs):
+    url = reverse(route, kwargs=kwargs)
+    cache.clear()
+    with assert_query_budget(route) as recorder:
+        response = client.get(url)
+    assert response.status_code == 200, (
+        f'Проверьте, что {url} отвечает статусом 200'
+    )
+    return len(recorder)
+
+
+class TestQueryBudget:
+
+    @pytest.mark.parametrize('route, kwargs', (
+        ('api:categories-list', ()),
+        ('api:genres-list', ()),
+        ('api:titles-list', ()),
+        ('api:titles-top', ()),
+        ('api:titles-trending', ()),
+        ('api:reviews-list', ('title_id',)),
+        ('api:comments-list', ('title_id', 'review_id')),
+        ('api:users-list', ()),
+    ))
+    def test_list_budget_does_not_grow(
+        self, catalogue, monkeypatch, route, kwargs
+    ):
+        client = client_for(catalogue)
+        kwargs = {name: catalogue[name] for name in kwargs}
+        counts = []
+        for page_size in PAGE_SIZES:
+            monkeypatch.setattr(PageNumberPagination, 'page_size', page_size)
+            counts.append(get_with_budget(client, route, **kwargs))
+        assert len(set(counts)) == 1, (
+            f'Количество запросов {route} растёт с размером страницы: '
+            f'{dict(zip(PAGE_SIZES, counts))}'
+        )
+
+    @pytest.mark.parametrize('route, kwargs', (
+        ('api:titles-detail', {'pk': 'title_id'}),
+        ('api:reviews-detail', {'title_id': 'title_id', 'pk': 'review_id'}),
+        ('api:comments-detail', {
+            'title_id': 'title_id', 'review_id': 'review_id',
+            'pk': 'comment_id',
+        }),
+        ('api:users-detail', {'username': 'username'}),
+        ('api:users-current-user', {}),
+    ))
+    def test_detail_budget(self, catalogue, route, kwargs):
+        kwargs = {name: catalogue[key] for name, key in kwargs.items()}
+        get_with_budget(client_for(catalogue), route, **kwargs)
+
+    def test_every_api_route_has_budget(self):
+        from api.urls import auth_urls, router, urlpatterns
+
+        names = {
+            f'api:{url.name}'
+            for url in router.urls + auth_urls + urlpatterns
+            if getattr(url, 'name', None)
+        }
+        names.discard('api:api-root')
+        assert names <= set(QUERY_BUDGETS), (
+            'Задайте бюджет запросов для маршрутов: '
+            f'{sorted(names - set(QUERY_BUDGETS))}'
+        )
+
+    def test_report_shows_repeated_queries(self, catalogue):
+        with pytest.raises(QueryBudgetExceeded) as exc:
+            with assert_query_budget('api:titles-detail', budget=1):
+                for title in Title.objects.all()[:3]:
+                    title.category.name
+        report = str(exc.value)
+        assert '3 x SELECT' in report, (
+            'Проверьте, что отчёт показывает повторяющиеся запросы'
+        )
+        assert 'test_query_budget.py' in report, (
+            'Проверьте, что отчёт показывает стек вызова запроса'
+        )
+
+    def test_record_queries_counts_all_queries(self, catalogue):
+        with record_queries() as recorder:
+            list(Title.objects.all())
+        assert len(recorder) == 1
+
+    @pytest.mark.parametrize('params, key', (
+        ({}, 'api:titles-list'),
+        ({'facets': 'genre'}, 'api:titles-list:facets'),
+        ({'facets': ''}, 'api:titles-list'),
+        ({'page': '2'}, 'api:titles-list'),
+    ))
+    def test_budget_route(self, params, key):
+        assert budget_route('api:titles-list', params) == key
+        assert budget_route('api:genres-list', params) == 'api:genres-list'
+
+    def test_batch_budgets(self):
+        assert set(BATCH_QUERY_BUDGETS) <= set(QUERY_BUDGETS)
+        per_batch = BATCH_QUERY_BUDGETS['api:moderation']
+        assert route_budget('api:moderation', 10) == (
+            QUERY_BUDGETS['api:moderation'] + 10 * per_batch
+        ), 'Проверьте, что бюджет растёт с числом порций'
+        assert route_budget('api:titles-list', 10) == (
+            QUERY_BUDGETS['api:titles-list']
+        )
@@ -0,0 +1,127 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from reviews.models import Category, Review, Title, TitleStat
+from reviews.rankings import refresh_trending
+from users.models import User
+
+
+@pytest.fixture
+def titles(db):
+    category = Category.objects.create(name='Фильм', slug='movie')
+    return [
+        Title.objects.create(name=f'Фильм {i}', year=2000, category=category)
+        for i in range(3)
+    ]
+
+
+@pytest.fixture
+def users(db):
+    return [
+        User.objects.create(username=f'user{i}', email=f'user{i}@ya.ru')
+        for i in range(4)
+    ]
+
+
+def stat(title):
+    stat = TitleStat.objects.get(title=title)
+    return (
+        stat.reviews_count, stat.score_sum, stat.rating,
+        stat.recent_reviews_count,
+    )
+
+
+def review(user, title, score):
+    return Review.objects.create(
+        author=user, title=title, text='Отзыв', score=score
+    )
+
+
+def age(reviews, days):
+    Review.objects.filter(pk__in=[r.pk for r in reviews]).update(
+        pub_date=timezone.now() - timedelta(days=days)
+    )
+
+
+class TestTitleStatSignals:
+
+    def test_create_update_delete(self, titles, users):
+        title = titles[0]
+        assert stat(title) == (0, 0, None, 0)
+        first = review(users[0], title, 8)
+        review(users[1], title, 5)
+        assert stat(title) == (2, 13, 6.5, 2)
+
+        first = Review.objects.get(pk=first.pk)
+        first.score = 10
+        first.save()
+        assert stat(title) == (2, 15, 7.5, 2)
+
+        first.delete()
+        assert stat(title) == (1, 5, 5.0, 1)
+
+    def test_hidden_reviews_are_not_counted(self, titles, users):
+        Review.objects.create(
+            author=users[0], title=titles[0], text='Скрыт', score=1,
+            is_hidden=True,
+        )
+        assert stat(titles[0]) == (0, 0, None, 0)
+
+
+class TestRefreshTrending:
+
+    def test_recounts_window(self, titles, users):
+        old = [review(user, titles[0], 7) for user in users[:2]]
+        review(users[2], titles[1], 7)
+        age(old, 30)
+        assert stat(titles[0])[3] == 2
+
+        assert refresh_trending() == 2
+        assert stat(titles[0])[3] == 0
+        assert stat(titles[1])[3] == 1
+        assert stat(titles[2])[3] == 0
+        assert stat(titles[0])[:2] == (2, 14)
+
+    def test_keeps_concurrent_increments(self, titles, users):
+        review(users[0], titles[0], 7)
+        TitleStat.objects.filter(title=titles[0]).update(
+            recent_reviews_count=0
+        )
+        refresh_trending()
+        review(users[1], titles[0], 7)
+        assert stat(titles[0])[3] == 2
+
+
+class TestRankingEndpoints:
+
+    def test_top(self, titles, users, settings):
+        settings.TOP_RATED_MIN_REVIEWS = 2
+        for user in users[:2]:
+            review(user, titles[0], 6)
+            review(user, titles[1], 9)
+        review(users[0], titles[2], 10)
+        response = APIClient().get('/api/v1/titles/top/')
+        assert response.status_code == 200
+        results = response.json()['results']
+        assert [t['id'] for t in results] == [titles[1].id, titles[0].id]
+        assert results[0]['rating'] == 9
+
+        response = APIClient().get('/api/v1/titles/top/?min_reviews=1')
+        assert response.json()['results'][0]['id'] == titles[2].id
+        response = APIClient().get('/api/v1/titles/top/?min_reviews=x')
+        assert response.status_code == 400
+
+    def test_trending(self, titles, users):
+        for user in users[:3]:
+            review(user, titles[1], 5)
+        age([review(users[0], titles[0], 5)], 30)
+        review(users[0], titles[2], 5)
+        refresh_trending()
+        response = APIClient().get('/api/v1/titles/trending/')
+        assert response.status_code == 200
+        assert [t['id'] for t in response.json()['results']] == [
+            titles[1].id, titles[2].id
+        ]
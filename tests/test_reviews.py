@@ -0,0 +1,108 @@
+import pytest
+from rest_framework.test import APIClient
+
+from api.query_budget import assert_query_budget
+from reviews.models import Category, Review, Title, TitleStat
+from users.models import User
+
+
+@pytest.fixture
+def title(db):
+    category = Category.objects.create(name='Фильм', slug='movie')
+    return Title.objects.create(name='Фильм', year=2000, category=category)
+
+
+def client_for(username):
+    user, _ = User.objects.get_or_create(
+        username=username, email=f'{username}@ya.ru'
+    )
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+class TestReviewCreate:
+
+    def test_duplicate_review_is_bad_request(self, title):
+        client = client_for('author')
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        data = {'text': 'Отзыв', 'score': 8}
+        with assert_query_budget('api:reviews-list'):
+            response = client.post(url, data)
+        assert response.status_code == 201
+        assert response.json()['author'] == 'author'
+
+        response = client.post(url, data)
+        assert response.status_code == 400, (
+            'Проверьте, что повторный отзыв возвращает статус 400'
+        )
+        assert 'non_field_errors' in response.json()
+        stat = TitleStat.objects.get(title=title)
+        assert (stat.reviews_count, stat.score_sum) == (1, 8), (
+            'Проверьте, что рейтинг учитывает только созданный отзыв'
+        )
+
+    def test_missing_title_is_not_found(self, db):
+        response = client_for('author').post(
+            '/api/v1/titles/404/reviews/', {'text': 'Отзыв', 'score': 8}
+        )
+        assert response.status_code == 404
+
+    def test_put_mine_creates_then_updates(self, title):
+        client = client_for('author')
+        url = f'/api/v1/titles/{title.id}/reviews/mine/'
+        with assert_query_budget('api:reviews-mine'):
+            response = client.put(url, {'text': 'Отзыв', 'score': 4})
+        assert response.status_code == 201
+        with assert_query_budget('api:reviews-mine'):
+            response = client.put(url, {'text': 'Новый отзыв', 'score': 9})
+        assert response.status_code == 200
+        assert response.json()['text'] == 'Новый отзыв'
+        assert Review.objects.filter(title=title).count() == 1
+        stat = TitleStat.objects.get(title=title)
+        assert (stat.reviews_count, stat.rating) == (1, 9.0), (
+            'Проверьте, что рейтинг пересчитан после обновления отзыва'
+        )
+
+    def test_double_submit_creates_one_review(self, title):
+        author = User.objects.create(username='author', email='a@ya.ru')
+        first = Review.objects.insert_unique(author, title.id, 'Отзыв', 8)
+        second = Review.objects.insert_unique(author, title.id, 'Отзыв', 8)
+        assert first is not None and second is None, (
+            'Проверьте, что повторная вставка не создаёт второй отзыв'
+        )
+        assert Review.objects.filter(title=title).count() == 1
+        assert TitleStat.objects.get(title=title).reviews_count == 1
+
+
+class TestHiddenTitle:
+
+    def test_post_to_hidden_title_is_not_found(self, title):
+        Title.objects.filter(pk=title.pk).update(is_hidden=True)
+        response = client_for('author').post(
+            f'/api/v1/titles/{title.id}/reviews/', {'text': 'Отзыв', 'score': 8}
+        )
+        assert response.status_code == 404, (
+            'Проверьте, что на скрытое произведение нельзя оставить отзыв'
+        )
+        assert not Review.objects.filter(title=title).exists()
+
+    def test_put_mine_to_hidden_title_is_not_found(self, title):
+        client = client_for('author')
+        url = f'/api/v1/titles/{title.id}/reviews/mine/'
+        assert client.put(url, {'text': 'Отзыв', 'score': 4}).status_code == 201
+        Title.objects.filter(pk=title.pk).update(is_hidden=True)
+        response = client.put(url, {'text': 'Новый отзыв', 'score': 9})
+        assert response.status_code == 404
+        assert Review.objects.get(title=title).text == 'Отзыв', (
+            'Проверьте, что отзыв на скрытое произведение не обновляется'
+        )
+
+    def test_put_mine_does_not_update_hidden_review(self, title):
+        client = client_for('author')
+        url = f'/api/v1/titles/{title.id}/reviews/mine/'
+        assert client.put(url, {'text': 'Отзыв', 'score': 4}).status_code == 201
+        Review.objects.filter(title=title).update(is_hidden=True)
+        response = client.put(url, {'text': 'Новый отзыв', 'score': 9})
+        assert response.status_code == 404
+        assert Review.objects.get(title=title).score == 4
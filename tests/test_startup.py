@@ -0,0 +1,44 @@
+import os
+import runpy
+
+from django.urls import reverse
+
+from api import warmup
+from api.coalescing import coalescing_stats, reset_coalescing_stats
+from api.warmup import warm_up
+from .conftest import root_dir
+
+GUNICORN_CONF = os.path.join(root_dir, 'api_yamdb', 'gunicorn.conf.py')
+
+
+class TestStartup:
+
+    def test_gunicorn_config_from_env(self, monkeypatch):
+        monkeypatch.setenv('GUNICORN_WORKERS', '3')
+        monkeypatch.setenv('GUNICORN_THREADS', '4')
+        config = runpy.run_path(GUNICORN_CONF)
+        assert config['workers'] == 3
+        assert config['threads'] == 4
+        assert config['worker_class'] == 'gthread'
+        assert config['preload_app'] is True
+        assert callable(config['post_worker_init'])
+
+    def test_dockerfile_uses_config(self):
+        with open(os.path.join(root_dir, 'api_yamdb', 'Dockerfile')) as f:
+            assert 'gunicorn.conf.py' in f.read()
+
+    def test_warm_up(self, db, monkeypatch):
+        closed = []
+        monkeypatch.setattr(
+            warmup.connections, 'close_all', lambda: closed.append(True)
+        )
+        reset_coalescing_stats()
+        warm_up()
+        assert reverse('api:titles-list') == '/api/v1/titles/'
+        assert closed, (
+            'Проверьте, что прогрев закрывает соединение главного потока'
+        )
+        assert set(coalescing_stats().values()) == {0}, (
+            'Проверьте, что запросы прогрева не попадают в счётчики '
+            'объединения запросов'
+        )
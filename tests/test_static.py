@@ -0,0 +1,48 @@
+import gzip
+import os
+import re
+
+from django.core.management import call_command
+
+from api.management.commands.check_static_headers import header_problems
+from api_yamdb.storage import CompressedManifestStaticFilesStorage
+from .conftest import infra_dir_path
+
+STORAGE = 'api_yamdb.storage.CompressedManifestStaticFilesStorage'
+
+
+class TestStaticPipeline:
+
+    def test_collectstatic_hashes_and_compresses(self, settings, tmp_path):
+        settings.STATIC_ROOT = str(tmp_path)
+        settings.STATICFILES_STORAGE = STORAGE
+        call_command('collectstatic', interactive=False, verbosity=0)
+        storage = CompressedManifestStaticFilesStorage(location=str(tmp_path))
+        url = storage.url('redoc.yaml')
+        assert re.fullmatch(r'/static/redoc\.[0-9a-f]{12}\.yaml', url)
+        path = tmp_path / url[len('/static/'):]
+        with gzip.open(f'{path}.gz') as f:
+            assert f.read() == path.read_bytes()
+
+    def test_urls_without_manifest(self, tmp_path):
+        storage = CompressedManifestStaticFilesStorage(location=str(tmp_path))
+        assert storage.url('redoc.yaml') == '/static/redoc.yaml'
+
+    def test_nginx_config(self):
+        with open(os.path.join(infra_dir_path, 'nginx', 'default.conf')) as f:
+            config = f.read()
+        assert re.search(r'upstream web \{[^}]*keepalive \d+;', config)
+        assert 'proxy_pass http://web;' in config
+        assert 'proxy_http_version 1.1;' in config
+        assert 'proxy_set_header Connection "";' in config
+        assert 'gzip_static on;' in config
+        assert 'max-age=31536000, immutable' in config
+
+    def test_header_problems(self):
+        headers = {
+            'Cache-Control': 'public, max-age=31536000, immutable',
+            'Content-Encoding': 'gzip',
+        }
+        assert header_problems(200, headers) == []
+        assert len(header_problems(200, {})) == 2
+        assert len(header_problems(404, headers)) == 1
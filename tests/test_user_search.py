@@ -0,0 +1,174 @@
+import pytest
+from django.db import connection
+from rest_framework.test import APIClient
+
+from api.query_budget import assert_query_budget
+from users.models import ADMIN_ROLE, MODERATOR_ROLE, User
+from users import search
+from users.search import PREFIX, SIMILAR, search_users
+
+URL = '/api/v1/users/search/'
+
+
+@pytest.fixture(autouse=True)
+def trigram_check(db):
+    """Наличие pg_trgm проверяется раз на процесс, вне бюджета запроса."""
+    if connection.vendor == 'postgresql':
+        search.has_trigram_extension(connection.alias)
+
+
+@pytest.fixture
+def admin_client(db):
+    admin = User.objects.create(
+        username='root', email='root@ya.ru', role=ADMIN_ROLE
+    )
+    client = APIClient()
+    client.force_authenticate(admin)
+    return client
+
+
+@pytest.fixture
+def users(db):
+    names = ['Anna', 'annabel', 'ANNETTE', 'joanna', 'bob', 'anatoly']
+    for index, name in enumerate(names):
+        User.objects.create(
+            username=name, email=f'{name.lower()}@ya.ru',
+            role=MODERATOR_ROLE if index % 2 else 'user',
+        )
+    User.objects.create(username='carl', email='hanna.carl@ya.ru')
+    User.objects.create(
+        username='annexed', email='annexed@ya.ru', is_active=False
+    )
+
+
+def search_all(client, url):
+    results = []
+    while url:
+        with assert_query_budget('api:users-search'):
+            response = client.get(url)
+        assert response.status_code == 200, response.data
+        data = response.json()
+        results.extend(user['username'] for user in data['results'])
+        url = data['next']
+    return results
+
+
+class TestUserSearch:
+
+    def test_prefix_matches_rank_first(self, admin_client, users):
+        results = search_all(admin_client, f'{URL}?q=ann')
+        assert results[:4] == ['Anna', 'annabel', 'ANNETTE', 'annexed'], (
+            'Проверьте, что администратор находит и деактивированных'
+        )
+        assert set(results[4:]) >= {'joanna', 'carl'}
+        assert len(results) == len(set(results))
+
+    def test_role_filter(self, admin_client, users):
+        results = search_all(admin_client, f'{URL}?q=an&role=moderator')
+        assert set(results) == {'annabel', 'joanna', 'anatoly'}
+
+    def test_keyset_pages(self, admin_client, users):
+        results = search_all(admin_client, f'{URL}?q=an')
+        assert results[:5] == [
+            'anatoly', 'Anna', 'annabel', 'ANNETTE', 'annexed'
+        ]
+        assert sorted(results[5:]) == ['carl', 'joanna']
+
+    def test_substring_inside_long_username(self, users):
+        User.objects.create(
+            username='the_longest_username_with_ann_inside',
+            email='long@ya.ru',
+        )
+        rows = search_users(User.objects.filter(is_active=True), 'ann')
+        assert 'the_longest_username_with_ann_inside' in {
+            user.username for user in rows
+        }
+
+    def test_ranking(self, users):
+        rows = search_users(User.objects.filter(is_active=True), 'ANN')
+        groups = [(user.username, user.search_group) for user in rows]
+        assert groups[:3] == [
+            ('Anna', PREFIX), ('annabel', PREFIX), ('ANNETTE', PREFIX)
+        ]
+        assert all(group == SIMILAR for _, group in groups[3:])
+
+    @pytest.mark.parametrize('query, field', (
+        ('', 'q'),
+        ('q=ann&role=owner', 'role'),
+    ))
+    def test_invalid_parameters(self, admin_client, query, field):
+        response = admin_client.get(f'{URL}?{query}')
+        assert response.status_code == 400
+        assert field in response.json()
+
+    def test_invalid_cursor(self, admin_client, users):
+        response = admin_client.get(f'{URL}?q=ann&cursor=garbage')
+        assert response.status_code == 404
+
+    def test_admin_only(self, users):
+        client = APIClient()
+        client.force_authenticate(User.objects.get(username='bob'))
+        assert client.get(f'{URL}?q=ann').status_code == 403
+
+    @pytest.mark.skipif(
+        connection.vendor != 'postgresql',
+        reason='Индексы поиска создаются только в PostgreSQL',
+    )
+    def test_prefix_search_uses_index(self, users):
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+            cursor.execute(
+                'EXPLAIN SELECT id FROM users_user '
+                "WHERE UPPER(username::text) LIKE UPPER('ann%%')"
+            )
+            plan = ' '.join(row[0] for row in cursor.fetchall())
+            cursor.execute('RESET enable_seqscan')
+        assert 'users_user_username_upper_idx' in plan
+
+    @pytest.mark.skipif(
+        connection.vendor != 'postgresql',
+        reason='Триграммный поиск работает только в PostgreSQL',
+    )
+    def test_substring_search_matches_trigram_indexes(
+        self, db, monkeypatch
+    ):
+        """
+        Подстрока ищется по тем же выражениям UPPER(...), на которых
+        построены GIN-индексы миграции 0002: без pg_trgm совпадение
+        выражений проверяется на B-tree индексе с тем же выражением.
+        """
+        monkeypatch.setattr(search, 'uses_trigrams', lambda queryset: True)
+        sql = str(search_users(User.objects.all(), 'ann').query)
+        assert 'UPPER("users_user"."username")::text LIKE %ANN%' in sql
+        assert 'UPPER("users_user"."email")::text LIKE %ANN%' in sql
+        assert 'UPPER(%ann%)' not in sql
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE INDEX test_email_upper_idx '
+                'ON users_user (UPPER(email::text))'
+            )
+            cursor.execute('SET enable_seqscan = off')
+            cursor.execute(
+                'EXPLAIN SELECT id FROM users_user '
+                'WHERE UPPER("users_user"."email")::text = %s', ['ANN']
+            )
+            plan = ' '.join(row[0] for row in cursor.fetchall())
+            cursor.execute('RESET enable_seqscan')
+        assert 'test_email_upper_idx' in plan
+
+    @pytest.mark.skipif(
+        connection.vendor != 'postgresql',
+        reason='Индексы поиска создаются только в PostgreSQL',
+    )
+    def test_substring_search_uses_trigram_indexes(self, users):
+        if not search.has_trigram_extension(connection.alias):
+            pytest.skip('Расширение pg_trgm не установлено')
+        rows = search_users(User.objects.all(), 'nna')
+        sql, params = rows.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+            cursor.execute(f'EXPLAIN {sql}', params)
+            plan = ' '.join(row[0] for row in cursor.fetchall())
+            cursor.execute('RESET enable_seqscan')
+        assert 'users_user_username_trgm_idx' in plan
+        assert 'users_user_email_trgm_idx' in plan